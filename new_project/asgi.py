@@ -3,14 +3,24 @@ ASGI config for new_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve it with an ASGI server (e.g. ``uvicorn new_project.asgi:application``
+or ``daphne``) to keep the notification stream at /notifications/stream/
+open without tying up a worker thread per connection.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'new_project.settings')
 
 application = get_asgi_application()
+
+if settings.TEMPLATE_WARM_UP:
+    from news.template_cache import warm_templates
+
+    warm_templates()
@@ -33,11 +33,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'news.middleware.MetricsMiddleware',
+    'news.middleware.SlowQueryMiddleware',
+    'news.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'news.middleware.AdmissionControlMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -49,8 +53,15 @@ TEMPLATES = [
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         # you can add BASE_DIR / 'templates' if you want global templates
-        'APP_DIRS': True,
+        # Cached loader in every mode; runserver's autoreloader still empties
+        # it when a template changes.
         'OPTIONS': {
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -83,6 +94,36 @@ else:
         }
     }
 
+# ----------------------------------
+# 🔹 SQLITE PRODUCTION PROFILE
+# ----------------------------------
+# SQLITE_TUNED=1 applies the PRAGMAs below to every SQLite connection
+# (news.sqlite), starts write transactions as IMMEDIATE so writers queue
+# on the busy timeout instead of deadlocking on a lock upgrade.
+# WRITE_QUEUE_ENABLED=1 opts in to sending write-heavy views through the
+# single-writer queue (news.write_queue).
+
+SQLITE_TUNED = os.getenv("SQLITE_TUNED") == "1"
+SQLITE_PRAGMAS = {}
+
+if SQLITE_TUNED and DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),  # KiB when negative
+        "temp_store": "MEMORY",
+    }
+    DATABASES["default"]["OPTIONS"] = {
+        "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000,
+        "transaction_mode": "IMMEDIATE",
+    }
+
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE_ENABLED", "0") == "1"
+WRITE_QUEUE_BATCH = int(os.getenv("WRITE_QUEUE_BATCH", "64"))
+WRITE_QUEUE_LINGER_MS = float(os.getenv("WRITE_QUEUE_LINGER_MS", "0"))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.'
@@ -105,6 +146,13 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Uploaded files (article images and their thumbnails)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / 'media'))
+# Django serves MEDIA_URL itself (news.views.media_file) unless
+# SERVE_MEDIA=0, for when a web server maps MEDIA_URL to MEDIA_ROOT.
+SERVE_MEDIA = os.getenv("SERVE_MEDIA", "1") == "1"
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -135,3 +183,307 @@ EMAIL_HOST_USER = 'your_email@gmail.com'
 EMAIL_HOST_PASSWORD = 'your_app_password_here'
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+
+# ----------------------------------
+# 🔹 CACHE CONFIGURATION
+# ----------------------------------
+# A shared cache (Redis or Memcached) lets counters and cached data be
+# seen by every worker process. Local memory is used when none is set.
+
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+elif os.getenv("MEMCACHED_LOCATION"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.memcached.PyMemcacheCache",
+            "LOCATION": os.getenv("MEMCACHED_LOCATION"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+
+# ----------------------------------
+# 🔹 SESSIONS & USER CACHE
+# ----------------------------------
+# With a shared cache (REDIS_URL / MEMCACHED_LOCATION) sessions are
+# written through to the cache and read from it first, with the database
+# as fallback, and the backend resolves the session user from a cached
+# snapshot (news.user_cache), so authentication needs no queries on a
+# warm cache. Without one they stay off: a per-process cache would keep
+# accepting logged-out sessions and deactivated users in other workers.
+# ModelBackend stays listed so sessions it created remain valid.
+
+SHARED_CACHE = bool(os.getenv("REDIS_URL") or os.getenv("MEMCACHED_LOCATION"))
+SESSION_ENGINE = os.getenv(
+    "SESSION_ENGINE",
+    "django.contrib.sessions.backends.cached_db" if SHARED_CACHE
+    else "django.contrib.sessions.backends.db",
+)
+AUTHENTICATION_BACKENDS = [
+    *(["news.user_cache.CachedUserBackend"] if SHARED_CACHE else []),
+    "django.contrib.auth.backends.ModelBackend",
+]
+USER_CACHE_TIMEOUT = int(os.getenv("USER_CACHE_TIMEOUT", "300"))
+
+
+# ----------------------------------
+# 🔹 ARTICLE VIEW COUNTERS
+# ----------------------------------
+# Views are buffered in-process and written to the database in one
+# batched UPDATE every VIEW_COUNTER_FLUSH_INTERVAL seconds (from a timer
+# thread in "serve" workers), or sooner once VIEW_COUNTER_MAX_PENDING
+# distinct articles are waiting.
+
+VIEW_COUNTER_FLUSH_INTERVAL = int(os.getenv("VIEW_COUNTER_FLUSH_INTERVAL", "30"))
+VIEW_COUNTER_MAX_PENDING = int(os.getenv("VIEW_COUNTER_MAX_PENDING", "500"))
+
+
+# ----------------------------------
+# 🔹 TRENDING ARTICLES
+# ----------------------------------
+# Scores halve every TRENDING_HALF_LIFE_HOURS. Run
+# "python manage.py update_trending" periodically to refresh them.
+
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "6"))
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", "20"))
+# How long a ranking of the stored scores, served when the snapshot is
+# missing, stays cached until update_trending replaces it.
+TRENDING_FALLBACK_TIMEOUT = int(os.getenv("TRENDING_FALLBACK_TIMEOUT", "300"))
+TRENDING_WEIGHTS = {
+    "read": 1.0,
+    "subscription": 5.0,
+    "recency": 10.0,
+}
+
+
+# ----------------------------------
+# 🔹 RELATED ARTICLES
+# ----------------------------------
+# Neighbour lists are rebuilt with "python manage.py rebuild_related"
+# and updated incrementally whenever an article is approved, edited or
+# removed, on a background thread after the request's transaction
+# commits (RELATED_INDEX_IN_BACKGROUND=0 runs it inline instead).
+
+RELATED_ARTICLES_TOP_N = int(os.getenv("RELATED_ARTICLES_TOP_N", "5"))
+RELATED_INDEX_IN_BACKGROUND = os.getenv("RELATED_INDEX_IN_BACKGROUND", "1") == "1"
+
+
+# ----------------------------------
+# 🔹 DUPLICATE DETECTION
+# ----------------------------------
+# Estimated Jaccard similarity at which a submitted article is flagged
+# as a likely duplicate. Backfill with "python manage.py backfill_minhash".
+
+DUPLICATE_SIMILARITY_THRESHOLD = float(os.getenv("DUPLICATE_SIMILARITY_THRESHOLD", "0.8"))
+
+
+# ----------------------------------
+# 🔹 METRICS
+# ----------------------------------
+# Set METRICS_DIR to a directory shared by all worker processes on the
+# host so /metrics reports totals for the whole server. Scrapers send
+# METRICS_TOKEN as a bearer token; without a token only the addresses or
+# networks in METRICS_ALLOWED_IPS (comma separated) may scrape.
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_SYNC_INTERVAL = float(os.getenv("METRICS_SYNC_INTERVAL", "1"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_IPS = [
+    network.strip()
+    for network in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",")
+    if network.strip()
+]
+
+
+# ----------------------------------
+# 🔹 SLOW QUERY LOG
+# ----------------------------------
+# Queries slower than the threshold are written to SLOW_QUERY_LOG;
+# a sampled share also gets an EXPLAIN. Summarize the log with
+# "python manage.py slow_queries". A threshold of 0 disables logging.
+
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "100"))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0.1"))
+SLOW_QUERY_LOG = Path(os.getenv("SLOW_QUERY_LOG", BASE_DIR / "logs" / "slow_queries.jsonl"))
+
+
+# ----------------------------------
+# 🔹 REQUEST PROFILING
+# ----------------------------------
+# Profile PROFILER_SAMPLE_RATE of requests, plus any request sent with
+# "X-Profile: <PROFILER_TOKEN>". PROFILER_MODE is "cprofile" or
+# "sampler". Merge the output with "python manage.py merge_profiles".
+
+PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+PROFILER_TOKEN = os.getenv("PROFILER_TOKEN", "")
+PROFILER_MODE = os.getenv("PROFILER_MODE", "cprofile")
+PROFILER_INTERVAL = float(os.getenv("PROFILER_INTERVAL", "0.005"))
+PROFILER_DIR = Path(os.getenv("PROFILER_DIR", BASE_DIR / "profiles"))
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
+
+
+# ----------------------------------
+# 🔹 ARTICLE API CACHE
+# ----------------------------------
+# Serialized approved articles shared by the detail and batch endpoints.
+
+ARTICLE_CACHE_TIMEOUT = int(os.getenv("ARTICLE_CACHE_TIMEOUT", "300"))
+ARTICLE_BATCH_MAX_IDS = int(os.getenv("ARTICLE_BATCH_MAX_IDS", "100"))
+
+# Rendered, precompressed /api/articles/ bodies. Install the optional
+# "brotli" package to also store brotli variants.
+RESPONSE_CACHE_TIMEOUT = int(os.getenv("RESPONSE_CACHE_TIMEOUT", "3600"))
+RESPONSE_CACHE_LOCK_TIMEOUT = int(os.getenv("RESPONSE_CACHE_LOCK_TIMEOUT", "10"))
+
+# Items per RSS/Atom feed (news.feeds); feeds share the response cache.
+FEED_ITEMS = int(os.getenv("FEED_ITEMS", "50"))
+
+# /api/feed/ only includes approvals older than this, so an approval
+# still being committed cannot land behind a reader's cursor.
+FEED_SETTLE_SECONDS = float(os.getenv("FEED_SETTLE_SECONDS", "2"))
+
+
+# ----------------------------------
+# 🔹 ARTICLE CHANGE LOG
+# ----------------------------------
+# /api/changes/ holds back entries younger than this so concurrent
+# transactions cannot commit a lower seq behind a consumer's cursor.
+
+CHANGELOG_SETTLE_SECONDS = float(os.getenv("CHANGELOG_SETTLE_SECONDS", "2"))
+
+
+# ----------------------------------
+# 🔹 NOTIFICATION STREAM (SSE)
+# ----------------------------------
+# Other worker processes' notifications are picked up by polling every
+# SSE_POLL_INTERVAL seconds; idle streams get a heartbeat comment.
+
+SSE_POLL_INTERVAL = float(os.getenv("SSE_POLL_INTERVAL", "5"))
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", "100"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "5000"))
+
+
+# ----------------------------------
+# 🔹 NOTIFICATION DIGESTS
+# ----------------------------------
+# Readers in "digest" mode get one notification per journalist/publisher
+# per window, keeping the ids of its latest articles.
+
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv("NOTIFICATION_DIGEST_WINDOW", "60"))  # minutes
+NOTIFICATION_DIGEST_MAX_IDS = int(os.getenv("NOTIFICATION_DIGEST_MAX_IDS", "10"))
+
+
+# ----------------------------------
+# 🔹 ARTICLE IMAGES
+# ----------------------------------
+# Thumbnails are rendered in a pool of THUMBNAIL_WORKERS processes per
+# server worker; sizes map a label to the longest edge in px. After
+# changing the sizes run "python manage.py generate_thumbnails".
+
+THUMBNAIL_SIZES = {
+    "small": 160,
+    "medium": 480,
+    "large": 1024,
+}
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+
+# ----------------------------------
+# 🔹 STATIC HTML EXPORT
+# ----------------------------------
+# Written by "manage.py export_static"; point the web server at it, e.g.
+# nginx "try_files /read/$id/index.html @django".
+
+STATIC_EXPORT_DIR = Path(os.getenv("STATIC_EXPORT_DIR", BASE_DIR / "static_export"))
+
+
+# ----------------------------------
+# 🔹 TEMPLATE WARM-UP
+# ----------------------------------
+# Compile every project template when the WSGI/ASGI application loads,
+# so the first request of a new worker doesn't parse them.
+
+TEMPLATE_WARM_UP = os.getenv("TEMPLATE_WARM_UP", "1") == "1"
+
+
+# ----------------------------------
+# 🔹 ADMISSION CONTROL
+# ----------------------------------
+# Per-worker-process concurrency limits (see news.admission).
+# ADMISSION_MAX_IN_FLIGHT defaults to the worker's request threads
+# (serve --threads); ADMISSION_RESERVED of those slots are kept for
+# editor/journalist writes. View limits are shares of the process limit.
+# Requests that wait longer than the timeout (seconds) get a 503 with
+# Retry-After.
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "1") == "1"
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "0")) or None
+ADMISSION_RESERVED = int(os.getenv("ADMISSION_RESERVED", "1"))
+ADMISSION_LIMITS = {
+    "dashboard": 0.5,
+    "read_article": 0.75,
+    "home": 0.75,
+    "api_feed": 0.5,
+    "api_reader_articles": 0.5,
+    "api_analytics": 0.25,
+    "feed_rss": 0.5,
+    "feed_atom": 0.5,
+}
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "0.5"))
+ADMISSION_PRIORITY_TIMEOUT = float(os.getenv("ADMISSION_PRIORITY_TIMEOUT", "5"))
+ADMISSION_PRIORITY_VIEWS = [
+    "create_article",
+    "update_article",
+    "delete_article",
+    "approve_article",
+    "approve_newsletter",
+]
+ADMISSION_PRIORITY_ROLES = ["editor", "journalist"]
+ADMISSION_EXEMPT_VIEWS = ["metrics", "notification_stream"]
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+
+
+# ----------------------------------
+# 🔹 RATE LIMITS
+# ----------------------------------
+# "count/period" per client key (see news.ratelimit); period is s, m, h or
+# d with an optional multiplier such as "15m". Counters live in the cache,
+# so use a shared cache to limit across worker processes ("serve" warns
+# otherwise). Failed logins are also counted per username. Behind a proxy
+# set RATELIMIT_TRUST_FORWARDED=1 to key by X-Forwarded-For.
+
+RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "1") == "1"
+RATELIMIT_TRUST_FORWARDED = os.getenv("RATELIMIT_TRUST_FORWARDED", "0") == "1"
+RATE_LIMITS = {
+    "login": os.getenv("RATE_LIMIT_LOGIN", "10/m"),
+    "register": os.getenv("RATE_LIMIT_REGISTER", "5/h"),
+    "subscribe": os.getenv("RATE_LIMIT_SUBSCRIBE", "30/m"),
+}
+
+
+# ----------------------------------
+# 🔹 IDEMPOTENCY KEYS
+# ----------------------------------
+# Seconds a response stays replayable for retries carrying the same
+# Idempotency-Key; expired keys are deleted by "manage.py
+# prune_idempotency_keys".
+
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+
+# Seconds a claim of a request still running holds its key. A claim left
+# by a killed worker is taken over by a retry after this; keep it above
+# the longest request (serve's graceful timeout is 30 seconds).
+IDEMPOTENCY_LEASE = int(os.getenv("IDEMPOTENCY_LEASE", "300"))
@@ -14,9 +14,15 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+import re
+
+from django.conf import settings
 from django.contrib import admin
-from django.urls import path, include
-from django.contrib.auth.views import LogoutView
+from django.urls import path, include, re_path
+from django.contrib.auth.views import LoginView, LogoutView
+
+from news.ratelimit import by_field, failed_login, ratelimit
+from news.views import media_file
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -24,6 +30,22 @@ urlpatterns = [
     path(
         'logout/', LogoutView.as_view(next_page='home'), name='logout'
         ),  # redirect to home
+    path(
+        'accounts/login/',
+        ratelimit(
+            "login", keys=("ip",), failure_keys=(by_field("username"),), failed=failed_login
+        )(LoginView.as_view()),
+        name='login'
+        ),  # same view as below, rate limited
     path('accounts/', include(
         'django.contrib.auth.urls')),  # login/logout (login still works)
 ]
+
+if settings.SERVE_MEDIA:
+    # Unlike django.conf.urls.static.static(), also served with DEBUG off.
+    urlpatterns += [
+        re_path(
+            rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.*)$",
+            media_file, name='media'
+        ),
+    ]
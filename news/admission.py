@@ -0,0 +1,182 @@
+"""
+Admission control: per-URL-name concurrency limits for each worker process.
+
+Every request passes up to two gates: first its view's gate if its URL
+name is listed in ``ADMISSION_LIMITS``, then the process-wide gate of
+``ADMISSION_MAX_IN_FLIGHT`` requests, so requests over their view's
+limit never hold a process-wide slot while they wait. A request that
+cannot get a slot within ``ADMISSION_QUEUE_TIMEOUT`` seconds is answered
+with a 503 and a ``Retry-After`` header instead of queueing behind the
+overload. Views in ``ADMISSION_EXEMPT_VIEWS`` (metrics, the long-lived
+notification stream) are never held back.
+
+The serving threads bound what is in flight anyway, so the process-wide
+limit defaults to the worker's request threads (``serve --threads``,
+registered by news.server through ``configure``) and view limits given
+as floats are shares of it: with 4 threads and 1 reserved slot, reads
+hold at most 3 threads and a view limited to 0.5 at most 2.
+
+Priority requests are the write views of ``ADMISSION_PRIORITY_VIEWS``
+made by a user whose role is in ``ADMISSION_PRIORITY_ROLES`` (editors
+and journalists creating or approving articles). They are admitted
+ahead of waiting normal requests, may wait ``ADMISSION_PRIORITY_TIMEOUT``
+seconds and are the only ones allowed into the last
+``ADMISSION_RESERVED`` slots of the process-wide gate, so a flood of
+reader traffic cannot starve them.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+
+# Request threads assumed outside ``manage.py serve`` (its default).
+DEFAULT_THREADS = 4
+
+
+class Gate:
+    """
+    Counting semaphore with a priority lane and reserved priority slots.
+    """
+
+    def __init__(self, limit, reserved=0):
+        self.limit = limit
+        self.reserved = min(reserved, max(limit - 1, 0))
+        self.in_flight = 0
+        self._waiting_priority = 0
+        self._condition = threading.Condition()
+
+    def _free(self, priority):
+        if priority:
+            return self.in_flight < self.limit
+        return (
+            self.in_flight < self.limit - self.reserved
+            and not self._waiting_priority
+        )
+
+    def acquire(self, priority=False, timeout=0):
+        """
+        Take a slot within timeout seconds; return whether one was taken.
+        """
+        admitted = False
+        with self._condition:
+            if priority:
+                self._waiting_priority += 1
+            try:
+                admitted = self._condition.wait_for(
+                    lambda: self._free(priority), timeout=timeout
+                )
+                if admitted:
+                    self.in_flight += 1
+                return admitted
+            finally:
+                if priority:
+                    self._waiting_priority -= 1
+                    if not admitted:
+                        self._condition.notify_all()
+
+    def release(self):
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+def _view_limit(limit, process_limit):
+    # Floats are shares of the process-wide limit, ints absolute counts.
+    if isinstance(limit, float):
+        return max(int(limit * process_limit), 1)
+    return min(limit, process_limit)
+
+
+class Admission:
+    """
+    The gates of one process, built from settings on first use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._global = None
+        self._views = {}
+        self.threads = None
+
+    def configure(self, threads):
+        """
+        Size the gates for a worker serving requests on threads threads.
+        """
+        self.threads = threads
+        self.reset()
+
+    def gates(self):
+        """
+        Return (process gate, {url name: gate}).
+        """
+        if self._global is None:
+            with self._lock:
+                if self._global is None:
+                    limit = (
+                        getattr(settings, "ADMISSION_MAX_IN_FLIGHT", None)
+                        or self.threads or DEFAULT_THREADS
+                    )
+                    self._views = {
+                        name: Gate(_view_limit(share, limit))
+                        for name, share in getattr(settings, "ADMISSION_LIMITS", {}).items()
+                    }
+                    self._global = Gate(limit, getattr(settings, "ADMISSION_RESERVED", 0))
+        return self._global, self._views
+
+    def reset(self):
+        with self._lock:
+            self._global = None
+            self._views = {}
+
+    def is_priority(self, request, view):
+        if view not in getattr(settings, "ADMISSION_PRIORITY_VIEWS", ()):
+            return False
+        user = getattr(request, "user", None)
+        return getattr(user, "role", None) in getattr(settings, "ADMISSION_PRIORITY_ROLES", ())
+
+    def enter(self, view, priority):
+        """
+        Acquire the gates for a request; return them, or None if refused.
+        """
+        timeout = getattr(
+            settings,
+            "ADMISSION_PRIORITY_TIMEOUT" if priority else "ADMISSION_QUEUE_TIMEOUT",
+            0,
+        )
+        deadline = time.monotonic() + timeout
+        process_gate, view_gates = self.gates()
+        acquired = []
+        for gate in (view_gates.get(view), process_gate):
+            if gate is None:
+                continue
+            if not gate.acquire(priority, max(deadline - time.monotonic(), 0)):
+                self.leave(acquired)
+                return None
+            acquired.append(gate)
+        return acquired
+
+    def leave(self, gates):
+        for gate in reversed(gates):
+            gate.release()
+
+    def in_flight(self):
+        """
+        Return [(labels, requests in flight)] for the metrics gauge.
+        """
+        process_gate, view_gates = self.gates()
+        return [({"view": "*"}, process_gate.in_flight)] + [
+            ({"view": name}, gate.in_flight) for name, gate in view_gates.items()
+        ]
+
+    def limits(self):
+        """
+        Return [(labels, limit)] for the metrics gauge.
+        """
+        process_gate, view_gates = self.gates()
+        return [({"view": "*"}, process_gate.limit)] + [
+            ({"view": name}, gate.limit) for name, gate in view_gates.items()
+        ]
+
+
+admission = Admission()
@@ -0,0 +1,133 @@
+"""
+Editor analytics computed from the daily rollups (news.rollups).
+
+Rollup rows are loaded once into dense day-indexed NumPy arrays, one
+row per publisher; moving averages and growth rates are computed on
+whole arrays with cumulative sums.
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+from .models import DailyPublisherStats, DailyStats, Publisher
+
+SITE_SERIES = ("articles_created", "articles_approved", "notifications")
+PUBLISHER_SERIES = ("articles_approved", "new_subscribers", "subscribers")
+
+
+def moving_average(values, window):
+    """
+    Trailing mean over the last ``window`` days along the last axis.
+
+    The first days average over the days available so far.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    days = values.shape[-1]
+    sums = np.concatenate(
+        [np.zeros(values.shape[:-1] + (1,)), np.cumsum(values, axis=-1)], axis=-1
+    )
+    ends = np.arange(1, days + 1)
+    starts = np.maximum(ends - window, 0)
+    return (sums[..., ends] - sums[..., starts]) / (ends - starts)
+
+
+def growth(values, window):
+    """
+    Relative change of the last window's total over the window before it.
+
+    NaN where the earlier window is empty or not fully covered.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] < 2 * window:
+        return np.full(values.shape[:-1], np.nan)
+    current = values[..., -window:].sum(axis=-1)
+    previous = values[..., -2 * window:-window].sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(previous > 0, (current - previous) / previous, np.nan)
+
+
+def level_growth(values, window):
+    """
+    Relative change of a level (e.g. subscriber count) over window days.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if values.shape[-1] <= window:
+        return np.full(values.shape[:-1], np.nan)
+    before = values[..., -window - 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(before > 0, (values[..., -1] - before) / before, np.nan)
+
+
+def _offsets(days, start):
+    return (np.array(days, dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+
+
+def _rounded(array):
+    return [None if np.isnan(value) else round(value, 4) for value in array.tolist()]
+
+
+def report(days=90, window=7):
+    """
+    Return the analytics of the last ``days`` rolled-up days.
+    """
+    end = DailyStats.objects.order_by("-day").values_list("day", flat=True).first()
+    if end is None:
+        return {"days": [], "window": window, "series": {}, "publishers": []}
+    start = end - timedelta(days=days - 1)
+    length = days
+
+    site = np.zeros((len(SITE_SERIES), length))
+    rows = list(
+        DailyStats.objects.filter(day__gte=start, day__lte=end)
+        .values_list("day", *SITE_SERIES)
+    )
+    if rows:
+        columns = list(zip(*rows))
+        site[:, _offsets(columns[0], start)] = np.array(columns[1:], dtype=np.float64)
+
+    publishers = list(Publisher.objects.order_by("id").values_list("id", "name"))
+    publisher_ids = np.array([pid for pid, _ in publishers], dtype=np.int64)
+    per_publisher = np.zeros((len(PUBLISHER_SERIES), len(publishers), length))
+    rows = list(
+        DailyPublisherStats.objects.filter(day__gte=start, day__lte=end)
+        .values_list("publisher_id", "day", *PUBLISHER_SERIES)
+    )
+    if rows and len(publishers):
+        columns = list(zip(*rows))
+        row_index = np.searchsorted(publisher_ids, np.array(columns[0], dtype=np.int64))
+        per_publisher[:, row_index, _offsets(columns[1], start)] = np.array(
+            columns[2:], dtype=np.float64
+        )
+
+    site_average = moving_average(site, window)
+    site_growth = growth(site, window)
+
+    approved, new_subscribers, subscribers = per_publisher
+    subscriber_average = moving_average(new_subscribers, window)
+    subscriber_growth = level_growth(subscribers, window)
+
+    return {
+        "days": [str(start + timedelta(days=i)) for i in range(length)],
+        "window": window,
+        "series": {
+            name: {
+                "values": site[i].astype(int).tolist(),
+                "moving_average": _rounded(site_average[i]),
+                "growth": _rounded(site_growth[i:i + 1])[0],
+            }
+            for i, name in enumerate(SITE_SERIES)
+        },
+        "publishers": [
+            {
+                "id": pid,
+                "name": name,
+                "articles_approved": approved[i].astype(int).tolist(),
+                "new_subscribers": new_subscribers[i].astype(int).tolist(),
+                "new_subscribers_moving_average": _rounded(subscriber_average[i]),
+                "subscribers": subscribers[i].astype(int).tolist(),
+                "subscriber_growth": _rounded(subscriber_growth[i:i + 1])[0],
+            }
+            for i, (pid, name) in enumerate(publishers)
+        ],
+    }
@@ -1,13 +1,169 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import BasePermission, IsAuthenticated
 from rest_framework.response import Response
-from .models import Article
-from .serializers import ArticleSerializer
+from .models import Article, ArticleChange
+from .serializers import ArticleChangeSerializer, ArticleSerializer
+from .fieldsets import narrow_queryset, parse_fieldset
+from . import analytics, feed
 
 
 class ReaderArticlesAPI(APIView):
+    """
+    Approved articles for authenticated readers.
+
+    Supports ?fields=, ?exclude= and ?expand= (see news.fieldsets).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        fields, exclude, expand = parse_fieldset(request.query_params)
+        articles = narrow_queryset(
+            Article.objects.filter(approved=True), fields, exclude, expand
+        )
+        return Response(ArticleSerializer(
+            articles, many=True, fields=fields, exclude=exclude, expand=expand
+        ).data)
+
+
+class ReaderFeedAPI(APIView):
+    """
+    Incremental feed of articles from followed journalists and publishers.
+
+    Without ?since= the newest articles are returned. With
+    ?since=<cursor> only articles approved after the cursor are returned,
+    oldest first, together with the cursor to poll with next. When there
+    is nothing new the response is an empty 204, which the reader's
+    last-activity marker usually answers without a database query.
+    Approvals show up once they are FEED_SETTLE_SECONDS old.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        articles = Article.objects.filter(approved=True)
-        return Response(ArticleSerializer(articles, many=True).data)
+        try:
+            limit = min(max(int(request.query_params.get("limit", 20)), 1), 100)
+        except ValueError:
+            limit = 20
+
+        until = feed.horizon()
+        articles = feed.followed_articles(request.user, until)
+        since = request.query_params.get("since")
+
+        if since:
+            try:
+                approved_at, article_id = feed.decode_cursor(since)
+            except feed.InvalidCursor:
+                return Response({"since": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+            marker = feed.get_marker(request.user.id)
+            if marker is not None and marker <= approved_at.timestamp():
+                return Response(status=status.HTTP_204_NO_CONTENT)
+
+            page = list(
+                feed.newer_than(articles, approved_at, article_id)
+                .select_related("created_by", "publisher")
+                .order_by("approved_at", "id")[:limit + 1]
+            )
+            if not page:
+                feed.remember_idle(request.user.id, approved_at)
+                return Response(status=status.HTTP_204_NO_CONTENT)
+
+            has_more = len(page) > limit
+            page = page[:limit]
+            newest = page[-1]
+        else:
+            page = list(
+                articles.select_related("created_by", "publisher")
+                .order_by("-approved_at", "-id")[:limit]
+            )
+            has_more = False
+            newest = page[0] if page else None
+
+        if newest is not None:
+            next_cursor = feed.encode_cursor(newest.approved_at, newest.id)
+        else:
+            next_cursor = feed.encode_cursor(until, 0)
+
+        return Response({
+            "articles": ArticleSerializer(page, many=True).data,
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        })
+
+
+class IsEditorOrStaff(BasePermission):
+    """
+    Allow editors and staff users.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(
+            user and user.is_authenticated
+            and (user.is_staff or user.role == "editor")
+        )
+
+
+class ArticleChangesAPI(APIView):
+    """
+    Change-data-capture feed of article creates, updates, approvals and deletes.
+
+    Returns entries with seq greater than ?after= (default 0), up to
+    ?limit= (default 100, at most 1000), in seq order. Deletes carry
+    "data": null. Entries younger than CHANGELOG_SETTLE_SECONDS are held
+    back so a consumer never skips a lower seq still being committed.
+    """
+    permission_classes = [IsEditorOrStaff]
+
+    def get(self, request):
+        try:
+            after = int(request.query_params.get("after", 0))
+            limit = min(max(int(request.query_params.get("limit", 100)), 1), 1000)
+        except ValueError:
+            return Response(
+                {"detail": "after and limit must be integers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        settle = getattr(settings, "CHANGELOG_SETTLE_SECONDS", 2)
+        changes = list(
+            ArticleChange.objects.filter(
+                seq__gt=after,
+                created_at__lte=timezone.now() - timedelta(seconds=settle)
+            ).order_by("seq")[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        return Response({
+            "changes": ArticleChangeSerializer(changes, many=True).data,
+            "next_after": changes[-1].seq if changes else after,
+            "has_more": has_more,
+        })
+
+
+class EditorAnalyticsAPI(APIView):
+    """
+    Daily activity, moving averages and growth rates for editors.
+
+    Reads only the rollup tables maintained by ``manage.py rollup``.
+    ?days= (default 90, at most 730) sets the range ending at the last
+    rolled-up day, ?window= (default 7) the averaging window.
+    """
+    permission_classes = [IsEditorOrStaff]
+
+    def get(self, request):
+        try:
+            days = min(max(int(request.query_params.get("days", 90)), 1), 730)
+            window = min(max(int(request.query_params.get("window", 7)), 1), days)
+        except ValueError:
+            return Response(
+                {"detail": "days and window must be integers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(analytics.report(days=days, window=window))
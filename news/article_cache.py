@@ -0,0 +1,58 @@
+"""
+Shared cache of serialized approved articles.
+
+The article detail and batch endpoints read the default
+``ArticleSerializer`` representation of each article from here, so hot
+articles are served without touching the database and a batch only
+queries the ids that missed. Entries are dropped by the ``Article``
+save/delete signals in news.signals. The buffered view counter writes
+with a queryset update, so cached ``views`` may lag until the next edit.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+from .models import Article
+from .serializers import ArticleSerializer
+
+KEY = "article:v1:{}"
+
+
+def _timeout():
+    return getattr(settings, "ARTICLE_CACHE_TIMEOUT", 300)
+
+
+def get_many(article_ids):
+    """
+    Return {id: serialized article} for the approved articles among ids.
+    """
+    keys = {KEY.format(article_id): article_id for article_id in article_ids}
+    found = {keys[key]: data for key, data in cache.get_many(keys).items()}
+    missing = [article_id for article_id in article_ids if article_id not in found]
+
+    metrics.record_cache("article", True, len(found))
+    metrics.record_cache("article", False, len(missing))
+
+    if missing:
+        loaded = {
+            article.id: ArticleSerializer(article).data
+            for article in Article.objects.filter(approved=True, id__in=missing)
+        }
+        cache.set_many(
+            {KEY.format(article_id): data for article_id, data in loaded.items()},
+            timeout=_timeout(),
+        )
+        found.update(loaded)
+    return found
+
+
+def get(article_id):
+    """
+    Return one serialized approved article, or None.
+    """
+    return get_many([article_id]).get(article_id)
+
+
+def invalidate(article_id):
+    cache.delete(KEY.format(article_id))
@@ -0,0 +1,24 @@
+"""
+Change-data-capture log for articles.
+
+Views call ``record`` inside the same transaction as the article write,
+so a change entry exists exactly when the write it describes committed.
+Consumers read the log in ``seq`` order and keep the last ``seq`` they
+applied.
+"""
+
+from .models import ArticleChange
+from .serializers import ArticleSerializer
+
+
+def record(article, action):
+    """
+    Append a change entry; deletes are stored as tombstones.
+
+    For deletes, call this before ``article.delete()`` while the id is set.
+    """
+    return ArticleChange.objects.create(
+        article_id=article.id,
+        action=action,
+        data=None if action == "delete" else ArticleSerializer(article).data,
+    )
@@ -0,0 +1,190 @@
+"""
+Buffered view counters for articles.
+
+Reading an article must not cost a row write. Each view is added to an
+in-process buffer keyed by article id and mirrored into a shared cache
+counter so every worker can see views that have not reached the
+database yet. The buffer is written out with a single batched
+``UPDATE ... SET views = views + CASE id WHEN ... END`` per flush.
+
+Flushes happen on the next recorded view once due, at process exit, and
+in server workers (``manage.py serve``) from a timer thread, so views of
+articles that are not read again still reach the database in time.
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "article_views:pending:{}"
+
+
+def _shared_incr(article_id, delta):
+    """
+    Add delta to the shared pending counter of an article.
+    """
+    key = PENDING_KEY.format(article_id)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        if delta < 0:
+            return
+        if not cache.add(key, delta, timeout=None):
+            cache.incr(key, delta)
+
+
+def pending_views(article_ids):
+    """
+    Return {article_id: views not yet flushed by any worker}.
+    """
+    keys = {PENDING_KEY.format(article_id): article_id for article_id in article_ids}
+    found = cache.get_many(keys)
+    return {keys[key]: max(count, 0) for key, count in found.items()}
+
+
+class ViewCounterBuffer:
+    """
+    Aggregates article views in memory and flushes them in batches.
+
+    A flush happens when ``flush_interval`` seconds have passed since
+    the previous one or when ``max_pending`` distinct articles are
+    waiting, whichever comes first.
+    """
+
+    def __init__(self, flush_interval=None, max_pending=None):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._flusher_pid = None
+        self._flusher = None
+        self._stop = threading.Event()
+
+    def _limits(self):
+        interval = self.flush_interval
+        if interval is None:
+            interval = getattr(settings, "VIEW_COUNTER_FLUSH_INTERVAL", 30)
+        max_pending = self.max_pending
+        if max_pending is None:
+            max_pending = getattr(settings, "VIEW_COUNTER_MAX_PENDING", 500)
+        return interval, max_pending
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record(self, article_id, count=1):
+        """
+        Count a view of an article, flushing if the buffer is due.
+        """
+        interval, max_pending = self._limits()
+
+        with self._lock:
+            self._pending[article_id] = self._pending.get(article_id, 0) + count
+            due = (
+                len(self._pending) >= max_pending
+                or time.monotonic() - self._last_flush >= interval
+            )
+
+        _shared_incr(article_id, count)
+
+        if due:
+            self.flush()
+
+    def start_flusher(self):
+        """
+        Flush from a daemon thread whenever the buffer is due.
+        """
+        with self._lock:
+            # A forked worker inherits the flag but not the thread.
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+            self._stop.clear()
+            self._flusher = threading.Thread(
+                target=self._flush_when_due, name="view-counter-flush", daemon=True
+            )
+        self._flusher.start()
+
+    def stop_flusher(self, timeout=None):
+        """
+        Stop the thread started by start_flusher and wait for it.
+        """
+        with self._lock:
+            flusher, self._flusher, self._flusher_pid = self._flusher, None, None
+        if flusher is not None:
+            self._stop.set()
+            flusher.join(timeout)
+
+    def _flush_when_due(self):
+        while True:
+            interval, _ = self._limits()
+            if self._stop.wait(max(self._last_flush + interval - time.monotonic(), 0.5)):
+                return
+            if not self._pending or time.monotonic() - self._last_flush < interval:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Could not flush article view counters")
+            finally:
+                connection.close()
+
+    def flush(self):
+        """
+        Write all buffered views with one UPDATE statement.
+
+        Returns the number of articles updated. On a database error the
+        counts are put back into the buffer for the next flush.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+
+        if not pending:
+            return 0
+
+        from .models import Article
+
+        increments = Case(
+            *[When(id=article_id, then=Value(count))
+              for article_id, count in pending.items()],
+            default=Value(0),
+            output_field=PositiveIntegerField(),
+        )
+
+        try:
+            Article.objects.filter(id__in=pending).update(
+                views=F("views") + increments
+            )
+        except DatabaseError:
+            logger.exception("Could not flush %d article view counters", len(pending))
+            with self._lock:
+                for article_id, count in pending.items():
+                    self._pending[article_id] = self._pending.get(article_id, 0) + count
+            return 0
+
+        for article_id, count in pending.items():
+            _shared_incr(article_id, -count)
+
+        return len(pending)
+
+
+view_counter = ViewCounterBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception("Could not flush article view counters on exit")
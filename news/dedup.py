@@ -0,0 +1,211 @@
+"""
+Near-duplicate detection for submitted articles.
+
+Each article gets a MinHash signature over word shingles of its title
+and content. The signature is split into bands and every band is hashed
+into an ``LSHBucket`` row, so finding likely duplicates is one indexed
+lookup of the new article's buckets followed by a vectorized signature
+comparison against the few candidates, never a scan of the table.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Article, ArticleSignature, DuplicateFlag, LSHBucket
+
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+SHINGLE_SIZE = 3
+
+# Smallest prime above 2**32. Multipliers stay below 2**32 so that
+# a * x never overflows uint64 for 32-bit shingle hashes x.
+PRIME = np.uint64(4294967311)
+
+_random = np.random.default_rng(20260219)
+_A = _random.integers(1, 2**32, size=NUM_PERMUTATIONS, dtype=np.uint64)
+_B = _random.integers(0, int(PRIME), size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+WORD_RE = re.compile(r"\w+")
+
+
+def _threshold():
+    return getattr(settings, "DUPLICATE_SIMILARITY_THRESHOLD", 0.8)
+
+
+def shingles(title, content):
+    """
+    Return the 32-bit hashes of the word shingles of an article.
+    """
+    words = WORD_RE.findall(f"{title} {content}".lower())
+    if len(words) < SHINGLE_SIZE:
+        grams = {" ".join(words)}
+    else:
+        grams = {
+            " ".join(words[i:i + SHINGLE_SIZE])
+            for i in range(len(words) - SHINGLE_SIZE + 1)
+        }
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode(), digest_size=4).digest(), "little")
+         for g in grams),
+        dtype=np.uint64, count=len(grams)
+    )
+
+
+def signature(title, content):
+    """
+    Return the MinHash signature of an article as a uint32 array.
+    """
+    hashes = shingles(title, content)
+    permuted = ((_A[:, None] * hashes[None, :]) % PRIME + _B[:, None]) % PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+
+def band_buckets(minhash):
+    """
+    Return one signed 64-bit bucket hash per band of a signature.
+    """
+    bands = minhash.reshape(BANDS, ROWS_PER_BAND)
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(),
+                       "little", signed=True)
+        for band in bands
+    ]
+
+
+def similarity(minhash, others):
+    """
+    Estimate Jaccard similarity of one signature against a stack of others.
+    """
+    return (others == minhash).mean(axis=1)
+
+
+def _unpack(data):
+    return np.frombuffer(bytes(data), dtype=np.uint32)
+
+
+def register(article):
+    """
+    Store an article's signature and buckets and flag likely duplicates.
+
+    Each likely pair is flagged on the later article, as at submission.
+    Re-registering an edited article replaces every flag it is part of.
+    Returns the DuplicateFlag rows created.
+    """
+    minhash = signature(article.title, article.content)
+    buckets = band_buckets(minhash)
+
+    matches = Q()
+    for band, bucket in enumerate(buckets):
+        matches |= Q(band=band, bucket=bucket)
+    candidates = set(
+        LSHBucket.objects.filter(matches)
+        .exclude(article_id=article.id)
+        .values_list("article_id", flat=True)
+    )
+
+    flags = []
+    if candidates:
+        rows = list(
+            ArticleSignature.objects.filter(article_id__in=candidates)
+            .values_list("article_id", "minhash")
+        )
+        others = np.stack([_unpack(data) for _, data in rows])
+        scores = similarity(minhash, others)
+        threshold = _threshold()
+        flags = [
+            DuplicateFlag(article=article, duplicate_of_id=other, similarity=float(score))
+            if other < article.id else
+            DuplicateFlag(article_id=other, duplicate_of=article, similarity=float(score))
+            for (other, _), score in zip(rows, scores) if score >= threshold
+        ]
+
+    with transaction.atomic():
+        ArticleSignature.objects.update_or_create(
+            article=article, defaults={"minhash": minhash.tobytes()}
+        )
+        LSHBucket.objects.filter(article=article).delete()
+        LSHBucket.objects.bulk_create([
+            LSHBucket(article=article, band=band, bucket=bucket)
+            for band, bucket in enumerate(buckets)
+        ])
+        DuplicateFlag.objects.filter(Q(article=article) | Q(duplicate_of=article)).delete()
+        DuplicateFlag.objects.bulk_create(flags, ignore_conflicts=True)
+
+    return flags
+
+
+def backfill(batch_size=500, rebuild=False):
+    """
+    Compute signatures for articles that lack one and flag duplicates.
+
+    Articles are processed in id order and each is compared only with
+    earlier ones, matching what submission-time detection would flag.
+    Returns (articles signed, flags created).
+    """
+    if rebuild:
+        with transaction.atomic():
+            ArticleSignature.objects.all().delete()
+            LSHBucket.objects.all().delete()
+
+    index = {}
+    signatures = {}
+    for article_id, data in ArticleSignature.objects.values_list("article_id", "minhash"):
+        minhash = _unpack(data)
+        signatures[article_id] = minhash
+        for band, bucket in enumerate(band_buckets(minhash)):
+            index.setdefault((band, bucket), []).append(article_id)
+
+    pending = (
+        Article.objects.filter(signature__isnull=True)
+        .order_by("id")
+        .values_list("id", "title", "content")
+    )
+    threshold = _threshold()
+    signed = flagged = 0
+
+    while True:
+        rows = list(pending[:batch_size])
+        if not rows:
+            break
+        new_signatures, new_buckets, flags = [], [], []
+
+        for article_id, title, content in rows:
+            minhash = signature(title, content)
+            buckets = band_buckets(minhash)
+
+            candidates = sorted({
+                other for band, bucket in enumerate(buckets)
+                for other in index.get((band, bucket), ())
+                if other < article_id
+            })
+            if candidates:
+                scores = similarity(minhash, np.stack([signatures[c] for c in candidates]))
+                flags.extend(
+                    DuplicateFlag(article_id=article_id, duplicate_of_id=other,
+                                  similarity=float(score))
+                    for other, score in zip(candidates, scores) if score >= threshold
+                )
+
+            signatures[article_id] = minhash
+            for band, bucket in enumerate(buckets):
+                index.setdefault((band, bucket), []).append(article_id)
+                new_buckets.append(LSHBucket(article_id=article_id, band=band, bucket=bucket))
+            new_signatures.append(
+                ArticleSignature(article_id=article_id, minhash=minhash.tobytes())
+            )
+
+        with transaction.atomic():
+            ArticleSignature.objects.bulk_create(new_signatures)
+            LSHBucket.objects.bulk_create(new_buckets, batch_size=1000)
+            DuplicateFlag.objects.bulk_create(flags, ignore_conflicts=True)
+
+        signed += len(new_signatures)
+        flagged += len(flags)
+
+    return signed, flagged
@@ -0,0 +1,107 @@
+"""
+Incremental article feed for polling readers.
+
+Feed positions are opaque cursors over ``(approved_at, id)``. Each
+reader has a last-activity marker in the cache holding the approval
+time of the newest article from anyone they follow; approvals update
+the markers of the author's and publisher's followers once the
+transaction commits. A poll whose cursor is at or past the marker is
+answered "nothing new" without querying the database.
+
+approved_at is stamped before the approving transaction commits, so an
+approval can become visible after a later one. Feeds only reach up to
+``FEED_SETTLE_SECONDS`` ago (see ``horizon``), so a cursor never passes
+an approval that is still being committed.
+"""
+
+import base64
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Article, Subscription
+
+MARKER_KEY = "feed:reader:{}"
+MARKER_TIMEOUT = 7 * 24 * 3600
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised for a cursor that was not produced by encode_cursor.
+    """
+
+
+def encode_cursor(approved_at, article_id):
+    raw = f"{approved_at.isoformat()}|{article_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Return (approved_at, article id) from a cursor string.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        stamp, article_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(stamp), int(article_id)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise InvalidCursor(str(exc)) from exc
+
+
+def get_marker(reader_id):
+    return cache.get(MARKER_KEY.format(reader_id))
+
+
+def touch_followers(article):
+    """
+    Advance the markers of readers following an article's source.
+    """
+    sources = Q(journalist_id=article.created_by_id)
+    if article.publisher_id:
+        sources |= Q(publisher_id=article.publisher_id)
+
+    reader_ids = set(
+        Subscription.objects.filter(sources).values_list("reader_id", flat=True)
+    )
+    stamp = article.approved_at.timestamp()
+    cache.set_many(
+        {MARKER_KEY.format(reader_id): stamp for reader_id in reader_ids},
+        timeout=MARKER_TIMEOUT,
+    )
+
+
+def remember_idle(reader_id, approved_at):
+    """
+    Record that a reader has seen everything up to approved_at.
+
+    Uses add() so an approval that set the marker in the meantime wins.
+    """
+    cache.add(MARKER_KEY.format(reader_id), approved_at.timestamp(), timeout=MARKER_TIMEOUT)
+
+
+def horizon():
+    """
+    Return the newest approval time a feed may include.
+    """
+    return timezone.now() - timedelta(seconds=getattr(settings, "FEED_SETTLE_SECONDS", 2))
+
+
+def followed_articles(reader, until):
+    """
+    Return articles approved up to until from what a reader follows.
+    """
+    subscriptions = Subscription.objects.filter(reader=reader)
+    return Article.objects.filter(approved=True, approved_at__lte=until).filter(
+        Q(created_by__in=subscriptions.filter(journalist__isnull=False).values("journalist"))
+        | Q(publisher__in=subscriptions.filter(publisher__isnull=False).values("publisher"))
+    )
+
+
+def newer_than(queryset, approved_at, article_id):
+    return queryset.filter(
+        Q(approved_at__gt=approved_at)
+        | Q(approved_at=approved_at, id__gt=article_id)
+    )
@@ -0,0 +1,151 @@
+"""
+RSS and Atom feeds of approved articles: site-wide, per publisher and
+per journalist.
+
+Each feed holds the newest ``FEED_ITEMS`` articles, loaded with
+``.only()``. Rendered bodies are stored precompressed by
+news.response_cache under the global article version, which the
+``Article`` signals bump on approval and every edit. Responses carry the
+ETag and Last-Modified of the cached copy they were served from, so a
+polling aggregator gets a 304 without any database query.
+"""
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.views.decorators.http import condition
+
+from . import response_cache
+from .models import Article, Publisher, User
+
+
+def recent_articles(**filters):
+    """
+    Return the newest approved articles matching filters, feed fields only.
+    """
+    return (
+        Article.objects.filter(approved=True, **filters)
+        .select_related("created_by", "publisher")
+        .only(
+            "id", "title", "content", "created_at", "approved_at",
+            "created_by__username", "publisher__name",
+        )
+        .order_by("-approved_at", "-id")[:getattr(settings, "FEED_ITEMS", 50)]
+    )
+
+
+class LatestArticlesFeed(Feed):
+    """
+    RSS feed of the newest approved articles.
+    """
+
+    title = "News App: latest articles"
+    description = "Newly approved articles."
+
+    def link(self):
+        return reverse("home")
+
+    def items(self):
+        return recent_articles()
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.content
+
+    def item_link(self, item):
+        return reverse("read_article", args=[item.id])
+
+    def item_pubdate(self, item):
+        return item.approved_at or item.created_at
+
+    def item_author_name(self, item):
+        return item.created_by.username
+
+    def item_categories(self, item):
+        return [item.publisher.name] if item.publisher else []
+
+
+class PublisherArticlesFeed(LatestArticlesFeed):
+    """
+    RSS feed of a publisher's newest approved articles.
+    """
+
+    def get_object(self, request, publisher_id):
+        return get_object_or_404(Publisher, id=publisher_id)
+
+    def title(self, obj):
+        return f"News App: {obj.name}"
+
+    def description(self, obj):
+        return f"Newly approved articles under {obj.name}."
+
+    def items(self, obj):
+        return recent_articles(publisher=obj)
+
+
+class JournalistArticlesFeed(LatestArticlesFeed):
+    """
+    RSS feed of a journalist's newest approved articles.
+    """
+
+    def get_object(self, request, journalist_id):
+        return get_object_or_404(User, id=journalist_id, role="journalist")
+
+    def title(self, obj):
+        return f"News App: {obj.username}"
+
+    def description(self, obj):
+        return f"Newly approved articles by {obj.username}."
+
+    def items(self, obj):
+        return recent_articles(created_by=obj)
+
+
+class LatestArticlesAtomFeed(LatestArticlesFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestArticlesFeed.description
+
+
+class PublisherArticlesAtomFeed(PublisherArticlesFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+class JournalistArticlesAtomFeed(JournalistArticlesFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self.description(obj)
+
+
+def _etag(request, **kwargs):
+    return response_cache.etag(f"feed:{request.path}", response_cache.current_version())
+
+
+def _last_modified(request, **kwargs):
+    return response_cache.last_modified()
+
+
+def cached_feed(feed):
+    """
+    Wrap a Feed in the response cache and conditional GET handling.
+    """
+
+    @condition(etag_func=_etag, last_modified_func=_last_modified)
+    def view(request, **kwargs):
+        def render():
+            response = feed(request, **kwargs)
+            return response.content, response["Content-Type"]
+
+        return response_cache.serve(
+            request, render, namespace=f"feed:{request.path}", cache_name="feed",
+            validators=True,
+        )
+
+    return view
@@ -0,0 +1,89 @@
+"""
+Sparse fieldsets for the article API.
+
+Clients choose what they receive with ``?fields=a,b`` or ``?exclude=a,b``
+and inline related objects with ``?expand=created_by,publisher``. The
+same choice narrows the SQL: unused columns are deferred with
+``.only()`` and expanded relations are joined with ``select_related``.
+"""
+
+from rest_framework.exceptions import ValidationError
+
+from .models import Article
+from .serializers import ArticleSerializer
+
+ARTICLE_FIELDS = tuple(field.name for field in Article._meta.concrete_fields)
+
+EXPANDED_COLUMNS = {
+    "created_by": ("id", "username", "role"),
+    "publisher": ("id", "name"),
+}
+
+
+def _names(params, key, allowed):
+    raw = params.get(key, "")
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(allowed))
+    if unknown:
+        raise ValidationError({key: f"Unknown field(s): {', '.join(unknown)}"})
+    return names
+
+
+def parse_fieldset(params):
+    """
+    Return (fields, exclude, expand) from request query parameters.
+    """
+    fields = _names(params, "fields", ARTICLE_FIELDS)
+    exclude = _names(params, "exclude", ARTICLE_FIELDS)
+    expand = _names(params, "expand", ArticleSerializer.EXPANDABLE)
+
+    if fields:
+        fields = list(dict.fromkeys(fields + expand))
+    else:
+        exclude = [name for name in exclude if name not in expand]
+    return fields, exclude, expand
+
+
+def narrow_queryset(queryset, fields, exclude, expand):
+    """
+    Load only the columns the serialized fieldset needs.
+    """
+    wanted = [name for name in (fields or ARTICLE_FIELDS) if name not in exclude]
+    columns = {"id", *wanted}
+    for name in expand:
+        columns.discard(name)
+        columns.update(f"{name}__{column}" for column in EXPANDED_COLUMNS[name])
+
+    if expand:
+        queryset = queryset.select_related(*expand)
+    if columns != set(ARTICLE_FIELDS):
+        queryset = queryset.only(*columns)
+    return queryset
+
+
+def apply_fieldset(data, fields, exclude):
+    """
+    Narrow an already serialized article dict to a fieldset.
+    """
+    if fields:
+        data = {name: value for name, value in data.items() if name in fields}
+    return {name: value for name, value in data.items() if name not in exclude}
+
+
+class SparseFieldsetMixin:
+    """
+    Apply ?fields=, ?exclude= and ?expand= to a generic article view.
+    """
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = parse_fieldset(self.request.query_params)
+        return self._fieldset
+
+    def get_queryset(self):
+        return narrow_queryset(super().get_queryset(), *self.get_fieldset())
+
+    def get_serializer(self, *args, **kwargs):
+        fields, exclude, expand = self.get_fieldset()
+        kwargs.update(fields=fields, exclude=exclude, expand=expand)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,191 @@
+"""
+Idempotency keys for non-repeatable POST views.
+
+A client sends an ``Idempotency-Key`` header (or ``idempotency_key``
+form field; the article and newsletter forms carry one) with a POST to
+a view decorated with ``@idempotent``. The first request claims the key
+in ``IdempotencyKey``, whose unique index makes concurrent retries
+race-free, runs the view and stores the response. Retries within
+``IDEMPOTENCY_TTL`` seconds get the stored response back, marked with
+``Idempotent-Replayed: true``, without running the view again:
+
+- while the first request is still running: 409 with Retry-After;
+- with the same key but a different payload: 422.
+
+A claim is a lease of ``IDEMPOTENCY_LEASE`` seconds: a claim still
+without a response after that was left by a killed worker, and the next
+retry takes it over and runs the view.
+
+Server errors are not stored, so the request can be retried. Keys are
+scoped per user and view; ``manage.py prune_idempotency_keys`` deletes
+expired rows.
+"""
+
+import hashlib
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+FIELD = "idempotency_key"
+MAX_KEY_LENGTH = 255
+
+
+def new_key():
+    """
+    Return a fresh key for a form to submit.
+    """
+    return uuid.uuid4().hex
+
+
+def request_key(request):
+    """
+    Return the request's idempotency key, or None.
+    """
+    key = (request.META.get(HEADER) or request.POST.get(FIELD) or "").strip()
+    return key[:MAX_KEY_LENGTH] or None
+
+
+def fingerprint(request):
+    """
+    Hash of what the request asks for, to detect reuse of a key.
+    """
+    digest = hashlib.sha256(request.path.encode())
+    for name, values in sorted(request.POST.lists()):
+        if name != FIELD:
+            digest.update(repr((name, values)).encode())
+    for name, files in sorted(request.FILES.lists()):
+        digest.update(repr((name, [(f.name, f.size) for f in files])).encode())
+    return digest.hexdigest()
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_TTL", 86400))
+
+
+def _lease():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_LEASE", 300))
+
+
+def _take_over(row, digest, now):
+    """
+    Claim an abandoned claim row; return whether this request got it.
+    """
+    # created_at is the claim's version: only one retry can move it.
+    taken = IdempotencyKey.objects.filter(
+        pk=row.pk, status_code__isnull=True, created_at=row.created_at
+    ).update(fingerprint=digest, created_at=now, expires_at=now + _ttl())
+    if taken:
+        row.fingerprint, row.created_at, row.expires_at = digest, now, now + _ttl()
+    return bool(taken)
+
+
+def _claim(user, endpoint, key, digest):
+    """
+    Return (row, created): the live row for the key, or a new claim.
+    """
+    now = timezone.now()
+    lookup = {"user": user, "endpoint": endpoint, "key": key}
+    # Retries are the common case of a known key: one SELECT to replay.
+    row = IdempotencyKey.objects.filter(**lookup, expires_at__gt=now).first()
+    if row is not None:
+        if row.status_code is None and row.created_at <= now - _lease():
+            if _take_over(row, digest, now):
+                return row, True
+            # Another retry took it over first.
+            return _claim(user, endpoint, key, digest)
+        return row, False
+    try:
+        with transaction.atomic():
+            IdempotencyKey.objects.filter(**lookup, expires_at__lte=now).delete()
+            return IdempotencyKey.objects.create(
+                **lookup, fingerprint=digest, expires_at=now + _ttl()
+            ), True
+    except IntegrityError:
+        row = IdempotencyKey.objects.filter(**lookup).first()
+        if row is None:
+            # The competing claim failed and was dropped meanwhile.
+            return _claim(user, endpoint, key, digest)
+        return row, False
+
+
+def prune(batch_size=1000):
+    """
+    Delete expired keys in batches; return how many were deleted.
+    """
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
+
+
+def _replay(row):
+    response = HttpResponse(bytes(row.content), status=row.status_code)
+    for name, value in row.headers.items():
+        response[name] = value
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _conflict(message, status, retry_after=None):
+    response = HttpResponse(message, status=status, content_type="text/plain")
+    if retry_after:
+        response["Retry-After"] = str(retry_after)
+    return response
+
+
+def idempotent(view):
+    """
+    Replay the stored response to POSTs repeating an Idempotency-Key.
+    """
+    endpoint = view.__name__
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        key = request_key(request) if request.method == "POST" else None
+        if key is None or not request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        digest = fingerprint(request)
+        row, created = _claim(request.user, endpoint, key, digest)
+        if not created:
+            if row.fingerprint != digest:
+                return _conflict(
+                    "Idempotency-Key was already used with a different request.", 422
+                )
+            if row.status_code is None:
+                return _conflict("A request with this Idempotency-Key is in progress.", 409, 1)
+            return _replay(row)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except BaseException:
+            row.delete()
+            raise
+
+        if response.status_code >= 500 or response.streaming:
+            row.delete()
+            return response
+
+        row.status_code = response.status_code
+        row.headers = {
+            name: value for name, value in response.items()
+            if name.lower() not in ("set-cookie", "vary")
+        }
+        row.content = response.content
+        row.save(update_fields=["status_code", "headers", "content"])
+        return response
+
+    return wrapped
@@ -0,0 +1,160 @@
+"""
+Content-addressed storage of article images.
+
+An upload is stored once under the SHA-256 of its bytes, so the same
+file attached to many articles shares one ``ImageAsset``. Thumbnails
+(see news.thumbnails) are rendered after the upload's transaction
+commits, in a process pool of ``THUMBNAIL_WORKERS`` processes, so the
+request never waits for them; until they are recorded on the asset the
+original is served.
+
+The pool starts its processes with forkserver (spawn where that is not
+available): forking a threaded server process would copy its locks and
+database connections into the children.
+"""
+
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from .models import ImageAsset
+from .thumbnails import has_alpha, render
+
+FORMATS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+_pool = None
+
+
+def pool():
+    """
+    Return the process pool thumbnails are rendered in, starting it lazily.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=getattr(settings, "THUMBNAIL_WORKERS", 2),
+            mp_context=_context(),
+        )
+    return _pool
+
+
+def _context():
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def render_args(asset):
+    return (
+        default_storage.path(asset.file.name),
+        str(settings.MEDIA_ROOT),
+        asset.sha256,
+        settings.THUMBNAIL_SIZES,
+        getattr(settings, "THUMBNAIL_QUALITY", 80),
+    )
+
+
+def record_thumbnails(asset_ids):
+    """
+    Mark every configured thumbnail size of the assets as rendered.
+    """
+    ImageAsset.objects.filter(pk__in=asset_ids).update(
+        thumbnails=sorted(settings.THUMBNAIL_SIZES)
+    )
+
+
+def _rendered(asset_id, future):
+    # Runs on the pool's management thread, with its own connection.
+    if future.cancelled() or future.exception() is not None:
+        return
+    close_old_connections()
+    try:
+        record_thumbnails([asset_id])
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnails(asset):
+    """
+    Queue the thumbnails of asset for rendering once the transaction commits.
+    """
+    args = render_args(asset)
+
+    def submit():
+        pool().submit(render, *args).add_done_callback(partial(_rendered, asset.pk))
+
+    transaction.on_commit(submit)
+
+
+def _inspect(upload):
+    try:
+        with Image.open(upload) as image:
+            fmt, (width, height), alpha = image.format, image.size, has_alpha(image)
+            image.verify()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise ValidationError("Upload a valid image.")
+    finally:
+        upload.seek(0)
+    if fmt not in FORMATS:
+        raise ValidationError("Upload a JPEG, PNG, GIF or WebP image.")
+    return fmt, width, height, alpha
+
+
+def store_upload(upload):
+    """
+    Store an uploaded image unless identical bytes are already stored.
+
+    Returns its ImageAsset; raises ValidationError for non-images.
+    """
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    sha256 = digest.hexdigest()
+    upload.seek(0)
+
+    asset = ImageAsset.objects.filter(sha256=sha256).first()
+    if asset is None:
+        fmt, width, height, alpha = _inspect(upload)
+        name = f"images/{sha256[:2]}/{sha256}.{FORMATS[fmt]}"
+        if not default_storage.exists(name):
+            name = default_storage.save(name, upload)
+        asset, _ = ImageAsset.objects.get_or_create(
+            sha256=sha256,
+            defaults={
+                "file": name,
+                "format": fmt,
+                "width": width,
+                "height": height,
+                "has_alpha": alpha,
+                "size": upload.size,
+            },
+        )
+
+    schedule_thumbnails(asset)
+    return asset
+
+
+def generate_all(workers=None):
+    """
+    Render the missing thumbnails of every stored image.
+
+    Returns the number of files written.
+    """
+    assets = [
+        asset for asset in ImageAsset.objects.iterator()
+        if os.path.exists(default_storage.path(asset.file.name))
+    ]
+    if not assets:
+        return 0
+    jobs = [render_args(asset) for asset in assets]
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_context()) as executor:
+        written = sum(len(names) for names in executor.map(render, *zip(*jobs)))
+    record_thumbnails([asset.pk for asset in assets])
+    return written
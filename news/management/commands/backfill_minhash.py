@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from news.dedup import backfill
+
+
+class Command(BaseCommand):
+    """
+    Compute MinHash signatures for existing articles and flag duplicates.
+    """
+
+    help = "Backfill MinHash signatures and LSH buckets for all articles."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Articles signed per transaction.",
+        )
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Discard existing signatures and recompute every article.",
+        )
+
+    def handle(self, *args, **options):
+        signed, flagged = backfill(
+            batch_size=options["batch_size"], rebuild=options["rebuild"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Signed {signed} articles, flagged {flagged} likely duplicates."
+        ))
@@ -0,0 +1,65 @@
+import time
+import uuid
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+
+from news.ratelimit import hit, ratelimit
+
+
+def _view(request):
+    return HttpResponse("ok")
+
+
+class Command(BaseCommand):
+    """
+    Measure what the rate limiter adds to each request.
+    """
+
+    help = (
+        "Benchmark rate limiter overhead per request against the configured "
+        "cache backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=20000, help="Requests per run.")
+        parser.add_argument(
+            "--clients", type=int, default=100, help="Distinct client IPs to spread requests over."
+        )
+
+    def handle(self, *args, **options):
+        total, clients = options["requests"], options["clients"]
+        group = f"benchmark-{uuid.uuid4().hex[:8]}"
+        factory = RequestFactory()
+        requests = []
+        for i in range(total):
+            request = factory.post("/", REMOTE_ADDR=f"10.0.{i % clients // 256}.{i % clients % 256}")
+            request.user = AnonymousUser()
+            requests.append(request)
+
+        backend = type(caches["default"])
+        self.stdout.write(f"Cache backend: {backend.__module__}.{backend.__name__}")
+
+        started = time.perf_counter()
+        for i in range(total):
+            hit(f"{group}:{i % clients}", total, 60)
+        counter = (time.perf_counter() - started) / total
+
+        plain, limited = _view, ratelimit(group, keys=("ip",))(_view)
+        with override_settings(RATE_LIMITS={group: f"{total}/m"}, RATELIMIT_ENABLED=True):
+            timings = {}
+            for name, view in (("undecorated", plain), ("decorated", limited)):
+                started = time.perf_counter()
+                for request in requests:
+                    view(request)
+                timings[name] = (time.perf_counter() - started) / total
+
+        self.stdout.write(f"counter update (incr + get): {counter * 1e6:.1f} us")
+        for name, seconds in timings.items():
+            self.stdout.write(f"{name:<12} view call: {seconds * 1e6:.1f} us")
+        self.stdout.write(self.style.SUCCESS(
+            f"Limiter overhead: {(timings['decorated'] - timings['undecorated']) * 1e6:.1f} us per request."
+        ))
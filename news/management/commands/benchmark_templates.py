@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.urls import reverse
+
+from news.template_cache import reset_templates, warm_templates
+
+ROLES = ("reader", "journalist", "editor")
+
+
+class Command(BaseCommand):
+    """
+    Measure dashboard latency of a cold worker, a warmed one and steady state.
+    """
+
+    help = (
+        "Benchmark first-request versus steady-state latency of the home page "
+        "and each dashboard, with an empty template cache and after warm-up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rounds", type=int, default=5, help="First requests measured per page."
+        )
+        parser.add_argument(
+            "--requests", type=int, default=50, help="Steady-state requests per page."
+        )
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        users = [
+            User.objects.get_or_create(
+                username=f"template-benchmark-{role}",
+                defaults={"email": f"{role}@template-benchmark.invalid", "role": role},
+            )[0]
+            for role in ROLES
+        ]
+        try:
+            pages = [("home", Client(SERVER_NAME="localhost"), reverse("home"))]
+            for user in users:
+                client = Client(SERVER_NAME="localhost")
+                client.force_login(user)
+                pages.append((f"{user.role} dashboard", client, reverse("dashboard")))
+
+            self.stdout.write(f"{'page':<22} {'cold ms':>9} {'warmed ms':>10} {'steady ms':>10}")
+            for name, client, url in pages:
+                cold = self._first(client, url, options["rounds"], warm=False)
+                warmed = self._first(client, url, options["rounds"], warm=True)
+                steady = self._median(client, url, options["requests"])
+                self.stdout.write(f"{name:<22} {cold:9.2f} {warmed:10.2f} {steady:10.2f}")
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            "cold: first request with an empty template cache; warmed: first "
+            "request after warm_templates(); steady: median of later requests."
+        ))
+
+    def _request(self, client, url):
+        started = time.perf_counter()
+        response = client.get(url)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} answered {response.status_code}")
+        return elapsed
+
+    def _first(self, client, url, rounds, warm):
+        samples = []
+        for _ in range(rounds):
+            reset_templates()
+            if warm:
+                warm_templates()
+            samples.append(self._request(client, url))
+        return statistics.median(samples)
+
+    def _median(self, client, url, requests):
+        self._request(client, url)
+        return statistics.median(self._request(client, url) for _ in range(requests))
@@ -0,0 +1,79 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from news.thumbnails import render
+
+
+def _sample(path, edge, seed):
+    """
+    Write a photo-like JPEG: smooth gradients with noise.
+    """
+    gradient = Image.linear_gradient("L").resize((edge, edge))
+    radial = Image.radial_gradient("L").resize((edge, edge))
+    noise = Image.effect_noise((edge, edge), 32 + seed % 32)
+    Image.merge("RGB", (gradient, noise, radial)).save(path, "JPEG", quality=90)
+
+
+class Command(BaseCommand):
+    """
+    Measure thumbnail throughput of the process pool.
+    """
+
+    help = "Benchmark thumbnail generation in thumbnails per second per core."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=24, help="Source images.")
+        parser.add_argument(
+            "--edge", type=int, default=2400, help="Source image size in px."
+        )
+        parser.add_argument(
+            "--workers", default=None,
+            help="Comma-separated pool sizes to try (default: 1 and the CPU count).",
+        )
+
+    def handle(self, *args, **options):
+        cpus = os.cpu_count() or 1
+        if options["workers"]:
+            counts = [int(n) for n in options["workers"].split(",")]
+        else:
+            counts = sorted({1, cpus})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            sources = []
+            for i in range(options["images"]):
+                path = Path(tmp) / f"source-{i}.jpg"
+                _sample(path, options["edge"], i)
+                sources.append(str(path))
+
+            self.stdout.write(
+                f"{len(sources)} images of {options['edge']}px, "
+                f"sizes {settings.THUMBNAIL_SIZES}, {cpus} CPUs"
+            )
+            for workers in counts:
+                root = tempfile.mkdtemp(dir=tmp)
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    # Start the workers before timing.
+                    list(executor.map(abs, range(workers)))
+                    started = time.perf_counter()
+                    written = sum(
+                        len(names) for names in executor.map(
+                            render, sources, [root] * len(sources),
+                            [f"{i:064x}" for i in range(len(sources))],
+                            [settings.THUMBNAIL_SIZES] * len(sources),
+                        )
+                    )
+                    elapsed = time.perf_counter() - started
+
+                rate = written / elapsed
+                self.stdout.write(
+                    f"workers={workers:<3} thumbnails={written} "
+                    f"seconds={elapsed:.2f} per_second={rate:.1f} "
+                    f"per_second_per_core={rate / min(workers, cpus):.1f}"
+                )
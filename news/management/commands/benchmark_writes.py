@@ -0,0 +1,75 @@
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from news.models import Notification
+from news.sqlite import current_pragmas
+from news.write_queue import WriteQueue
+
+
+class Command(BaseCommand):
+    """
+    Measure concurrent write throughput against the default database.
+    """
+
+    help = (
+        "Benchmark concurrent writes, each committed alone and through the "
+        "single-writer queue. Run with and without SQLITE_TUNED=1 to compare "
+        "the SQLite profiles; use a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Concurrent writers.")
+        parser.add_argument("--writes", type=int, default=200, help="Writes per thread.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            self.stdout.write(f"PRAGMAs: {current_pragmas(connection)}")
+
+        user, _ = get_user_model().objects.get_or_create(
+            username="write-benchmark",
+            defaults={"email": "write-benchmark@example.invalid", "role": "reader"},
+        )
+        try:
+            queue = WriteQueue(enabled=True)
+            for mode, write in (
+                ("direct", self._direct),
+                ("queued", lambda **fields: queue.run(Notification.objects.create, **fields)),
+            ):
+                self._measure(mode, write, user, options["threads"], options["writes"])
+        finally:
+            user.delete()
+
+    def _direct(self, **fields):
+        with transaction.atomic():
+            return Notification.objects.create(**fields)
+
+    def _measure(self, mode, write, user, threads, writes):
+        done, failed = [0] * threads, [0] * threads
+
+        def worker(index):
+            try:
+                for i in range(writes):
+                    try:
+                        write(recipient=user, message=f"{mode} {index}-{i}")
+                        done[index] += 1
+                    except OperationalError:
+                        failed[index] += 1
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{mode:<7} threads={threads} writes={sum(done)} errors={sum(failed)} "
+            f"seconds={elapsed:.2f} writes_per_second={sum(done) / elapsed:.1f}"
+        )
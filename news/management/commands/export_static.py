@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from news.static_export import export
+
+
+class Command(BaseCommand):
+    """
+    Pre-render approved articles and publisher index pages to HTML files.
+    """
+
+    help = "Export approved articles as static HTML, re-rendering only changed pages."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", default=None,
+            help="Target directory (default: STATIC_EXPORT_DIR).",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Render processes (default: one per CPU).",
+        )
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Render every page even if it is unchanged.",
+        )
+
+    def handle(self, *args, **options):
+        result = export(
+            output=options["output"], workers=options["workers"], force=options["force"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {result['rendered']} pages, skipped {result['skipped']} "
+            f"unchanged, removed {result['removed']}."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from news.images import generate_all
+
+
+class Command(BaseCommand):
+    """
+    Render missing thumbnails of stored article images.
+    """
+
+    help = "Render the missing thumbnail sizes of every stored image."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=None,
+            help="Worker processes (default: one per CPU).",
+        )
+
+    def handle(self, *args, **options):
+        written = generate_all(workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} thumbnail files."))
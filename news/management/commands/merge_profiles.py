@@ -0,0 +1,70 @@
+import io
+import pstats
+from collections import Counter
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.profiling import profile_directory
+
+
+class Command(BaseCommand):
+    """
+    Merge request profiles into one flame-graph-ready report.
+
+    Folded stacks from sampler profiles are summed into a single
+    ``.collapsed`` file (for flamegraph.pl or speedscope), and cProfile
+    dumps are combined into one ``.prof`` file with a text summary.
+    """
+
+    help = "Merge .prof and .collapsed request profiles into one report."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=None, help="Profile directory (default: PROFILER_DIR).")
+        parser.add_argument("--view", default=None, help="Only merge profiles of this URL name.")
+        parser.add_argument("--output", default="merged", help="Output path without suffix.")
+        parser.add_argument("--top", type=int, default=25, help="Functions listed in the summary.")
+
+    def handle(self, *args, **options):
+        directory = Path(options["dir"]) if options["dir"] else profile_directory()
+        if not directory.is_dir():
+            raise CommandError(f"No profile directory at {directory}")
+
+        prefix = f"{options['view']}-" if options["view"] else ""
+        collapsed = sorted(directory.glob(f"{prefix}*.collapsed"))
+        prof = sorted(directory.glob(f"{prefix}*.prof"))
+        if not collapsed and not prof:
+            raise CommandError("No profiles to merge.")
+
+        output = Path(options["output"])
+
+        if collapsed:
+            stacks = Counter()
+            for path in collapsed:
+                for line in path.read_text().splitlines():
+                    stack, _, count = line.rpartition(" ")
+                    if stack and count.isdigit():
+                        stacks[stack] += int(count)
+            target = output.with_suffix(".collapsed")
+            target.write_text(
+                "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Merged {len(collapsed)} sampled profiles into {target} "
+                f"({sum(stacks.values())} samples)."
+            ))
+
+        if prof:
+            stats = pstats.Stats(str(prof[0]), stream=io.StringIO())
+            for path in prof[1:]:
+                stats.add(str(path))
+            target = output.with_suffix(".prof")
+            stats.dump_stats(target)
+
+            summary = io.StringIO()
+            stats.stream = summary
+            stats.sort_stats("cumulative").print_stats(options["top"])
+            self.stdout.write(summary.getvalue())
+            self.stdout.write(self.style.SUCCESS(
+                f"Merged {len(prof)} cProfile dumps into {target}."
+            ))
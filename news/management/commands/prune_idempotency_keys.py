@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from news.idempotency import prune
+
+
+class Command(BaseCommand):
+    """
+    Delete idempotency keys whose replay window has passed.
+    """
+
+    help = "Delete expired idempotency keys (run periodically, e.g. hourly)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Rows deleted per statement."
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired idempotency keys."))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from news.related import rebuild
+
+
+class Command(BaseCommand):
+    """
+    Rebuild TF-IDF vectors and related-article lists from scratch.
+    """
+
+    help = "Recompute the top-N related articles for every approved article."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top-n", type=int, default=None,
+            help="Neighbours to keep per article (default: RELATED_ARTICLES_TOP_N).",
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild(top_n=options["top_n"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} approved articles."))
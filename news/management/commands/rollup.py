@@ -0,0 +1,39 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from news.rollups import rebuild_from, rollup
+
+
+class Command(BaseCommand):
+    """
+    Aggregate activity of completed days into the daily rollup tables.
+    """
+
+    help = "Roll up days not processed yet (idempotent; run daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--until", default=None,
+            help="Last day to roll up, YYYY-MM-DD (default: yesterday).",
+        )
+        parser.add_argument(
+            "--rebuild-from", default=None,
+            help="Recompute this day (YYYY-MM-DD) and every later day.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            until = date.fromisoformat(options["until"]) if options["until"] else None
+            since = (
+                date.fromisoformat(options["rebuild_from"])
+                if options["rebuild_from"] else None
+            )
+        except ValueError as error:
+            raise CommandError(error)
+
+        if since is not None:
+            rebuild_from(since)
+
+        days = rollup(until=until)
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {days} days."))
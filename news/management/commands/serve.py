@@ -0,0 +1,84 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import get_internal_wsgi_application
+
+from news import ratelimit, server
+
+
+class Command(BaseCommand):
+    """
+    Run the preforking production server (see news.server).
+    """
+
+    help = (
+        "Serve the project with preforked, warmed-up workers. "
+        "TERM/INT drain gracefully; HUP restarts with fresh code."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--bind", default=os.getenv("SERVE_BIND", "0.0.0.0:8000"),
+            help="host:port to listen on.",
+        )
+        parser.add_argument(
+            "--workers", type=int,
+            default=int(os.getenv("SERVE_WORKERS", str(2 * (os.cpu_count() or 1) + 1))),
+            help="Worker processes (default: 2 * CPUs + 1).",
+        )
+        parser.add_argument(
+            "--threads", type=int, default=int(os.getenv("SERVE_THREADS", "4")),
+            help="Request threads per worker.",
+        )
+        parser.add_argument(
+            "--asgi", action="store_true",
+            help="Run the ASGI application with uvicorn workers (needed for SSE).",
+        )
+        parser.add_argument(
+            "--graceful-timeout", type=float,
+            default=float(os.getenv("SERVE_GRACEFUL_TIMEOUT", "30")),
+            help="Seconds workers get to finish in-flight requests.",
+        )
+        parser.add_argument(
+            "--backlog", type=int, default=2048, help="Listen backlog."
+        )
+
+    def handle(self, *args, **options):
+        host, _, port = options["bind"].rpartition(":")
+        if not host or not port.isdigit():
+            raise CommandError("--bind must be host:port.")
+
+        if options["asgi"]:
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                raise CommandError("--asgi needs the uvicorn package.")
+
+        warning = ratelimit.shared_counters_warning(options["workers"])
+        if warning:
+            self.stderr.write(self.style.WARNING(warning))
+
+        timings = server.warm_up()
+        self.stdout.write(
+            "Warm-up: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+            + f" (total {sum(timings.values()) * 1000:.0f} ms)"
+        )
+
+        # Loaded before forking so the workers share the application.
+        if options["asgi"]:
+            from django.core.asgi import get_asgi_application
+
+            application = get_asgi_application()
+        else:
+            application = get_internal_wsgi_application()
+
+        sock = server.listening_socket(host.strip("[]"), int(port), options["backlog"])
+        self.stdout.write(
+            f"Listening on {options['bind']} with {options['workers']} "
+            f"{'ASGI' if options['asgi'] else 'WSGI'} workers x {options['threads']} threads "
+            f"(master pid {os.getpid()})."
+        )
+        master = server.Master(
+            sock, options, lambda message: self.stdout.write(message), application
+        )
+        master.run()
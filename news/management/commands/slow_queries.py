@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+
+from news.querylog import normalize, read_log
+
+
+class Command(BaseCommand):
+    """
+    Summarize the slow-query log grouped by normalized query fingerprint.
+    """
+
+    help = "Summarize logged slow queries by fingerprint."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=None, help="Log file (default: SLOW_QUERY_LOG).")
+        parser.add_argument("--limit", type=int, default=20, help="Fingerprints to show.")
+        parser.add_argument(
+            "--sort", choices=["total", "count", "max"], default="total",
+            help="Order fingerprints by total time, occurrences or worst time.",
+        )
+        parser.add_argument(
+            "--explain", action="store_true", help="Print a captured EXPLAIN per fingerprint.",
+        )
+
+    def handle(self, *args, **options):
+        groups = {}
+        for entry in read_log(options["log"]):
+            group = groups.setdefault(entry["fingerprint"], {
+                "count": 0, "total": 0.0, "max": 0.0,
+                "sql": normalize(entry["sql"]), "views": {}, "templates": {},
+                "explain": None,
+            })
+            duration = entry["duration_ms"]
+            group["count"] += 1
+            group["total"] += duration
+            group["max"] = max(group["max"], duration)
+            for field, key in (("views", "view"), ("templates", "template")):
+                if entry.get(key):
+                    group[field][entry[key]] = group[field].get(entry[key], 0) + 1
+            if entry.get("explain"):
+                group["explain"] = entry["explain"]
+
+        if not groups:
+            self.stdout.write("No slow queries logged.")
+            return
+
+        ranked = sorted(groups.items(), key=lambda item: -item[1][options["sort"]])
+        for fp, group in ranked[:options["limit"]]:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{fp}  count={group['count']}  total={group['total']:.1f}ms  "
+                f"avg={group['total'] / group['count']:.1f}ms  max={group['max']:.1f}ms"
+            ))
+            self.stdout.write(f"  {group['sql'][:300]}")
+            for field, label in (("views", "view"), ("templates", "template")):
+                for name, count in sorted(group[field].items(), key=lambda i: -i[1])[:3]:
+                    self.stdout.write(f"  {label}: {name} ({count})")
+            if options["explain"] and group["explain"]:
+                for row in group["explain"]:
+                    self.stdout.write("  | " + " ".join(str(col) for col in row))
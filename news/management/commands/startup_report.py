@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from news.server import import_times, warm_up
+
+
+class Command(BaseCommand):
+    """
+    Report what starting a worker costs: imports per module and warm-up.
+    """
+
+    help = "Show import time per module and warm-up time of a fresh process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=25, help="Modules to show.")
+        parser.add_argument(
+            "--sort", choices=["cumulative", "self"], default="cumulative",
+            help="Order modules by time including or excluding their imports.",
+        )
+        parser.add_argument(
+            "--packages", action="store_true",
+            help="Sum self time per top-level package instead of per module.",
+        )
+
+    def handle(self, *args, **options):
+        rows = import_times()
+        total = sum(self_us for _, self_us, _ in rows)
+
+        if options["packages"]:
+            packages = defaultdict(lambda: [0, 0])
+            for module, self_us, _ in rows:
+                package = packages[module.split(".")[0]]
+                package[0] += self_us
+                package[1] += 1
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{'self ms':>9} {'modules':>8}  package"))
+            ranked = sorted(packages.items(), key=lambda item: -item[1][0])
+            for name, (self_us, count) in ranked[:options["limit"]]:
+                self.stdout.write(f"{self_us / 1000:9.1f} {count:8d}  {name}")
+        else:
+            index = 2 if options["sort"] == "cumulative" else 1
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{'self ms':>9} {'cumul ms':>9}  module"))
+            for module, self_us, cumulative_us in sorted(rows, key=lambda row: -row[index])[:options["limit"]]:
+                self.stdout.write(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {module}")
+
+        timings = warm_up()
+        self.stdout.write(
+            "Warm-up: " + ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(rows)} modules imported in {total / 1e6:.2f}s."
+        ))
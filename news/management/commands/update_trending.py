@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from news.trending import recompute
+
+
+class Command(BaseCommand):
+    """
+    Recompute trending scores and refresh the trending snapshot.
+
+    Meant to run periodically (e.g. every few minutes from cron).
+    """
+
+    help = "Recompute decayed trending scores for approved articles."
+
+    def handle(self, *args, **options):
+        snapshot = recompute()
+        self.stdout.write(self.style.SUCCESS(
+            f"Trending snapshot refreshed with {len(snapshot['articles'])} articles."
+        ))
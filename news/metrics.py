@@ -0,0 +1,379 @@
+"""
+Prometheus-format metrics.
+
+Counters, gauges and histograms are kept in plain per-process dicts and
+updated under one short lock each. When ``METRICS_DIR`` is set, every
+worker process periodically writes its values to ``<METRICS_DIR>/<pid>.json``
+and the ``/metrics`` endpoint sums the files of all workers, so the
+numbers cover the whole server rather than whichever worker answered.
+A worker removes its file when it exits, and files of processes that no
+longer run (killed workers) are skipped and deleted; counters of a
+worker that is gone drop out of the totals, which Prometheus treats as a
+counter reset.
+"""
+
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Metric:
+    """
+    Base class for a named metric with a fixed set of label names.
+    """
+
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self):
+        """
+        Return {label values: value} for this process.
+        """
+        with self._lock:
+            return dict(self._values)
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        registry.maybe_sync()
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down.
+
+    A gauge built with ``callback`` is read when metrics are collected
+    instead of being set by callers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), callback=None):
+        super().__init__(name, documentation, labelnames)
+        self.callback = callback
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+        registry.maybe_sync()
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        registry.maybe_sync()
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def snapshot(self):
+        if self.callback is not None:
+            for labels, value in self.callback():
+                with self._lock:
+                    self._values[self._key(labels)] = value
+        return super().snapshot()
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed buckets.
+
+    Each value is stored as [bucket counts..., sum, count].
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 3)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+        registry.maybe_sync()
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(state) for key, state in self._values.items()}
+
+
+class Registry:
+    """
+    Holds every metric of the process and handles multiprocess files.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._last_sync = 0.0
+        self._sync_lock = threading.Lock()
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+
+    @staticmethod
+    def directory():
+        path = getattr(settings, "METRICS_DIR", None)
+        return Path(path) if path else None
+
+    def collect(self):
+        """
+        Return {metric name: {label values: value}} for this process.
+        """
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def maybe_sync(self):
+        """
+        Write this process's values to the shared directory if due.
+        """
+        directory = self.directory()
+        if directory is None:
+            return
+        interval = getattr(settings, "METRICS_SYNC_INTERVAL", 1.0)
+        now = time.monotonic()
+        if now - self._last_sync < interval or not self._sync_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_sync = now
+            self.sync(directory)
+        finally:
+            self._sync_lock.release()
+
+    def sync(self, directory=None):
+        directory = directory or self.directory()
+        if directory is None:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        data = {
+            name: [[list(key), value] for key, value in values.items()]
+            for name, values in self.collect().items()
+        }
+        target = directory / f"{os.getpid()}.json"
+        temporary = directory / f".{os.getpid()}.json.tmp"
+        temporary.write_text(json.dumps(data))
+        os.replace(temporary, target)
+
+    def aggregate(self):
+        """
+        Return the values of all worker processes summed together.
+        """
+        totals = {name: {} for name in self._metrics}
+        sources = [self.collect()]
+
+        directory = self.directory()
+        if directory is not None and directory.is_dir():
+            own = f"{os.getpid()}.json"
+            for path in directory.glob("*.json"):
+                if path.name == own:
+                    continue
+                if not _alive(path.stem):
+                    path.unlink(missing_ok=True)
+                    continue
+                try:
+                    data = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue
+                sources.append({
+                    name: {tuple(key): value for key, value in values}
+                    for name, values in data.items()
+                })
+
+        for source in sources:
+            for name, values in source.items():
+                if name not in totals:
+                    continue
+                merged = totals[name]
+                for key, value in values.items():
+                    if isinstance(value, list):
+                        previous = merged.get(key, [0] * len(value))
+                        merged[key] = [a + b for a, b in zip(previous, value)]
+                    else:
+                        merged[key] = merged.get(key, 0) + value
+        return totals
+
+    def render(self):
+        """
+        Return all metrics in the Prometheus text exposition format.
+        """
+        totals = self.aggregate()
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(totals[name].items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets + (math.inf,), value):
+                        cumulative += count
+                        le = "+Inf" if bound == math.inf else repr(bound)
+                        lines.append(
+                            f"{name}_bucket{_labels(labels + [('le', le)])} {cumulative}"
+                        )
+                    lines.append(f"{name}_sum{_labels(labels)} {value[-2]}")
+                    lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _alive(pid):
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+registry = Registry()
+
+
+def _queue_depths():
+    from .counters import view_counter
+    from .write_queue import writes
+
+    return [
+        ({"queue": "view_counter"}, len(view_counter)),
+        ({"queue": "writes"}, len(writes)),
+    ]
+
+
+def _admission(kind):
+    def collect():
+        from .admission import admission
+
+        return getattr(admission, kind)()
+    return collect
+
+
+request_latency = Histogram(
+    "news_request_duration_seconds",
+    "Time spent handling a request, by URL name.",
+    ["view"],
+)
+db_queries = Counter(
+    "news_db_queries_total",
+    "Database queries executed, by URL name.",
+    ["view"],
+)
+db_query_seconds = Counter(
+    "news_db_query_seconds_total",
+    "Time spent in database queries, by URL name.",
+    ["view"],
+)
+cache_requests = Counter(
+    "news_cache_requests_total",
+    "Application cache lookups, by cache and result (hit or miss).",
+    ["cache", "result"],
+)
+notifications_written = Counter(
+    "news_notifications_written_total",
+    "Notification rows written.",
+)
+emails_sent = Counter(
+    "news_emails_sent_total",
+    "Email recipients sent to.",
+)
+queue_depth = Gauge(
+    "news_job_queue_depth",
+    "Items waiting in background queues.",
+    ["queue"],
+    callback=_queue_depths,
+)
+
+admission_limit = Gauge(
+    "news_admission_limit",
+    "Concurrent requests allowed per worker, by URL name (* = whole process).",
+    ["view"],
+    callback=_admission("limits"),
+)
+admission_in_flight = Gauge(
+    "news_admission_in_flight",
+    "Requests holding an admission slot, by URL name (* = whole process).",
+    ["view"],
+    callback=_admission("in_flight"),
+)
+admission_rejected = Counter(
+    "news_admission_rejected_total",
+    "Requests refused with 503 because no slot freed up in time.",
+    ["view", "priority"],
+)
+admission_wait = Histogram(
+    "news_admission_wait_seconds",
+    "Time requests waited for an admission slot.",
+    ["view"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+
+rate_limited = Counter(
+    "news_rate_limited_total",
+    "Requests refused with 429 by a rate limit, by view.",
+    ["view"],
+)
+
+
+def record_cache(cache_name, hit, count=1):
+    """
+    Count cache hits or misses for one of the application caches.
+    """
+    if count:
+        cache_requests.inc(count, cache=cache_name, result="hit" if hit else "miss")
+
+
+@atexit.register
+def _remove_on_exit():
+    directory = registry.directory()
+    if directory is not None:
+        (directory / f"{os.getpid()}.json").unlink(missing_ok=True)
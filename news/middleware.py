@@ -0,0 +1,136 @@
+"""
+Middleware for the News application.
+"""
+
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+from . import metrics
+from .admission import admission
+from .profiling import run_profiled, should_profile
+from .querylog import SlowQueryLogger
+
+
+class MetricsMiddleware:
+    """
+    Record request latency and database usage per URL name.
+
+    Requests that do not resolve to a named URL are grouped under
+    "unresolved" so unknown paths cannot create unbounded label values.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = {"count": 0, "seconds": 0.0}
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                stats["count"] += 1
+                stats["seconds"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+
+        match = getattr(request, "resolver_match", None)
+        view = match.url_name if match and match.url_name else "unresolved"
+
+        metrics.request_latency.observe(time.perf_counter() - started, view=view)
+        metrics.db_queries.inc(stats["count"], view=view)
+        metrics.db_query_seconds.inc(stats["seconds"], view=view)
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Log queries slower than SLOW_QUERY_THRESHOLD_MS with their origin.
+
+    Disabled when SLOW_QUERY_THRESHOLD_MS is 0.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 0):
+            return self.get_response(request)
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(SlowQueryLogger(connection, request))
+                )
+            return self.get_response(request)
+
+
+class ProfilingMiddleware:
+    """
+    Profile sampled or explicitly requested requests.
+
+    See news.profiling for how requests are selected and where the
+    profiles are written.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        response, _ = run_profiled(self.get_response, request)
+        return response
+
+
+class AdmissionControlMiddleware:
+    """
+    Enforce the concurrency limits of news.admission.
+
+    Runs after authentication so editor and journalist writes can be
+    recognised; refused requests get a 503 with Retry-After.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            gates = getattr(request, "_admission_gates", None)
+            if gates:
+                admission.leave(gates)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(settings, "ADMISSION_CONTROL", False):
+            return None
+
+        view = request.resolver_match.url_name or "unresolved"
+        if view in getattr(settings, "ADMISSION_EXEMPT_VIEWS", ()):
+            return None
+        priority = admission.is_priority(request, view)
+        started = time.perf_counter()
+        gates = admission.enter(view, priority)
+        metrics.admission_wait.observe(time.perf_counter() - started, view=view)
+        if gates is not None:
+            request._admission_gates = gates
+            return None
+
+        metrics.admission_rejected.inc(view=view, priority=str(priority).lower())
+        response = HttpResponse(
+            "Service temporarily overloaded, please retry.",
+            status=503, content_type="text/plain",
+        )
+        response["Retry-After"] = str(getattr(settings, "ADMISSION_RETRY_AFTER", 1))
+        return response
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0009_alter_user_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='views',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:26
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_approved_at(apps, schema_editor):
+    Article = apps.get_model('news', 'Article')
+    Article.objects.filter(approved=True, approved_at__isnull=True).update(
+        approved_at=F('created_at')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0013_duplicate_detection'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='approved_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(backfill_approved_at, migrations.RunPython.noop),
+    ]
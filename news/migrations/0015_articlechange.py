@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0014_article_approved_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('article_id', models.BigIntegerField(db_index=True)),
+                ('action', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('approve', 'Approve'), ('delete', 'Delete')], max_length=10)),
+                ('data', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
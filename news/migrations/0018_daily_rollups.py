@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-19 08:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0017_article_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('articles_created', models.PositiveIntegerField(default=0)),
+                ('articles_approved', models.PositiveIntegerField(default=0)),
+                ('notifications', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyPublisherStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('articles_approved', models.PositiveIntegerField(default=0)),
+                ('new_subscribers', models.PositiveIntegerField(default=0)),
+                ('subscribers', models.PositiveIntegerField(default=0)),
+                ('publisher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='news.publisher')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('publisher', 'day'), name='unique_publisher_day')],
+            },
+        ),
+    ]
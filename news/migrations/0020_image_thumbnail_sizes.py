@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 10:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0019_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageasset',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
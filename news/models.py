@@ -4,15 +4,29 @@ Models module for the News Application.
 Defines database models including:
 - Custom User
 - Publisher
+- ImageAsset
 - Article
 - Subscription
 - Newsletter
 - Notification
+- TrendingScore
+- ArticleTerms
+- RelatedArticle
+- ArticleSignature
+- LSHBucket
+- DuplicateFlag
+- ArticleChange
+- DailyStats
+- DailyPublisherStats
 """
 
+from django.conf import settings
+from django.core.files.storage import default_storage
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from .thumbnails import fallback_ext, thumbnail_name
+
 
 class User(AbstractUser):
     """
@@ -32,8 +46,20 @@ class User(AbstractUser):
         ('editor', 'Editor'),
     ]
 
+    INSTANT = "instant"
+    DIGEST = "digest"
+    NOTIFICATION_MODE_CHOICES = [
+        (INSTANT, 'One notification per article'),
+        (DIGEST, 'Digest per journalist/publisher'),
+    ]
+
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     email = models.EmailField(unique=True)
+    notification_mode = models.CharField(
+        max_length=10,
+        choices=NOTIFICATION_MODE_CHOICES,
+        default=INSTANT
+    )
 
     def __str__(self):
         """
@@ -64,6 +90,49 @@ class Publisher(models.Model):
         return self.name
 
 
+class ImageAsset(models.Model):
+    """
+    An uploaded image, stored once per distinct content.
+
+    The file is named after the SHA-256 of its bytes; thumbnails are
+    rendered by news.images, which records the rendered size labels in
+    ``thumbnails``.
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(max_length=255)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    has_alpha = models.BooleanField(default=False)
+    size = models.PositiveIntegerField()
+    thumbnails = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def thumbnail(self, label):
+        """
+        Return {"src", "webp"} URLs of a thumbnail size.
+
+        Falls back to the original image while the thumbnail is not rendered.
+        """
+        if label not in self.thumbnails:
+            return {"src": self.file.url, "webp": None}
+        src = thumbnail_name(self.sha256, label, fallback_ext(self.has_alpha))
+        webp = thumbnail_name(self.sha256, label, "webp")
+        return {"src": default_storage.url(src), "webp": default_storage.url(webp)}
+
+    @property
+    def smallest(self):
+        sizes = settings.THUMBNAIL_SIZES
+        return self.thumbnail(min(sizes, key=sizes.get))
+
+    def __str__(self):
+        """
+        Return the content hash.
+        """
+        return self.sha256
+
+
 class Article(models.Model):
     """
     Represents a news article created by a journalist.
@@ -89,8 +158,22 @@ class Article(models.Model):
         blank=True
     )
 
+    image = models.ForeignKey(
+        ImageAsset,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="articles"
+    )
+
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Set by news.signals the first time the article is saved approved.
+    approved_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    # Maintained by news.counters; never incremented per request.
+    views = models.PositiveIntegerField(default=0, db_index=True)
+
     def __str__(self):
         """
         Return article title.
@@ -202,9 +285,307 @@ class Notification(models.Model):
 
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Digest rows (see news.notifications) share a key per source and
+    # time window; instant notifications leave it empty.
+    digest_key = models.CharField(max_length=100, null=True, blank=True)
+    count = models.PositiveIntegerField(default=1)
+    article_ids = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipient", "digest_key"],
+                name="unique_notification_digest"
+            )
+        ]
 
     def __str__(self):
         """
         Return readable notification description.
         """
         return f"Notification for {self.recipient.username}"
+
+
+class TrendingScore(models.Model):
+    """
+    Exponentially decayed popularity score of an approved article.
+
+    Maintained in batches by news.trending; ``views_seen`` is the view
+    total already folded into ``score``.
+    """
+
+    article = models.OneToOneField(
+        Article,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="trending_score"
+    )
+
+    score = models.FloatField(default=0.0)
+    views_seen = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        """
+        Return readable score description.
+        """
+        return f"{self.article_id}: {self.score:.2f}"
+
+
+class ArticleTerms(models.Model):
+    """
+    Term counts of an approved article's title and content.
+
+    Kept by news.related so a single article can be compared with the
+    rest of the corpus without re-tokenizing every article.
+    """
+
+    article = models.OneToOneField(
+        Article,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="terms"
+    )
+
+    terms = models.JSONField(default=dict)
+
+    def __str__(self):
+        """
+        Return readable description.
+        """
+        return f"Terms for article {self.article_id}"
+
+
+class RelatedArticle(models.Model):
+    """
+    Precomputed nearest neighbour of an article by TF-IDF similarity.
+    """
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="related_links"
+    )
+
+    related = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+
+    score = models.FloatField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        """
+        One entry per pair, read back in rank order.
+        """
+        unique_together = (("article", "related"),)
+        indexes = [models.Index(fields=["article", "rank"])]
+
+    def __str__(self):
+        """
+        Return readable relation description.
+        """
+        return f"{self.article_id} → {self.related_id} ({self.score:.3f})"
+
+
+class ArticleSignature(models.Model):
+    """
+    MinHash signature of an article's text, stored as packed uint32s.
+    """
+
+    article = models.OneToOneField(
+        Article,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="signature"
+    )
+
+    minhash = models.BinaryField()
+
+    def __str__(self):
+        """
+        Return readable description.
+        """
+        return f"Signature for article {self.article_id}"
+
+
+class LSHBucket(models.Model):
+    """
+    Locality-sensitive hashing bucket an article's signature falls into.
+
+    One row per band; articles sharing any (band, bucket) pair are
+    duplicate candidates.
+    """
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="lsh_buckets"
+    )
+
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        """
+        Candidate lookups filter on (band, bucket).
+        """
+        indexes = [models.Index(fields=["band", "bucket"])]
+
+    def __str__(self):
+        """
+        Return readable bucket description.
+        """
+        return f"{self.article_id} in band {self.band}"
+
+
+class DuplicateFlag(models.Model):
+    """
+    Marks an article as a likely near-duplicate of an earlier one.
+    """
+
+    article = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="duplicate_flags"
+    )
+
+    duplicate_of = models.ForeignKey(
+        Article,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+
+    similarity = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """
+        Flag each pair only once.
+        """
+        unique_together = (("article", "duplicate_of"),)
+
+    def __str__(self):
+        """
+        Return readable flag description.
+        """
+        return f"{self.article_id} ≈ {self.duplicate_of_id} ({self.similarity:.0%})"
+
+
+class ArticleChange(models.Model):
+    """
+    Append-only change-data-capture entry for an article.
+
+    ``seq`` increases with every change. ``data`` holds the article as
+    serialized after the change, or is null (a tombstone) for deletes.
+    """
+
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('approve', 'Approve'),
+        ('delete', 'Delete'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    article_id = models.BigIntegerField(db_index=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """
+        Return readable change description.
+        """
+        return f"#{self.seq} {self.action} article {self.article_id}"
+
+
+class DailyStats(models.Model):
+    """
+    Site-wide activity of one day, maintained by news.rollups.
+    """
+
+    day = models.DateField(primary_key=True)
+    articles_created = models.PositiveIntegerField(default=0)
+    articles_approved = models.PositiveIntegerField(default=0)
+    notifications = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        """
+        Return the day.
+        """
+        return f"Stats for {self.day}"
+
+
+class DailyPublisherStats(models.Model):
+    """
+    Activity of one publisher on one day, maintained by news.rollups.
+
+    ``subscribers`` is the number of active subscribers at the end of
+    the day, as known when the day was rolled up.
+    """
+
+    publisher = models.ForeignKey(
+        Publisher,
+        on_delete=models.CASCADE,
+        related_name="daily_stats"
+    )
+    day = models.DateField()
+    articles_approved = models.PositiveIntegerField(default=0)
+    new_subscribers = models.PositiveIntegerField(default=0)
+    subscribers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["publisher", "day"],
+                name="unique_publisher_day"
+            )
+        ]
+
+    def __str__(self):
+        """
+        Return readable description.
+        """
+        return f"{self.publisher_id} on {self.day}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Response stored for an Idempotency-Key, replayed to retries (news.idempotency).
+
+    A row without ``status_code`` is a claim: the first request with
+    the key is still running.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="idempotency_keys"
+    )
+    endpoint = models.CharField(max_length=100)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    headers = models.JSONField(default=dict)
+    content = models.BinaryField(default=bytes)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "endpoint", "key"],
+                name="unique_idempotency_key"
+            )
+        ]
+
+    def __str__(self):
+        """
+        Return readable description.
+        """
+        return f"{self.endpoint} {self.key} ({self.user_id})"
@@ -0,0 +1,108 @@
+"""
+Notifications to the followers of a new article's journalist and publisher.
+
+Readers in "instant" mode get one row per article. Readers in "digest"
+mode get one row per source (journalist or publisher) per
+``NOTIFICATION_DIGEST_WINDOW`` minutes: the first article of a window
+inserts it, later ones bump ``count`` and keep the latest
+``NOTIFICATION_DIGEST_MAX_IDS`` article ids.
+
+Digest rows are written portably (MySQL has no INSERT ... ON CONFLICT
+with a target): missing rows are inserted ignoring conflicts, ``count``
+is incremented in SQL, which also locks the rows until commit, and only
+then are the locked rows read to rebuild message and article ids, so
+concurrent articles never lose an increment.
+
+Rows are written in bulk, which does not send ``post_save``, so
+``notifications_saved`` is sent for every written batch instead.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Notification, Subscription, User
+
+# Sent with notifications=[...] after rows were inserted or upserted.
+notifications_saved = Signal()
+
+
+def digest_window(now):
+    """
+    Return the number of the digest window that contains now.
+    """
+    minutes = getattr(settings, "NOTIFICATION_DIGEST_WINDOW", 60)
+    return int(now.timestamp() // (minutes * 60))
+
+
+def _journalist_message(article, count):
+    name = article.created_by.username
+    if count == 1:
+        return f"{name} uploaded a new article: {article.title}"
+    return f"{name} uploaded {count} new articles, latest: {article.title}"
+
+
+def _publisher_message(article, count):
+    name = article.publisher.name
+    if count == 1:
+        return f"New article under {name}: {article.title}"
+    return f"{count} new articles under {name}, latest: {article.title}"
+
+
+def _notify(followers, article, source, message, now):
+    readers = list(followers.values_list("reader_id", "reader__notification_mode"))
+    instant = [reader for reader, mode in readers if mode != User.DIGEST]
+    digest = [reader for reader, mode in readers if mode == User.DIGEST]
+
+    written = Notification.objects.bulk_create([
+        Notification(recipient_id=reader, message=message(article, 1))
+        for reader in instant
+    ])
+
+    if digest:
+        key = f"{source}:{digest_window(now)}"
+        max_ids = getattr(settings, "NOTIFICATION_DIGEST_MAX_IDS", 10)
+        Notification.objects.bulk_create(
+            [
+                Notification(recipient_id=reader, digest_key=key, count=0, message="")
+                for reader in digest
+            ],
+            ignore_conflicts=True,
+        )
+        rows = Notification.objects.filter(recipient_id__in=digest, digest_key=key)
+        rows.update(count=F("count") + 1, updated_at=now)
+
+        updated = list(rows.select_for_update().order_by("id"))
+        for row in updated:
+            row.article_ids = [article.id, *row.article_ids][:max_ids]
+            row.message = message(article, row.count)
+            row.updated_at = now
+        Notification.objects.bulk_update(updated, ["article_ids", "message", "updated_at"])
+        written += updated
+
+    return written
+
+
+def notify_new_article(article):
+    """
+    Notify the followers of the article's journalist and publisher.
+
+    Returns the written notifications.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        written = _notify(
+            Subscription.objects.filter(journalist_id=article.created_by_id),
+            article, f"journalist:{article.created_by_id}", _journalist_message, now
+        )
+        if article.publisher_id:
+            written += _notify(
+                Subscription.objects.filter(publisher_id=article.publisher_id),
+                article, f"publisher:{article.publisher_id}", _publisher_message, now
+            )
+
+    if written:
+        notifications_saved.send(sender=Notification, notifications=written)
+    return written
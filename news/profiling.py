@@ -0,0 +1,142 @@
+"""
+On-demand request profiling.
+
+A request is profiled when it carries ``X-Profile: <PROFILER_TOKEN>`` or
+is picked by random sampling at ``PROFILER_SAMPLE_RATE``. Depending on
+``PROFILER_MODE`` it runs under ``cProfile`` (writing a ``.prof`` file)
+or under a statistical sampler that walks the request thread's stack
+every ``PROFILER_INTERVAL`` seconds (writing a ``.collapsed`` file of
+folded stacks, the input format of flame-graph tools). File names start
+with the URL name, and only the newest ``PROFILER_MAX_FILES`` are kept.
+"""
+
+import cProfile
+import hmac
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+PROFILE_SUFFIXES = (".prof", ".collapsed")
+
+# Only one cProfile profiler can be active per process at a time.
+_cprofile_lock = threading.Lock()
+
+
+def should_profile(request):
+    """
+    Decide whether a request is profiled.
+    """
+    token = getattr(settings, "PROFILER_TOKEN", "")
+    header = request.headers.get("X-Profile")
+    if token and header and hmac.compare_digest(header, token):
+        return True
+    rate = getattr(settings, "PROFILER_SAMPLE_RATE", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{Path(code.co_filename).name}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Samples the stack of one thread from a background thread.
+    """
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def profile_directory():
+    return Path(getattr(settings, "PROFILER_DIR", Path("profiles")))
+
+
+def _rotate(directory, keep):
+    files = sorted(
+        (path for path in directory.iterdir() if path.suffix in PROFILE_SUFFIXES),
+        key=lambda path: path.stat().st_mtime,
+    )
+    for path in files[:max(len(files) - keep, 0)]:
+        path.unlink(missing_ok=True)
+
+
+def _target(view_name, suffix):
+    directory = profile_directory()
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in view_name)
+    return directory / f"{safe}-{stamp}-{os.getpid()}{suffix}"
+
+
+def run_profiled(get_response, request):
+    """
+    Call get_response under the configured profiler and save the result.
+
+    Returns (response, path of the written profile); the path is None
+    when another request already holds the process's cProfile slot.
+    """
+    mode = getattr(settings, "PROFILER_MODE", "cprofile")
+
+    if mode == "sampler":
+        sampler = StackSampler(
+            threading.get_ident(), getattr(settings, "PROFILER_INTERVAL", 0.005)
+        )
+        sampler.start()
+        try:
+            response = get_response(request)
+        finally:
+            sampler.stop()
+        path = _target(_view_name(request), ".collapsed")
+        path.write_text(
+            "".join(f"{stack} {count}\n" for stack, count in sampler.stacks.items())
+        )
+    else:
+        if not _cprofile_lock.acquire(blocking=False):
+            return get_response(request), None
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        finally:
+            _cprofile_lock.release()
+        path = _target(_view_name(request), ".prof")
+        profiler.dump_stats(path)
+
+    _rotate(path.parent, getattr(settings, "PROFILER_MAX_FILES", 200))
+    return response, path
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.url_name if match and match.url_name else "unresolved"
@@ -0,0 +1,171 @@
+"""
+In-process publish/subscribe of new notifications.
+
+Each open notification stream subscribes with a small bounded queue
+owned by its event loop. Notifications written by this process are
+published once their transaction commits. Notifications written by other
+worker processes are picked up by one poller task per event loop that
+queries for rows newer than the last id it saw, plus digest rows updated
+since its previous poll (they keep their id), for all connected
+recipients at once, so idle connections cost nothing per connection.
+
+A subscriber whose queue is full is marked as overflowed instead of
+blocking the publisher; its stream then catches up from the database.
+"""
+
+import asyncio
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Notification
+
+
+def notification_payload(notification):
+    return {
+        "id": notification.id,
+        "message": notification.message,
+        "count": notification.count,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def notifications_after(recipient_ids, last_id, updated_since=None, limit=500):
+    """
+    Return payloads of notifications newer than last_id for recipients.
+
+    With updated_since, digest rows updated after it are included too.
+    """
+    newer = Q(id__gt=last_id)
+    if updated_since is not None:
+        newer |= Q(digest_key__isnull=False, updated_at__gt=updated_since)
+    rows = (
+        Notification.objects.filter(newer, recipient_id__in=recipient_ids)
+        .order_by("id")
+        .values("id", "recipient_id", "message", "count", "created_at")[:limit]
+    )
+    return [
+        {
+            "id": row["id"],
+            "recipient_id": row["recipient_id"],
+            "message": row["message"],
+            "count": row["count"],
+            "created_at": row["created_at"].isoformat(),
+        }
+        for row in rows
+    ]
+
+
+def latest_notification_id():
+    return Notification.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+class Subscriber:
+    """
+    One open stream waiting for notifications of a recipient.
+    """
+
+    def __init__(self, recipient_id, loop, maxsize):
+        self.recipient_id = recipient_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.overflowed = False
+
+    def put(self, payload):
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+
+class NotificationHub:
+    """
+    Routes published notifications to the subscribers of their recipient.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+        self._pollers = {}
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+    def subscribe(self, recipient_id):
+        loop = asyncio.get_running_loop()
+        subscriber = Subscriber(
+            recipient_id, loop, getattr(settings, "SSE_QUEUE_SIZE", 100)
+        )
+        with self._lock:
+            self._subscribers.setdefault(recipient_id, set()).add(subscriber)
+        self._ensure_poller(loop)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            subs = self._subscribers.get(subscriber.recipient_id)
+            if subs is not None:
+                subs.discard(subscriber)
+                if not subs:
+                    del self._subscribers[subscriber.recipient_id]
+
+    def publish(self, recipient_id, payload):
+        """
+        Deliver a payload to every subscriber of a recipient. Thread-safe.
+        """
+        with self._lock:
+            subs = list(self._subscribers.get(recipient_id, ()))
+        for subscriber in subs:
+            if subscriber.loop.is_closed():
+                continue
+            subscriber.loop.call_soon_threadsafe(subscriber.put, payload)
+
+    def _ensure_poller(self, loop):
+        with self._lock:
+            task = self._pollers.get(loop)
+            if task is None or task.done():
+                self._pollers[loop] = loop.create_task(self._poll(loop))
+
+    def _recipients_or_stop(self, loop):
+        """
+        Return the recipients streaming on loop; unregister the poller if none.
+        """
+        with self._lock:
+            recipients = [
+                recipient_id for recipient_id, subs in self._subscribers.items()
+                if any(subscriber.loop is loop for subscriber in subs)
+            ]
+            if not recipients:
+                self._pollers.pop(loop, None)
+            return recipients
+
+    async def _poll(self, loop):
+        """
+        Publish notifications written by other processes for this loop.
+        """
+        interval = getattr(settings, "SSE_POLL_INTERVAL", 5.0)
+        last_id = await sync_to_async(latest_notification_id)()
+        updated_since = timezone.now()
+        while True:
+            await asyncio.sleep(interval)
+            recipients = self._recipients_or_stop(loop)
+            if not recipients:
+                return
+            # Overlap by one interval so digests updated by a transaction
+            # that committed late are not missed; streams drop repeats.
+            polled_at = timezone.now()
+            rows = await sync_to_async(notifications_after)(
+                recipients, last_id, updated_since - timedelta(seconds=interval)
+            )
+            updated_since = polled_at
+            for row in rows:
+                last_id = max(last_id, row["id"])
+                self.publish(row.pop("recipient_id"), row)
+
+
+hub = NotificationHub()
@@ -0,0 +1,151 @@
+"""
+Slow-query log.
+
+``SlowQueryLogger`` is installed with ``connection.execute_wrapper`` for
+the duration of a request. Queries slower than ``SLOW_QUERY_THRESHOLD_MS``
+are appended as JSON lines to ``SLOW_QUERY_LOG`` together with the view
+that ran them and, when issued while rendering a template, the template
+and line number. A sampled share of slow SELECTs also get their
+``EXPLAIN`` output captured. ``manage.py slow_queries`` summarizes the
+log by normalized query fingerprint.
+"""
+
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*%s\s*,)*\s*%s\s*\)", re.IGNORECASE)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """
+    Reduce a query to its shape: literals and IN lists become "?".
+    """
+    sql = _IN_LIST_RE.sub("IN (?)", sql)
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(sql):
+    """
+    Return a short stable id for the normalized form of a query.
+    """
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()[:12]
+
+
+def template_location():
+    """
+    Return "template:line" of the innermost template node being rendered.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        if frame.f_code.co_name == "render_annotated":
+            node = frame.f_locals.get("self")
+            token = getattr(node, "token", None)
+            origin = getattr(node, "origin", None)
+            if token is not None and origin is not None:
+                return f"{origin.template_name}:{token.lineno}"
+        frame = frame.f_back
+    return None
+
+
+def _write(entry):
+    path = settings.SLOW_QUERY_LOG
+    line = json.dumps(entry, default=str) + "\n"
+    with _write_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as log:
+            log.write(line)
+
+
+def read_log(path=None):
+    """
+    Yield the entries of the slow-query log, skipping damaged lines.
+    """
+    path = path or settings.SLOW_QUERY_LOG
+    try:
+        log = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with log:
+        for line in log:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class SlowQueryLogger:
+    """
+    Execute wrapper that logs slow queries of one request.
+    """
+
+    def __init__(self, connection, request=None):
+        self.connection = connection
+        self.request = request
+        self.threshold = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 100) / 1000
+        self.explain_rate = getattr(settings, "SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0.1)
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, "explaining", False):
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            if duration >= self.threshold:
+                self.log(sql, params, many, duration)
+
+    @property
+    def view_name(self):
+        match = getattr(self.request, "resolver_match", None)
+        return match.view_name if match else None
+
+    def log(self, sql, params, many, duration):
+        entry = {
+            "time": timezone.now().isoformat(),
+            "fingerprint": fingerprint(sql),
+            "duration_ms": round(duration * 1000, 3),
+            "view": self.view_name,
+            "template": template_location(),
+            "sql": sql,
+        }
+        if (
+            not many
+            and sql.lstrip()[:6].upper() == "SELECT"
+            and random.random() < self.explain_rate
+        ):
+            entry["explain"] = self.explain(sql, params)
+        _write(entry)
+
+    def explain(self, sql, params):
+        """
+        Return the query plan rows of a query, or None if it failed.
+        """
+        prefix = self.connection.ops.explain_query_prefix()
+        _local.explaining = True
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"{prefix} {sql}", params)
+                return [list(row) for row in cursor.fetchall()]
+        except Exception:
+            return None
+        finally:
+            _local.explaining = False
@@ -0,0 +1,189 @@
+"""
+Cache-backed rate limiting for abuse-prone views.
+
+``@ratelimit(group, keys=...)`` counts requests per view and key (client
+IP, logged-in user or a submitted field such as the login username) in
+the shared cache and answers 429 with ``Retry-After`` once the rate of
+``RATE_LIMITS[group]`` (e.g. ``"10/m"``) is exceeded.
+
+Counting uses a sliding window approximated from two fixed windows: the
+count of the current window plus the previous window's count weighted by
+how much of it still overlaps the last ``period`` seconds. Each request
+is one atomic ``incr`` and one ``get``, so limits hold across worker
+processes with Redis or Memcached; with the local-memory cache each
+worker counts on its own and ``manage.py serve`` warns about it.
+
+Keys in ``failure_keys`` count only requests the view refused, such as
+failed logins per username: the owner of an account can still log in
+while someone else tries their username.
+"""
+
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from . import metrics
+
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """
+    Parse "count/period" (period like "m", "15m" or "h") into (count, seconds).
+    """
+    count, _, period = rate.partition("/")
+    multiplier = period[:-1] or "1"
+    if period[-1:] not in UNITS or not multiplier.isdigit() or not count.isdigit():
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '10/m' or '5/15m'.")
+    return int(count), int(multiplier) * UNITS[period[-1]]
+
+
+def client_ip(request):
+    """
+    Return the client address; X-Forwarded-For only with RATELIMIT_TRUST_FORWARDED.
+    """
+    if getattr(settings, "RATELIMIT_TRUST_FORWARDED", False):
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def by_field(name):
+    """
+    Key requests by a submitted POST field, e.g. the username of a login.
+    """
+    def key(request):
+        value = request.POST.get(name, "").strip().lower()
+        return f"{name}:{value}" if value else None
+    return key
+
+
+def failed_login(response):
+    """
+    A login attempt failed unless it redirected.
+    """
+    return response.status_code != 302
+
+
+def shared_counters_warning(workers):
+    """
+    Return a warning if counters of several workers would not be shared.
+    """
+    if (
+        workers < 2
+        or not getattr(settings, "RATELIMIT_ENABLED", True)
+        or not getattr(settings, "RATE_LIMITS", {})
+        or not isinstance(caches["default"], (LocMemCache, DummyCache))
+    ):
+        return None
+    return (
+        f"Rate limits are counted per worker: with {workers} workers a client "
+        f"gets up to {workers} times RATE_LIMITS. Set REDIS_URL or "
+        f"MEMCACHED_LOCATION for a shared cache."
+    )
+
+
+def _key(request, kind):
+    if callable(kind):
+        return kind(request)
+    if kind == "user" and request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{client_ip(request)}"
+
+
+def hit(name, limit, period, now=None, record=True):
+    """
+    Count one request under name; return (allowed, seconds until retry).
+
+    With record=False nothing is counted, only whether one more request
+    would be allowed is returned.
+    """
+    now = time.time() if now is None else now
+    window, offset = divmod(now, period)
+    window = int(window)
+    # Hashed: keys may contain user input, unsafe as raw cache keys.
+    name = hashlib.sha1(name.encode()).hexdigest()
+    current = f"ratelimit:{name}:{window}"
+    if not record:
+        count = cache.get(current, 0) + 1
+    else:
+        try:
+            count = cache.incr(current)
+        except ValueError:
+            # First request of the window; add() keeps a concurrent first.
+            if not cache.add(current, 1, timeout=2 * period):
+                count = cache.incr(current)
+            else:
+                count = 1
+    previous = cache.get(f"ratelimit:{name}:{window - 1}", 0)
+
+    excess = previous * (1 - offset / period) + count - limit
+    if excess <= 0:
+        return True, 0
+    # The previous window's share fades linearly; wait until it is low enough.
+    if count > limit:
+        wait = period - offset + period * (1 - max(limit - 1, 0) / count)
+    else:
+        wait = excess / previous * period
+    return False, max(math.ceil(wait), 1)
+
+
+def ratelimit(group, keys=("ip",), methods=("POST",), failure_keys=(), failed=None):
+    """
+    Limit a view to RATE_LIMITS[group] per key; 429 with Retry-After beyond.
+
+    Requests are counted under keys when they arrive and under
+    failure_keys only when failed(response) is true.
+    """
+    def decorator(view):
+        name = getattr(view, "view_class", view).__name__
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            rate = getattr(settings, "RATE_LIMITS", {}).get(group)
+            if (
+                not getattr(settings, "RATELIMIT_ENABLED", True)
+                or rate is None
+                or request.method not in methods
+            ):
+                return view(request, *args, **kwargs)
+
+            limit, period = parse_rate(rate)
+            retry_after = 0
+            failure_counters = []
+            checks = [(kind, True) for kind in keys] + [(kind, False) for kind in failure_keys]
+            for kind, record in checks:
+                key = _key(request, kind)
+                if key is None:
+                    continue
+                counter = f"{group}:{name}:{key}"
+                allowed, wait = hit(counter, limit, period, record=record)
+                if not record:
+                    failure_counters.append(counter)
+                if not allowed:
+                    retry_after = max(retry_after, wait)
+
+            if not retry_after:
+                response = view(request, *args, **kwargs)
+                if failure_counters and failed(response):
+                    for counter in failure_counters:
+                        hit(counter, limit, period)
+                return response
+
+            metrics.rate_limited.inc(view=name)
+            response = HttpResponse(
+                "Too many requests, please slow down.",
+                status=429, content_type="text/plain",
+            )
+            response["Retry-After"] = str(retry_after)
+            return response
+        return wrapped
+    return decorator
@@ -0,0 +1,343 @@
+"""
+Related-articles recommender.
+
+Approved articles are represented as sparse TF-IDF vectors over their
+title and content. ``rebuild`` computes the top-N cosine neighbours of
+every article in blocks of sparse matrix products, and ``index_article``
+folds a newly approved article into the stored neighbour lists without
+recomputing the whole corpus. Serving is a single indexed lookup of the
+``RelatedArticle`` rows of one article.
+
+Indexing compares the article with every stored term vector, so views
+never run it themselves: ``schedule_index`` and ``schedule_removal`` hand
+it to a background thread once the transaction commits. Lists that lose
+an article (edited away from them, unapproved or deleted) are refilled
+from the rest of the corpus.
+"""
+
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from scipy import sparse
+
+from .models import Article, ArticleTerms, RelatedArticle
+
+TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+
+STOP_WORDS = frozenset("""
+    a about after all also an and are as at be been but by can for from
+    had has have he her his i if in into is it its more not of on or our
+    she so than that the their them there they this to was we were what
+    when which who will with would you your
+""".split())
+
+# Titles are short but descriptive, so their terms count extra.
+TITLE_WEIGHT = 2
+
+# Upper bound on the number of similarity cells held densely at once.
+BLOCK_CELLS = 2_000_000
+
+
+def _top_n():
+    return getattr(settings, "RELATED_ARTICLES_TOP_N", 5)
+
+
+def term_counts(title, content):
+    """
+    Return {term: count} for an article's title and content.
+    """
+    counts = Counter(
+        token for token in TOKEN_RE.findall(content.lower())
+        if token not in STOP_WORDS
+    )
+    for token in TOKEN_RE.findall(title.lower()):
+        if token not in STOP_WORDS:
+            counts[token] += TITLE_WEIGHT
+    return dict(counts)
+
+
+def tfidf_matrix(documents):
+    """
+    Build an L2-normalized CSR TF-IDF matrix from a list of term dicts.
+
+    Uses sublinear term frequency and smoothed IDF.
+    """
+    vocabulary = {}
+    indptr = [0]
+    indices = []
+    counts = []
+
+    for terms in documents:
+        for term, count in terms.items():
+            indices.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+        indptr.append(len(indices))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(counts, dtype=np.float64),
+         np.asarray(indices, dtype=np.int64),
+         np.asarray(indptr, dtype=np.int64)),
+        shape=(len(documents), len(vocabulary)),
+    )
+
+    n_docs = matrix.shape[0]
+    doc_freq = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1.0
+
+    matrix.data = 1.0 + np.log(matrix.data)
+    matrix = matrix.multiply(idf).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ matrix
+
+
+def _best(similarities, ids, top_n):
+    """
+    Return [(article_id, score)] of the top_n positive similarities.
+    """
+    top = min(top_n, len(similarities))
+    if not top:
+        return []
+    best = np.argpartition(-similarities, top - 1)[:top]
+    best = best[np.argsort(-similarities[best], kind="stable")]
+    return [
+        (int(ids[i]), float(similarities[i]))
+        for i in best if similarities[i] > 0
+    ]
+
+
+def _top_lists(matrix, ids, rows, top_n):
+    """
+    Return [(article_id, neighbours)] for the given rows of matrix.
+    """
+    if not rows:
+        return []
+    similarities = (matrix[rows] @ matrix.T).toarray()
+    similarities[np.arange(len(rows)), rows] = 0.0
+    return [
+        (int(ids[row]), _best(row_similarities, ids, top_n))
+        for row, row_similarities in zip(rows, similarities)
+    ]
+
+
+def _links(article_id, neighbours):
+    return [
+        RelatedArticle(article_id=article_id, related_id=related_id,
+                       score=score, rank=rank)
+        for rank, (related_id, score) in enumerate(neighbours)
+    ]
+
+
+def rebuild(top_n=None):
+    """
+    Recompute term vectors and neighbour lists for all approved articles.
+
+    Returns the number of articles indexed.
+    """
+    top_n = top_n or _top_n()
+    rows = list(
+        Article.objects.filter(approved=True).values_list("id", "title", "content")
+    )
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    documents = [term_counts(title, content) for _, title, content in rows]
+
+    links = []
+    if rows:
+        matrix = tfidf_matrix(documents)
+        transposed = matrix.T.tocsc()
+        block = max(1, BLOCK_CELLS // len(rows))
+
+        for start in range(0, len(rows), block):
+            similarities = (matrix[start:start + block] @ transposed).toarray()
+            rows_in_block = np.arange(similarities.shape[0])
+            similarities[rows_in_block, rows_in_block + start] = 0.0
+
+            for offset, row in enumerate(similarities):
+                links.extend(_links(int(ids[start + offset]), _best(row, ids, top_n)))
+
+    with transaction.atomic():
+        ArticleTerms.objects.all().delete()
+        ArticleTerms.objects.bulk_create(
+            [ArticleTerms(article_id=int(article_id), terms=terms)
+             for article_id, terms in zip(ids, documents)],
+            batch_size=500,
+        )
+        RelatedArticle.objects.all().delete()
+        RelatedArticle.objects.bulk_create(links, batch_size=500)
+
+    return len(rows)
+
+
+def index_article(article, top_n=None):
+    """
+    Add or refresh one approved article in the related-articles index.
+
+    Only the article's own similarities are computed. Its neighbour list
+    is replaced, and any article whose list it now belongs in is updated.
+    """
+    top_n = top_n or _top_n()
+    terms = term_counts(article.title, article.content)
+
+    stored = dict(
+        ArticleTerms.objects.filter(article__approved=True)
+        .exclude(article_id=article.id)
+        .values_list("article_id", "terms")
+    )
+    ids = np.fromiter(stored.keys(), dtype=np.int64, count=len(stored))
+
+    matrix = tfidf_matrix([terms, *stored.values()])
+    similarities = (matrix[1:] @ matrix[0].T).toarray().ravel()
+    neighbours = _best(similarities, ids, top_n)
+
+    candidates = {
+        int(other): float(score)
+        for other, score in zip(ids, similarities) if score > 0
+    }
+    current = {}
+    for other, related_id, score in RelatedArticle.objects.filter(
+        article_id__in=candidates
+    ).exclude(related_id=article.id).values_list("article_id", "related_id", "score"):
+        current.setdefault(other, []).append((related_id, score))
+
+    # Lists the article was already in may now rank it lower or drop it,
+    # so their other slots are recomputed in full from the same matrix.
+    holders = set(
+        RelatedArticle.objects.filter(related_id=article.id)
+        .values_list("article_id", flat=True)
+    )
+    changed = []
+    for other, score in candidates.items():
+        existing = current.get(other, [])
+        if other in holders or (
+            len(existing) >= top_n and score <= min(s for _, s in existing)
+        ):
+            continue
+        merged = sorted(existing + [(article.id, score)], key=lambda pair: -pair[1])
+        changed.append((other, merged[:top_n]))
+
+    position = {int(other): row for row, other in enumerate(ids, start=1)}
+    changed.extend(_top_lists(
+        matrix, np.concatenate(([article.id], ids)),
+        [position[other] for other in holders if other in position], top_n,
+    ))
+
+    with transaction.atomic():
+        ArticleTerms.objects.update_or_create(
+            article_id=article.id, defaults={"terms": terms}
+        )
+        RelatedArticle.objects.filter(article_id=article.id).delete()
+        RelatedArticle.objects.filter(related_id=article.id).delete()
+        RelatedArticle.objects.filter(
+            article_id__in=[other for other, _ in changed]
+        ).delete()
+
+        links = _links(article.id, neighbours)
+        for other, merged in changed:
+            links.extend(_links(other, merged))
+        RelatedArticle.objects.bulk_create(links, batch_size=500)
+
+
+def refill(article_ids, top_n=None):
+    """
+    Recompute the neighbour lists of article_ids against the whole index.
+    """
+    top_n = top_n or _top_n()
+    stored = dict(
+        ArticleTerms.objects.filter(article__approved=True).values_list("article_id", "terms")
+    )
+    targets = [article_id for article_id in set(article_ids) if article_id in stored]
+    if not targets:
+        return
+    ids = np.fromiter(stored.keys(), dtype=np.int64, count=len(stored))
+    position = {article_id: row for row, article_id in enumerate(stored)}
+    lists = _top_lists(
+        tfidf_matrix(list(stored.values())), ids,
+        [position[article_id] for article_id in targets], top_n,
+    )
+
+    with transaction.atomic():
+        RelatedArticle.objects.filter(article_id__in=targets).delete()
+        RelatedArticle.objects.bulk_create(
+            [link for article_id, neighbours in lists for link in _links(article_id, neighbours)],
+            batch_size=500,
+        )
+
+
+def unindex_article(article_id):
+    """
+    Drop an article that is no longer approved and refill the lists it was in.
+    """
+    lost = list(
+        RelatedArticle.objects.filter(related_id=article_id)
+        .values_list("article_id", flat=True)
+    )
+    with transaction.atomic():
+        ArticleTerms.objects.filter(article_id=article_id).delete()
+        RelatedArticle.objects.filter(article_id=article_id).delete()
+        RelatedArticle.objects.filter(related_id=article_id).delete()
+    refill(lost)
+
+
+def _reindex(article_id):
+    article = Article.objects.filter(pk=article_id, approved=True).first()
+    if article is None:
+        unindex_article(article_id)
+    else:
+        index_article(article)
+
+
+_executor = None
+
+
+def _run(fn, *args):
+    close_old_connections()
+    try:
+        fn(*args)
+    finally:
+        close_old_connections()
+
+
+def _submit(fn, *args):
+    global _executor
+    if not getattr(settings, "RELATED_INDEX_IN_BACKGROUND", True):
+        fn(*args)
+        return
+    if _executor is None:
+        # One thread: index updates never race each other's lists.
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="related-index")
+    _executor.submit(_run, fn, *args)
+
+
+def schedule_index(article):
+    """
+    Index (or, if no longer approved, drop) article after the transaction commits.
+    """
+    transaction.on_commit(lambda: _submit(_reindex, article.id))
+
+
+def schedule_removal(article):
+    """
+    Refill the lists article is in once its deletion commits.
+    """
+    lost = list(
+        RelatedArticle.objects.filter(related_id=article.id)
+        .values_list("article_id", flat=True)
+    )
+    transaction.on_commit(lambda: _submit(refill, lost))
+
+
+def related_for(article, limit=None):
+    """
+    Return the approved related articles of an article in rank order.
+    """
+    links = (
+        RelatedArticle.objects.filter(article=article, related__approved=True)
+        .select_related("related")
+        .order_by("rank")
+    )
+    return [link.related for link in links[:limit or _top_n()]]
@@ -0,0 +1,202 @@
+"""
+Precompressed response cache for the article list API and feeds.
+
+Every rendered body is stored together with its gzip (and, when the
+optional ``brotli`` package is installed, brotli) encoding, so repeat
+requests are answered straight from the cache without rendering or
+compressing anything. Entries are keyed by the sorted query parameters and tagged
+with a global article version that the ``Article`` signals bump.
+
+A stale entry is regenerated by a single worker: the first one to take
+the regeneration lock renders a fresh body while the others keep
+serving the previous copy until the new one is stored. With no previous
+copy to fall back on, a cold miss is rendered by whoever receives it.
+
+With ``validators=True`` a response carries the ETag and Last-Modified
+of the entry actually served, so a stale copy is never labelled with
+the current version.
+"""
+
+import gzip
+import hashlib
+import math
+import re
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+VERSION_KEY = "articles:version"
+MODIFIED_KEY = "articles:modified"
+ENTRY_KEY = "article_list:{}"
+LOCK_KEY = "article_list:lock:{}"
+
+_TOKEN_RE = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?")
+
+
+def current_version():
+    """
+    Return the global article version, starting it at 1 if unset.
+    """
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, timeout=None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_version():
+    """
+    Mark every cached article list as stale.
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, 2, timeout=None)
+    cache.set(MODIFIED_KEY, time.time(), timeout=None)
+
+
+def _modified():
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        cache.add(MODIFIED_KEY, time.time(), timeout=None)
+        modified = cache.get(MODIFIED_KEY, time.time())
+    return modified
+
+
+def last_modified(modified=None):
+    """
+    Return when the article version last changed, as a UTC datetime.
+
+    HTTP dates have whole seconds, so the time is rounded up, and None is
+    returned until that second is over: a client holding it could not
+    tell a later change within the same second.
+    """
+    modified = math.ceil(_modified() if modified is None else modified)
+    if modified > time.time():
+        return None
+    return datetime.fromtimestamp(modified, tz=timezone.utc)
+
+
+def etag(namespace, version):
+    """
+    Return the ETag of namespace's representation at version.
+    """
+    # Weak: the same representation is served with several encodings.
+    return f'W/"{namespace}:{version}"'
+
+
+def accepted_encodings(header):
+    """
+    Return the set of content codings a client accepts (q > 0).
+    """
+    accepted = set()
+    for part in header.split(","):
+        match = _TOKEN_RE.match(part)
+        if match and float(match.group(2) or 1) > 0:
+            accepted.add(match.group(1).lower())
+    return accepted
+
+
+def build_entry(body, content_type, version, modified=None):
+    """
+    Return a cache entry holding body and its compressed variants.
+    """
+    return {
+        "version": version,
+        "modified": modified,
+        "content_type": content_type,
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=6, mtime=0),
+        "br": brotli.compress(body) if brotli is not None else None,
+        "created": time.time(),
+    }
+
+
+def _respond(request, entry, status):
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    if entry["br"] is not None and "br" in accepted:
+        encoding = "br"
+    elif "gzip" in accepted:
+        encoding = "gzip"
+    else:
+        encoding = "identity"
+
+    response = HttpResponse(entry[encoding], content_type=entry["content_type"])
+    if encoding != "identity":
+        response["Content-Encoding"] = encoding
+    response["Content-Length"] = str(len(entry[encoding]))
+    response["X-Cache"] = status
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def request_digest(request, namespace="articles"):
+    """
+    Return the hash naming the cache entry and lock of a request.
+    """
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    return hashlib.sha1(f"{namespace}?{query}".encode()).hexdigest()
+
+
+def _validate(response, entry, namespace):
+    response["ETag"] = etag(namespace, entry["version"])
+    modified = entry.get("modified")
+    if modified is not None and last_modified(modified) is not None:
+        response["Last-Modified"] = http_date(math.ceil(modified))
+    return response
+
+
+def serve(request, render, namespace="articles", cache_name="article_list", validators=False):
+    """
+    Answer a request from the cache, regenerating the entry if needed.
+
+    ``render`` returns (body bytes, content type) for a fresh response;
+    ``cache_name`` labels the hit/miss metrics. With ``validators`` the
+    response gets the ETag and Last-Modified of the entry served.
+    """
+    digest = request_digest(request, namespace)
+    entry_key = ENTRY_KEY.format(digest)
+    lock_key = LOCK_KEY.format(digest)
+
+    # Read before the version: bump_version() moves the version first,
+    # so the time stored never postdates the body.
+    modified = _modified()
+    version = current_version()
+    entry = cache.get(entry_key)
+
+    if entry is not None and entry["version"] == version:
+        metrics.record_cache(cache_name, True)
+        status = "HIT"
+    else:
+        metrics.record_cache(cache_name, False)
+        lock_timeout = getattr(settings, "RESPONSE_CACHE_LOCK_TIMEOUT", 10)
+
+        if entry is not None and not cache.add(lock_key, 1, timeout=lock_timeout):
+            status = "STALE"
+        else:
+            try:
+                body, content_type = render()
+                fresh = build_entry(body, content_type, version, modified)
+                cache.set(
+                    entry_key, fresh, timeout=getattr(settings, "RESPONSE_CACHE_TIMEOUT", 3600)
+                )
+            finally:
+                if entry is not None:
+                    cache.delete(lock_key)
+            entry, status = fresh, "MISS"
+
+    response = _respond(request, entry, status)
+    return _validate(response, entry, namespace) if validators else response
@@ -0,0 +1,140 @@
+"""
+Daily rollups of article, subscription and notification activity.
+
+``rollup`` aggregates every completed day after the last stored one
+into ``DailyStats`` and ``DailyPublisherStats``, with one GROUP BY per
+source restricted to those days. The rows of the processed days are
+replaced (deleted and inserted in one transaction), so a repeated run
+writes the same result; ``rebuild_from`` drops stored days so they are
+computed again.
+
+``notifications`` sums the ``count`` of notification rows created on
+each day. A digest row is counted on the day it was created with the
+count it has when the day is rolled up; increments that arrive after
+that (a digest window still open at the end of the day) are not
+counted unless the day is rebuilt. With UTC and a digest window that
+divides 24 hours, windows never span midnight, so this only affects
+articles written while the rollup runs.
+"""
+
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Article, DailyPublisherStats, DailyStats, Notification, Publisher, Subscription,
+)
+
+
+def _start_of(day):
+    return datetime.combine(day, time.min, tzinfo=timezone.get_current_timezone())
+
+
+def _per_day(queryset, field, start, end, group=(), aggregate=None):
+    """
+    Return {(day, *group values): aggregate} over days start..end.
+    """
+    rows = (
+        queryset.filter(**{
+            f"{field}__gte": _start_of(start),
+            f"{field}__lt": _start_of(end + timedelta(days=1)),
+        })
+        .annotate(day=TruncDate(field))
+        .order_by()
+        .values("day", *group)
+        .annotate(total=aggregate or Count("id"))
+        .values_list("day", *group, "total")
+    )
+    return {tuple(row[:-1]): row[-1] or 0 for row in rows}
+
+
+def first_pending_day():
+    """
+    Return the first day not rolled up yet, or None without any activity.
+    """
+    last = DailyStats.objects.aggregate(last=Max("day"))["last"]
+    if last is not None:
+        return last + timedelta(days=1)
+
+    firsts = [
+        model.objects.aggregate(first=Min("created_at"))["first"]
+        for model in (Article, Subscription, Notification)
+    ]
+    firsts = [timezone.localdate(first) for first in firsts if first is not None]
+    return min(firsts, default=None)
+
+
+def rollup(until=None):
+    """
+    Roll up every pending day up to until (default: yesterday).
+
+    Returns the number of days processed.
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+    start = first_pending_day()
+    if start is None or start > until:
+        return 0
+
+    days = [start + timedelta(days=i) for i in range((until - start).days + 1)]
+
+    created = _per_day(Article.objects, "created_at", start, until)
+    approved = _per_day(Article.objects.filter(approved=True), "approved_at", start, until)
+    notifications = _per_day(
+        Notification.objects, "created_at", start, until, aggregate=Sum("count")
+    )
+    publisher_approved = _per_day(
+        Article.objects.filter(approved=True, publisher__isnull=False),
+        "approved_at", start, until, group=("publisher_id",)
+    )
+    new_subscribers = _per_day(
+        Subscription.objects.filter(publisher__isnull=False),
+        "created_at", start, until, group=("publisher_id",)
+    )
+    subscribers = defaultdict(int, Subscription.objects.filter(
+        publisher__isnull=False, created_at__lt=_start_of(start)
+    ).order_by().values_list("publisher_id").annotate(total=Count("id")))
+
+    site_rows = [
+        DailyStats(
+            day=day,
+            articles_created=created.get((day,), 0),
+            articles_approved=approved.get((day,), 0),
+            notifications=notifications.get((day,), 0),
+        )
+        for day in days
+    ]
+
+    publisher_rows = []
+    for publisher_id in Publisher.objects.order_by("id").values_list("id", flat=True):
+        for day in days:
+            new = new_subscribers.get((day, publisher_id), 0)
+            subscribers[publisher_id] += new
+            publisher_rows.append(DailyPublisherStats(
+                publisher_id=publisher_id,
+                day=day,
+                articles_approved=publisher_approved.get((day, publisher_id), 0),
+                new_subscribers=new,
+                subscribers=subscribers[publisher_id],
+            ))
+
+    with transaction.atomic():
+        DailyPublisherStats.objects.filter(day__gte=start, day__lte=until).delete()
+        DailyStats.objects.filter(day__gte=start, day__lte=until).delete()
+        DailyPublisherStats.objects.bulk_create(publisher_rows, batch_size=500)
+        # Stored last: the newest DailyStats day marks the days as done.
+        DailyStats.objects.bulk_create(site_rows, batch_size=500)
+
+    return len(days)
+
+
+def rebuild_from(day):
+    """
+    Forget the rollups of day and every later day.
+    """
+    with transaction.atomic():
+        DailyStats.objects.filter(day__gte=day).delete()
+        DailyPublisherStats.objects.filter(day__gte=day).delete()
@@ -1,8 +1,51 @@
 from rest_framework import serializers
-from .models import Article
+from .models import Article, ArticleChange, Publisher, User
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'role']
+
+
+class PublisherSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Publisher
+        fields = ['id', 'name']
 
 
 class ArticleSerializer(serializers.ModelSerializer):
+    """
+    Article serializer with optional sparse fieldsets.
+
+    ``fields`` keeps only the named fields, ``exclude`` drops fields and
+    ``expand`` replaces the named foreign keys with nested objects.
+    """
+
+    EXPANDABLE = {
+        'created_by': UserSummarySerializer,
+        'publisher': PublisherSummarySerializer,
+    }
+
     class Meta:
         model = Article
         fields = '__all__'
+
+    def __init__(self, *args, fields=None, exclude=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        for name in expand or ():
+            self.fields[name] = self.EXPANDABLE[name](read_only=True)
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+        for name in exclude or ():
+            self.fields.pop(name, None)
+
+
+class ArticleChangeSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArticleChange
+        fields = ['seq', 'article_id', 'action', 'data', 'created_at']
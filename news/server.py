@@ -0,0 +1,316 @@
+"""
+Preforking HTTP server behind ``manage.py serve``.
+
+The master process loads the project and warms it up (URL resolver,
+templates, model metadata), freezes the garbage collector so the warmed
+objects stay shared copy-on-write, and forks ``workers`` children that
+accept from one listening socket. WSGI workers handle requests on
+``threads`` threads and only accept a connection when a thread is free,
+so a busy worker leaves new connections to its siblings. ASGI workers
+run uvicorn on the inherited socket.
+
+Signals handled by the master:
+
+- TERM / INT: graceful drain. Workers stop accepting, finish in-flight
+  requests within ``graceful_timeout`` seconds and exit.
+- HUP: graceful restart. The master re-executes itself keeping the
+  socket open, forks workers running the new code, then drains the old
+  workers.
+
+A worker that exits unexpectedly is replaced.
+"""
+
+import gc
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from django.apps import apps
+from django.conf import settings
+from django.core.servers.basehttp import (
+    WSGIRequestHandler, WSGIServer,
+)
+from django.db import connections
+from django.urls import get_resolver
+
+from .admission import admission
+from .counters import view_counter
+from .template_cache import warm_templates
+
+LISTEN_FD_ENV = "NEWS_SERVE_LISTEN_FD"
+OLD_WORKERS_ENV = "NEWS_SERVE_OLD_WORKERS"
+
+
+def warm_up():
+    """
+    Load what the first requests would otherwise load; return timings.
+    """
+    timings = {}
+
+    def step(name, fn):
+        started = time.perf_counter()
+        fn()
+        timings[name] = time.perf_counter() - started
+
+    step("urls", lambda: get_resolver().reverse_dict)
+    step("templates", warm_templates)
+    step("models", lambda: [model._meta.get_fields() for model in apps.get_models()])
+    return timings
+
+
+IMPORT_TIME_SCRIPT = (
+    "import django; django.setup(); "
+    "from django.core.wsgi import get_wsgi_application; get_wsgi_application(); "
+    "from news.server import warm_up; warm_up()"
+)
+
+
+def parse_import_times(text):
+    """
+    Parse ``python -X importtime`` output into (module, self_us, cumulative_us).
+    """
+    rows = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        rows.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+    return rows
+
+
+def import_times():
+    """
+    Start the project in a fresh interpreter and return its import times.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_TIME_SCRIPT],
+        cwd=settings.BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_import_times(result.stderr)
+
+
+def listening_socket(host, port, backlog):
+    """
+    Return the socket inherited from a restarting master, or bind a new one.
+    """
+    fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if fd is not None:
+        sock = socket.socket(fileno=int(fd))
+    else:
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+class PooledWSGIServer(WSGIServer):
+    """
+    WSGI server on an already bound socket with a fixed thread pool.
+    """
+
+    def __init__(self, sock, application, threads):
+        super().__init__(
+            sock.getsockname()[:2], WSGIRequestHandler, bind_and_activate=False
+        )
+        self.socket.close()
+        self.socket = sock
+        self.server_name, self.server_port = sock.getsockname()[:2]
+        self.setup_environ()
+        self.set_app(application)
+        self.stopping = threading.Event()
+        # At most threads requests are in flight: size admission to match.
+        admission.configure(threads)
+        self._slots = threading.Semaphore(threads)
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="request")
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def run(self):
+        """
+        Accept connections until stopping is set, then wait for requests.
+        """
+        while not self.stopping.is_set():
+            if not self._slots.acquire(timeout=0.5):
+                continue
+            try:
+                ready, _, _ = select.select([self.socket], [], [], 0.5)
+                # Every worker wakes up for a new connection; the ones
+                # that lose the race get BlockingIOError.
+                request, client_address = self.socket.accept() if ready else (None, None)
+            except (BlockingIOError, InterruptedError):
+                request = None
+            if request is None:
+                self._slots.release()
+                continue
+            request.setblocking(True)
+            self._pool.submit(self._handle, request, client_address)
+        self._pool.shutdown(wait=True)
+
+
+def _worker(sock, options, application):
+    for signum in (signal.SIGHUP, signal.SIGCHLD):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    view_counter.start_flusher()
+
+    if options["asgi"]:
+        import uvicorn
+
+        os.environ["ASGI_THREADS"] = str(options["threads"])
+        admission.configure(options["threads"])
+        config = uvicorn.Config(
+            application, fd=sock.fileno(), lifespan="off",
+            timeout_graceful_shutdown=options["graceful_timeout"],
+        )
+        uvicorn.Server(config).run()
+        return
+
+    server = PooledWSGIServer(sock, application, options["threads"])
+    signal.signal(signal.SIGTERM, lambda *args: server.stopping.set())
+    server.run()
+    connections.close_all()
+
+
+class Master:
+    """
+    Forks, supervises and drains the worker processes.
+    """
+
+    def __init__(self, sock, options, log, application):
+        self.sock = sock
+        self.options = options
+        self.log = log
+        self.application = application
+        self.workers = set()
+        self.draining = {}
+        self.stopping = False
+        self.restarting = False
+
+    def spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                _worker(self.sock, self.options, self.application)
+            except SystemExit as exit:
+                code = exit.code
+            except BaseException:
+                code = 1
+                traceback.print_exc()
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            # Exit through sys.exit so atexit handlers (view counter flush) run.
+            sys.exit(code)
+        self.workers.add(pid)
+        return pid
+
+    def drain(self, pids):
+        deadline = time.monotonic() + self.options["graceful_timeout"]
+        for pid in pids:
+            self._signal(pid, signal.SIGTERM)
+            self.draining[pid] = deadline
+
+    def _signal(self, pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                if not self.stopping:
+                    self.log(f"Worker {pid} exited with status {status}; replacing it.")
+                    self.spawn()
+            self.draining.pop(pid, None)
+
+    def _kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.draining.items()):
+            if now > deadline:
+                self.log(f"Worker {pid} did not drain in time; killing it.")
+                self._signal(pid, signal.SIGKILL)
+                self.draining[pid] = float("inf")
+
+    def _on_stop(self, signum, frame):
+        self.stopping = True
+
+    def _on_restart(self, signum, frame):
+        self.restarting = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        signal.signal(signal.SIGHUP, self._on_restart)
+
+        connections.close_all()
+        gc.collect()
+        gc.freeze()
+        for _ in range(self.options["workers"]):
+            self.spawn()
+        self.log(f"Started workers {sorted(self.workers)}.")
+
+        old = [int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if pid]
+        if old:
+            self.log(f"Draining previous workers {old}.")
+            self.drain(old)
+
+        while True:
+            if self.restarting:
+                self.restart()
+            if self.stopping:
+                self.log("Draining workers.")
+                self.drain(self.workers)
+                while self.workers or self.draining:
+                    self._reap()
+                    self._kill_overdue()
+                    time.sleep(0.1)
+                self.log("Stopped.")
+                return
+            self._reap()
+            self._kill_overdue()
+            time.sleep(0.2)
+
+    def restart(self):
+        """
+        Re-execute the master with the socket and old workers handed over.
+        """
+        self.log("Restarting with fresh code.")
+        self.sock.set_inheritable(True)
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ",".join(
+            str(pid) for pid in self.workers | set(self.draining)
+        )
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.execv(sys.executable, [sys.executable, *sys.orig_argv[1:]])
@@ -1,6 +1,17 @@
 from django.contrib.auth.models import Group, Permission
-from django.db.models.signals import post_migrate
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
+
+from . import (
+    article_cache, feed, metrics, pubsub, response_cache, sqlite, trending, user_cache,
+)
+from .admission import admission
+from .models import Article, Notification, User
+from .notifications import notifications_saved
 
 
 @receiver(post_migrate)
@@ -16,3 +27,88 @@ def create_groups(sender, **kwargs):
         group, _ = Group.objects.get_or_create(name=role)
         permissions = Permission.objects.filter(codename__in=perms)
         group.permissions.set(permissions)
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    sqlite.configure(connection)
+
+
+@receiver(setting_changed)
+def reset_admission(sender, setting, **kwargs):
+    if setting.startswith("ADMISSION_"):
+        admission.reset()
+
+
+@receiver(post_save, sender=Notification)
+def notification_created(sender, instance, created, **kwargs):
+    if created:
+        notifications_saved.send(sender=Notification, notifications=[instance])
+
+
+@receiver(notifications_saved)
+def count_notifications(sender, notifications, **kwargs):
+    metrics.notifications_written.inc(len(notifications))
+
+
+@receiver(notifications_saved)
+def publish_notifications(sender, notifications, **kwargs):
+    # Rows upserted on MySQL come back without a primary key.
+    messages = [
+        (notification.recipient_id, pubsub.notification_payload(notification))
+        for notification in notifications
+        if notification.pk is not None
+    ]
+
+    def publish():
+        for recipient_id, payload in messages:
+            pubsub.hub.publish(recipient_id, payload)
+
+    transaction.on_commit(publish)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def invalidate_article(sender, instance, **kwargs):
+    article_cache.invalidate(instance.id)
+    response_cache.bump_version()
+    # Again after commit: an article or list read meanwhile from the old
+    # rows may have been cached.
+    article_id = instance.id
+    transaction.on_commit(lambda: article_cache.invalidate(article_id))
+    transaction.on_commit(response_cache.bump_version)
+
+
+@receiver(post_save, sender=Article)
+@receiver(post_delete, sender=Article)
+def drop_from_trending(sender, instance, signal, **kwargs):
+    if signal is post_delete or not instance.approved:
+        article_id = instance.id
+        trending.drop_article(article_id)
+        # Again after commit, in case a fallback ranking listed it meanwhile.
+        transaction.on_commit(lambda: trending.drop_article(article_id))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    # Again after commit, in case a request cached the old row meanwhile.
+    transaction.on_commit(lambda: user_cache.invalidate(instance.pk))
+
+
+@receiver(pre_save, sender=Article)
+def stamp_approval(sender, instance, **kwargs):
+    if instance.approved and instance.approved_at is None:
+        instance.approved_at = timezone.now()
+        instance._newly_approved = True
+    elif not instance.approved:
+        # Re-approval gets a fresh stamp, so feeds deliver it again.
+        instance.approved_at = None
+
+
+@receiver(post_save, sender=Article)
+def notify_feed_readers(sender, instance, **kwargs):
+    if getattr(instance, "_newly_approved", False):
+        instance._newly_approved = False
+        transaction.on_commit(lambda: feed.touch_followers(instance))
@@ -0,0 +1,40 @@
+"""
+Tuning of SQLite connections.
+
+With ``SQLITE_TUNED=1`` the settings fill ``SQLITE_PRAGMAS`` and
+``configure`` (connected to ``connection_created`` in news.signals)
+applies them to every new SQLite connection: WAL so readers never block
+the writer, ``synchronous=NORMAL`` (durable at checkpoints, safe with
+WAL), memory-mapped reads, a bigger page cache and a busy timeout so
+contending writers wait instead of failing with "database is locked".
+"""
+
+from django.conf import settings
+
+
+def configure(connection):
+    """
+    Apply SQLITE_PRAGMAS to a new connection; other vendors are left alone.
+    """
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", {})
+    if connection.vendor != "sqlite" or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def current_pragmas(connection, names=None):
+    """
+    Return {name: value} of PRAGMAs as the connection reports them.
+    """
+    names = names or getattr(settings, "SQLITE_PRAGMAS", {}).keys() or (
+        "journal_mode", "synchronous", "mmap_size", "busy_timeout", "cache_size",
+    )
+    values = {}
+    with connection.cursor() as cursor:
+        for name in names:
+            cursor.execute(f"PRAGMA {name}")
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    return values
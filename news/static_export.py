@@ -0,0 +1,175 @@
+"""
+Static HTML export of approved articles.
+
+``export`` renders ``read_article.html`` for every approved article and
+an index page per publisher into a directory laid out like the site's
+URLs (``read/<id>/index.html``, ``publisher/<id>/index.html``), so a
+web server can serve them without reaching Django. Reads of exported
+pages are not counted by news.counters.
+
+Every page is keyed by a hash of the data it shows and of the templates
+it uses, kept in ``manifest.json``. A re-run only renders pages whose
+hash changed, and removes pages of articles that are gone or no longer
+approved. Rendering runs in a process pool; the workers get plain
+dictionaries and never touch the database.
+"""
+
+import hashlib
+import json
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.template import Context, engines
+from django.template.loader_tags import ExtendsNode
+from django.template.loader import render_to_string
+
+from .models import Article, Publisher, RelatedArticle
+
+MANIFEST = "manifest.json"
+ARTICLE_TEMPLATE = "news/read_article.html"
+PUBLISHER_TEMPLATE = "news/publisher_index.html"
+
+
+def _init_worker():
+    # Workers started with "spawn" or "forkserver" import nothing yet.
+    if not apps.ready:
+        django.setup()
+
+
+def _template_hash(name):
+    """
+    Hash a template together with every template it extends.
+    """
+    digest = hashlib.sha256()
+    while name:
+        template = engines["django"].get_template(name).template
+        digest.update(template.source.encode())
+        extends = template.nodelist.get_nodes_by_type(ExtendsNode)
+        name = extends[0].parent_name.resolve(Context()) if extends else None
+    return digest.hexdigest()
+
+
+def _digest(template_hash, context):
+    payload = json.dumps(context, sort_keys=True, default=str)
+    return hashlib.sha256(f"{template_hash}:{payload}".encode()).hexdigest()
+
+
+def _write(output, name, content):
+    path = Path(output) / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.{os.getpid()}.part")
+    partial.write_text(content, encoding="utf-8")
+    os.replace(partial, path)
+
+
+def render_pages(output, jobs):
+    """
+    Render (name, template, context) jobs into files below output.
+
+    Runs in worker processes; returns the names written.
+    """
+    for name, template, context in jobs:
+        _write(output, name, render_to_string(template, context))
+    return [name for name, _, _ in jobs]
+
+
+def collect_pages():
+    """
+    Return {file name: (template, context)} of every page to export.
+    """
+    articles = list(
+        Article.objects.filter(approved=True)
+        .select_related("created_by", "publisher")
+        .only(
+            "id", "title", "content", "approved",
+            "created_by__username", "publisher__name",
+        )
+        .order_by("-approved_at", "-id")
+    )
+
+    related = defaultdict(list)
+    links = (
+        RelatedArticle.objects.filter(related__approved=True)
+        .order_by("article_id", "rank")
+        .values_list("article_id", "related_id", "related__title")
+    )
+    top_n = getattr(settings, "RELATED_ARTICLES_TOP_N", 5)
+    for article_id, related_id, title in links:
+        if len(related[article_id]) < top_n:
+            related[article_id].append({"id": related_id, "title": title})
+
+    pages = {}
+    by_publisher = defaultdict(list)
+    for article in articles:
+        pages[f"read/{article.id}/index.html"] = (ARTICLE_TEMPLATE, {
+            "article": {
+                "id": article.id,
+                "title": article.title,
+                "content": article.content,
+                "approved": True,
+                "created_by": {"username": article.created_by.username},
+                "publisher": {"name": article.publisher.name} if article.publisher else None,
+            },
+            "related_articles": related[article.id],
+        })
+        if article.publisher_id:
+            by_publisher[article.publisher_id].append(
+                {"id": article.id, "title": article.title, "author": article.created_by.username}
+            )
+
+    for publisher in Publisher.objects.filter(id__in=by_publisher).only("id", "name"):
+        pages[f"publisher/{publisher.id}/index.html"] = (PUBLISHER_TEMPLATE, {
+            "publisher": {"id": publisher.id, "name": publisher.name},
+            "articles": by_publisher[publisher.id],
+        })
+    return pages
+
+
+def export(output=None, workers=None, force=False, chunk_size=50):
+    """
+    Bring the export directory up to date.
+
+    Returns a dict with the number of pages rendered, skipped and removed.
+    """
+    output = Path(output or settings.STATIC_EXPORT_DIR)
+    manifest_path = output / MANIFEST
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+
+    template_hashes = {
+        name: _template_hash(name) for name in (ARTICLE_TEMPLATE, PUBLISHER_TEMPLATE)
+    }
+    pages = collect_pages()
+    digests = {
+        name: _digest(template_hashes[template], context)
+        for name, (template, context) in pages.items()
+    }
+
+    stale = [
+        (name, *pages[name]) for name in pages
+        if force or manifest.get(name) != digests[name] or not (output / name).exists()
+    ]
+    if stale:
+        chunks = [stale[i:i + chunk_size] for i in range(0, len(stale), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            for _ in executor.map(render_pages, [output] * len(chunks), chunks):
+                pass
+
+    removed = [name for name in manifest if name not in pages]
+    for name in removed:
+        (output / name).unlink(missing_ok=True)
+
+    output.mkdir(parents=True, exist_ok=True)
+    _write(output, MANIFEST, json.dumps(digests, indent=1, sort_keys=True))
+    return {
+        "rendered": len(stale),
+        "skipped": len(pages) - len(stale),
+        "removed": len(removed),
+    }
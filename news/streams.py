@@ -0,0 +1,118 @@
+"""
+Server-Sent Events stream of a user's new notifications.
+
+The view is asynchronous: served by an ASGI server (see
+new_project/asgi.py) an idle connection is only a suspended coroutine
+and a queue, so one worker can hold thousands of them. Under WSGI every
+open stream would pin a worker thread for its lifetime, so the view
+answers 501 there and clients keep the server-rendered list.
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+
+from .pubsub import hub, latest_notification_id, notifications_after
+
+
+def format_event(payload):
+    return (
+        f"id: {payload['id']}\n"
+        f"event: notification\n"
+        f"data: {json.dumps(payload)}\n\n"
+    )
+
+
+async def event_stream(recipient_id, last_id):
+    """
+    Yield SSE frames for notifications of recipient_id newer than last_id.
+
+    Sends a comment line as heartbeat when nothing was sent for
+    SSE_HEARTBEAT_INTERVAL seconds, and re-reads from the database whenever the
+    subscriber's queue overflowed.
+    """
+    heartbeat = getattr(settings, "SSE_HEARTBEAT_INTERVAL", 15.0)
+    subscriber = hub.subscribe(recipient_id)
+    last_sent = time.monotonic()
+    # Digest rows keep their id when updated: remember the count sent per
+    # id so an update is sent once, whether it arrives published or polled.
+    sent_counts = {}
+
+    def is_new(payload):
+        if payload["id"] <= last_id and payload["count"] <= sent_counts.get(payload["id"], 1):
+            return False
+        sent_counts[payload["id"]] = payload["count"]
+        if len(sent_counts) > 1000:
+            del sent_counts[next(iter(sent_counts))]
+        return True
+
+    try:
+        yield f"retry: {int(getattr(settings, 'SSE_RETRY_MS', 5000))}\n\n"
+
+        backlog = await sync_to_async(notifications_after)([recipient_id], last_id)
+        for payload in backlog:
+            payload.pop("recipient_id")
+            last_id = payload["id"]
+            yield format_event(payload)
+
+        while True:
+            try:
+                payload = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                payload = None
+
+            if subscriber.overflowed:
+                subscriber.overflowed = False
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                payload = None
+                for row in await sync_to_async(notifications_after)([recipient_id], last_id):
+                    row.pop("recipient_id")
+                    last_id = row["id"]
+                    last_sent = time.monotonic()
+                    yield format_event(row)
+
+            if payload is not None and is_new(payload):
+                last_id = max(last_id, payload["id"])
+                last_sent = time.monotonic()
+                yield format_event(payload)
+            elif time.monotonic() - last_sent >= heartbeat:
+                last_sent = time.monotonic()
+                yield ": heartbeat\n\n"
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+async def notification_stream(request):
+    """
+    Stream new notifications of the logged-in user as Server-Sent Events.
+
+    Resumes after the Last-Event-ID header (sent by EventSource on
+    reconnect) or ?last_id=; otherwise starts from the newest notification.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(
+            "Notification streams need an ASGI server (manage.py serve --asgi).",
+            status=501, content_type="text/plain",
+        )
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse(status=401)
+
+    last_id = request.headers.get("Last-Event-ID") or request.GET.get("last_id")
+    if last_id and last_id.isdigit():
+        last_id = int(last_id)
+    else:
+        last_id = await sync_to_async(latest_notification_id)()
+
+    response = StreamingHttpResponse(
+        event_stream(user.id, last_id), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
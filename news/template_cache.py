@@ -0,0 +1,53 @@
+"""
+Warm-up of the cached template loader.
+
+``TEMPLATES`` wraps the filesystem and app-directory loaders in the
+cached loader in every mode, so a template is parsed once per process.
+``warm_templates`` compiles every template of the project's own template
+directories up front (news/templates), which the production server and
+the WSGI/ASGI entry points call at boot so no request pays for parsing.
+"""
+
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.template.autoreload import reset_loaders
+
+
+def template_names():
+    """
+    Yield (engine, name) for every template under the project's template dirs.
+    """
+    base = Path(settings.BASE_DIR).resolve()
+    for engine in engines.all():
+        directories = dict.fromkeys(
+            Path(directory)
+            for loader in getattr(engine, "engine", engine).template_loaders
+            for directory in loader.get_dirs()
+        )
+        for directory in directories:
+            if not directory.is_dir() or not directory.resolve().is_relative_to(base):
+                continue
+            for path in sorted(directory.rglob("*.html")):
+                yield engine, path.relative_to(directory).as_posix()
+
+
+def warm_templates():
+    """
+    Compile every project template into the loader cache; return {name: seconds}.
+    """
+    timings = {}
+    for engine, name in template_names():
+        started = time.perf_counter()
+        engine.get_template(name)
+        timings[name] = time.perf_counter() - started
+    return timings
+
+
+def reset_templates():
+    """
+    Empty the cached loaders, as if the process had just started.
+    """
+    reset_loaders()
@@ -1,7 +1,66 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import gzip
+from concurrent.futures import Future
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import numpy
+from django.conf import settings
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import OperationalError, connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from django.urls import reverse
-from django.contrib.auth import get_user_model
-from .models import Article, Publisher, Subscription, Newsletter
+from django.contrib.auth import get_user, get_user_model
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template import engines
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from .models import (
+    Article, Publisher, Subscription, Newsletter, TrendingScore,
+    RelatedArticle, ArticleTerms, ArticleSignature, DuplicateFlag, ArticleChange,
+    Notification, ImageAsset, DailyStats, DailyPublisherStats, IdempotencyKey,
+)
+from .counters import ViewCounterBuffer, view_counter, pending_views
+from . import trending
+from . import related
+from . import dedup
+from . import metrics
+from . import querylog
+from . import article_cache
+from . import response_cache
+from . import feed
+from . import pubsub
+from . import images
+from . import thumbnails
+from . import rollups
+from . import sqlite
+from . import server
+from . import template_cache
+from . import user_cache
+from . import ratelimit
+from . import idempotency
+from . import views
+from .write_queue import WriteQueue
+from .admission import Gate, admission
+from .streams import event_stream
+from .notifications import notify_new_article
 
 User = get_user_model()
 
@@ -12,6 +71,9 @@ class BaseTestSetup(TestCase):
     """
 
     def setUp(self):
+        # Write buffered article views inside the test transaction
+        self.addCleanup(view_counter.flush)
+
         # Create users WITH UNIQUE EMAILS (IMPORTANT for MariaDB)
         self.reader = User.objects.create_user(
             username="reader1",
@@ -198,3 +260,1865 @@ class NewsletterTests(BaseTestSetup):
         self.newsletter.refresh_from_db()
         self.assertTrue(self.newsletter.approved)
         self.assertEqual(response.status_code, 302)
+
+
+# ===============================
+# View Counter Tests
+# ===============================
+
+class ViewCounterTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        view_counter.flush()
+        cache.clear()
+        self.article.approved = True
+        self.article.save()
+
+    def test_reads_are_buffered_until_flush(self):
+        self.client.login(username="reader1", password="pass123")
+
+        for _ in range(3):
+            self.client.get(reverse("read_article", args=[self.article.id]))
+
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.views, 0)
+        self.assertEqual(pending_views([self.article.id]), {self.article.id: 3})
+
+        view_counter.flush()
+
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.views, 3)
+        self.assertEqual(pending_views([self.article.id]), {self.article.id: 0})
+
+    def test_flush_is_a_single_update(self):
+        other = Article.objects.create(
+            title="Other", content="Body", created_by=self.journalist, approved=True
+        )
+        view_counter.record(self.article.id)
+        view_counter.record(other.id, count=4)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(view_counter.flush(), 2)
+
+        other.refresh_from_db()
+        self.assertEqual(other.views, 4)
+
+    def test_timer_flushes_a_buffer_nobody_records_into(self):
+        buffer = ViewCounterBuffer(flush_interval=0.1)
+        flushed = threading.Event()
+        buffer.record(self.article.id)
+
+        def flush():
+            buffer._pending.clear()
+            flushed.set()
+
+        with mock.patch.object(buffer, "flush", side_effect=flush):
+            buffer.start_flusher()
+            self.addCleanup(buffer.stop_flusher, timeout=5)
+            buffer.start_flusher()
+            self.assertTrue(flushed.wait(timeout=5))
+
+        self.assertEqual(
+            [t.name for t in threading.enumerate()].count("view-counter-flush"), 1
+        )
+
+    def test_most_read_endpoint_orders_by_views(self):
+        other = Article.objects.create(
+            title="Popular", content="Body", created_by=self.journalist,
+            approved=True, views=10
+        )
+
+        response = self.client.get(reverse("api_articles_most_read"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in response.json()],
+            [other.id, self.article.id]
+        )
+
+    def test_most_read_endpoint_counts_pending_views(self):
+        other = Article.objects.create(
+            title="Popular", content="Body", created_by=self.journalist,
+            approved=True, views=10
+        )
+        view_counter.record(self.article.id, count=11)
+
+        response = self.client.get(reverse("api_articles_most_read"))
+
+        self.assertEqual(
+            [(item["id"], item["views"]) for item in response.json()],
+            [(self.article.id, 11), (other.id, 10)]
+        )
+
+
+# ===============================
+# Trending Tests
+# ===============================
+
+class TrendingTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.article.approved = True
+        self.article.save()
+        self.popular = Article.objects.create(
+            title="Popular", content="Body", created_by=self.journalist,
+            approved=True, views=50
+        )
+
+    def test_recompute_ranks_by_activity(self):
+        snapshot = trending.recompute()
+
+        self.assertEqual(
+            [item["id"] for item in snapshot["articles"]],
+            [self.popular.id, self.article.id]
+        )
+        self.assertEqual(TrendingScore.objects.count(), 2)
+
+    def test_scores_decay_and_only_new_reads_are_added(self):
+        now = timezone.now()
+        trending.recompute(now=now)
+
+        Article.objects.filter(id=self.article.id).update(views=10)
+        trending.recompute(now=now + timedelta(hours=6))
+
+        popular = TrendingScore.objects.get(article=self.popular)
+        article = TrendingScore.objects.get(article=self.article)
+        self.assertAlmostEqual(popular.score, 25.0)
+        self.assertAlmostEqual(article.score, 10.0)
+        self.assertEqual(article.views_seen, 10)
+
+    def test_trending_endpoint_serves_snapshot(self):
+        trending.recompute()
+        Article.objects.create(
+            title="Unseen", content="Body", created_by=self.journalist,
+            approved=True, views=500
+        )
+
+        response = self.client.get(reverse("api_articles_trending"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [item["id"] for item in response.json()["articles"]],
+            [self.popular.id, self.article.id]
+        )
+
+    def test_cache_miss_ranks_stored_scores_without_writing(self):
+        trending.recompute()
+        cache.clear()
+        Article.objects.filter(id=self.article.id).update(views=500)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("api_articles_trending"))
+
+        self.assertEqual(
+            [item["id"] for item in response.json()["articles"]],
+            [self.popular.id, self.article.id]
+        )
+        self.assertTrue(all(q["sql"].startswith("SELECT") for q in queries))
+        self.assertEqual(TrendingScore.objects.get(article=self.article).views_seen, 0)
+
+    def test_removed_articles_leave_the_snapshot(self):
+        trending.recompute()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.popular.delete()
+        self.assertEqual(
+            [item["id"] for item in trending.get_snapshot()["articles"]], [self.article.id]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.approved = False
+            self.article.save()
+        self.assertEqual(trending.get_snapshot()["articles"], [])
+
+    def test_fallback_snapshot_expires(self):
+        with mock.patch.object(trending.cache, "set") as cache_set:
+            trending.get_snapshot()
+
+        self.assertEqual(cache_set.call_args.kwargs["timeout"], 300)
+
+
+# ===============================
+# Related Articles Tests
+# ===============================
+
+@override_settings(RELATED_INDEX_IN_BACKGROUND=False)
+class RelatedArticlesTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.election = Article.objects.create(
+            title="Election results announced",
+            content="The election results show a close race for parliament.",
+            created_by=self.journalist, approved=True
+        )
+        self.recount = Article.objects.create(
+            title="Election recount requested",
+            content="A recount of the parliament election votes was requested.",
+            created_by=self.journalist, approved=True
+        )
+        self.football = Article.objects.create(
+            title="Football final",
+            content="The football final ended in a penalty shootout.",
+            created_by=self.journalist, approved=True
+        )
+
+    def test_rebuild_links_similar_articles(self):
+        self.assertEqual(related.rebuild(), 3)
+
+        self.assertEqual(related.related_for(self.election), [self.recount])
+        self.assertEqual(related.related_for(self.football), [])
+
+    def test_approval_indexes_article_incrementally(self):
+        related.rebuild()
+        self.article.title = "Parliament election turnout"
+        self.article.content = "Turnout in the parliament election was high."
+        self.article.save()
+
+        self.client.login(username="editor1", password="pass123")
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.get(reverse("approve_article", args=[self.article.id]))
+        # Nothing is indexed on the request itself, only after commit.
+        self.assertFalse(ArticleTerms.objects.filter(article=self.article).exists())
+        for callback in callbacks:
+            callback()
+
+        self.assertIn(self.election, related.related_for(self.article))
+        self.assertTrue(
+            RelatedArticle.objects.filter(
+                article=self.recount, related=self.article
+            ).exists()
+        )
+
+    def test_lists_that_lose_an_article_are_refilled(self):
+        turnout = Article.objects.create(
+            title="Parliament election turnout",
+            content="Turnout in the parliament election was high.",
+            created_by=self.journalist, approved=True
+        )
+        related.rebuild(top_n=1)
+        self.assertEqual(related.related_for(self.election, 1), [turnout])
+
+        turnout.title = "Football turnout results"
+        turnout.content = "Turnout at the football final was high."
+        turnout.save()
+        related.index_article(turnout, top_n=1)
+        self.assertEqual(related.related_for(self.election, 1), [self.recount])
+
+        self.client.login(username="editor1", password="pass123")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("delete_article", args=[self.recount.id]))
+        self.assertEqual(related.related_for(self.election, 1), [turnout])
+
+    def test_read_article_uses_one_lookup_for_related(self):
+        related.rebuild()
+        self.client.login(username="reader1", password="pass123")
+
+        response = self.client.get(reverse("read_article", args=[self.election.id]))
+
+        self.assertEqual(response.context["related_articles"], [self.recount])
+        self.assertContains(response, "Election recount requested")
+
+
+# ===============================
+# Duplicate Detection Tests
+# ===============================
+
+class DuplicateDetectionTests(BaseTestSetup):
+
+    STORY = (
+        "The city council voted on Tuesday to approve the new public "
+        "transport budget, which includes funding for three bus routes "
+        "and a light rail extension to the northern suburbs."
+    )
+
+    def test_signature_similarity_tracks_overlap(self):
+        base = dedup.signature("Budget", self.STORY)
+        near = dedup.signature("Budget", self.STORY + " Officials welcomed it.")
+        other = dedup.signature("Football", "The final ended in penalties.")
+
+        scores = dedup.similarity(base, numpy.stack([near, other]))
+        self.assertGreater(scores[0], 0.7)
+        self.assertLess(scores[1], 0.2)
+
+    def test_resubmission_is_flagged_for_editors(self):
+        original = Article.objects.create(
+            title="Council approves budget", content=self.STORY,
+            created_by=self.journalist
+        )
+        dedup.register(original)
+
+        self.client.login(username="journalist1", password="pass123")
+        self.client.post(reverse("create_article"), {
+            "title": "Council approves budget",
+            "content": self.STORY,
+        })
+
+        resubmitted = Article.objects.latest("id")
+        flag = DuplicateFlag.objects.get(article=resubmitted)
+        self.assertEqual(flag.duplicate_of, original)
+
+        self.client.login(username="editor1", password="pass123")
+        response = self.client.get(reverse("dashboard"))
+        self.assertContains(response, "Possible duplicate of")
+
+    def test_edit_replaces_duplicate_flags(self):
+        original = Article.objects.create(
+            title="Council approves budget", content=self.STORY,
+            created_by=self.journalist
+        )
+        copy = Article.objects.create(
+            title="Council approves budget", content=self.STORY,
+            created_by=self.journalist
+        )
+        dedup.register(original)
+        self.assertEqual(len(dedup.register(copy)), 1)
+
+        self.client.login(username="journalist1", password="pass123")
+        self.client.post(reverse("update_article", args=[copy.id]), {
+            "title": "Football final",
+            "content": "The football final ended in a penalty shootout.",
+        })
+        self.assertFalse(DuplicateFlag.objects.exists())
+
+        self.client.post(reverse("update_article", args=[original.id]), {
+            "title": "Football final",
+            "content": "The football final ended in a penalty shootout.",
+        })
+        flag = DuplicateFlag.objects.get()
+        self.assertEqual((flag.article, flag.duplicate_of), (copy, original))
+
+    def test_backfill_signs_existing_articles(self):
+        Article.objects.create(
+            title="Council approves budget", content=self.STORY,
+            created_by=self.journalist
+        )
+        Article.objects.create(
+            title="Council approves budget", content=self.STORY,
+            created_by=self.journalist
+        )
+
+        signed, flagged = dedup.backfill()
+
+        self.assertEqual(signed, 3)
+        self.assertEqual(flagged, 1)
+        self.assertEqual(ArticleSignature.objects.count(), 3)
+
+
+# ===============================
+# Metrics Tests
+# ===============================
+
+class MetricsTests(BaseTestSetup):
+
+    def test_metrics_endpoint_reports_request_latency(self):
+        self.client.get(reverse("home"))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn("# TYPE news_request_duration_seconds histogram", body)
+        self.assertIn('news_request_duration_seconds_count{view="home"}', body)
+        self.assertIn('news_job_queue_depth{queue="view_counter"}', body)
+
+    def test_notifications_are_counted(self):
+        before = metrics.notifications_written.snapshot().get((), 0)
+        Subscription.objects.create(reader=self.reader, journalist=self.journalist)
+
+        self.client.login(username="journalist1", password="pass123")
+        self.client.post(reverse("create_article"), {
+            "title": "Another", "content": "Body"
+        })
+
+        self.assertEqual(metrics.notifications_written.snapshot()[()], before + 1)
+
+    def test_values_from_other_workers_are_summed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                metrics.emails_sent.inc(2)
+                own = metrics.emails_sent.snapshot()[()]
+                # Any live process stands in for another worker.
+                Path(directory, f"{os.getppid()}.json").write_text(json.dumps({
+                    "news_emails_sent_total": [[[], 5]]
+                }))
+
+                totals = metrics.registry.aggregate()
+
+        self.assertEqual(totals["news_emails_sent_total"][()], own + 5)
+
+    def test_files_of_dead_workers_are_skipped_and_removed(self):
+        worker = subprocess.Popen([sys.executable, "-c", "pass"])
+        worker.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                stale = Path(directory, f"{worker.pid}.json")
+                stale.write_text(json.dumps({"news_emails_sent_total": [[[], 5]]}))
+                own = metrics.emails_sent.snapshot().get((), 0)
+
+                totals = metrics.registry.aggregate()
+
+                self.assertEqual(totals["news_emails_sent_total"].get((), 0), own)
+                self.assertFalse(stale.exists())
+
+    def test_metrics_are_limited_to_allowed_addresses(self):
+        with self.settings(METRICS_ALLOWED_IPS=["10.0.0.0/8"]):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+            response = self.client.get(reverse("metrics"), REMOTE_ADDR="10.1.2.3")
+            self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_token_is_required_when_set(self):
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+# ===============================
+# Slow Query Log Tests
+# ===============================
+
+class SlowQueryLogTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log_path = Path(directory.name) / "slow.jsonl"
+
+    def test_normalize_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            querylog.normalize("SELECT * FROM t WHERE id IN (%s, %s,  %s) AND n = 5"),
+            "SELECT * FROM t WHERE id IN (?) AND n = ?"
+        )
+        self.assertEqual(
+            querylog.fingerprint("SELECT 1 FROM t WHERE a IN (%s)"),
+            querylog.fingerprint("SELECT 2 FROM t WHERE a IN (%s, %s)")
+        )
+
+    def test_slow_queries_are_logged_with_view_template_and_plan(self):
+        self.client.login(username="reader1", password="pass123")
+
+        with override_settings(
+            SLOW_QUERY_THRESHOLD_MS=0.000001,
+            SLOW_QUERY_EXPLAIN_SAMPLE_RATE=1.0,
+            SLOW_QUERY_LOG=self.log_path,
+        ):
+            self.client.get(reverse("dashboard"))
+
+        entries = list(querylog.read_log(self.log_path))
+        self.assertTrue(entries)
+        self.assertTrue(all(entry["view"] == "dashboard" for entry in entries))
+        self.assertTrue(any(
+            (entry["template"] or "").startswith("news/reader_dashboard.html:")
+            for entry in entries
+        ))
+        self.assertTrue(any(entry.get("explain") for entry in entries))
+
+        output = StringIO()
+        call_command("slow_queries", log=str(self.log_path), stdout=output)
+        self.assertIn(entries[0]["fingerprint"], output.getvalue())
+
+
+# ===============================
+# Profiling Tests
+# ===============================
+
+class ProfilingTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def test_authorized_header_profiles_request(self):
+        with override_settings(PROFILER_TOKEN="t0ken", PROFILER_DIR=self.directory):
+            self.client.get(reverse("home"))
+            self.assertEqual(list(self.directory.iterdir()), [])
+
+            self.client.get(reverse("home"), HTTP_X_PROFILE="t0ken")
+
+        files = list(self.directory.iterdir())
+        self.assertEqual(len(files), 1)
+        self.assertTrue(files[0].name.startswith("home-"))
+        self.assertEqual(files[0].suffix, ".prof")
+
+    def test_sampler_profiles_rotate_and_merge(self):
+        with override_settings(
+            PROFILER_SAMPLE_RATE=1.0, PROFILER_MODE="sampler",
+            PROFILER_INTERVAL=0.0005, PROFILER_DIR=self.directory,
+            PROFILER_MAX_FILES=2,
+        ):
+            for _ in range(3):
+                self.client.get(reverse("home"))
+
+        self.assertEqual(len(list(self.directory.glob("home-*.collapsed"))), 2)
+
+        output = self.directory / "report"
+        call_command(
+            "merge_profiles", dir=str(self.directory), view="home",
+            output=str(output), stdout=StringIO()
+        )
+        self.assertTrue(output.with_suffix(".collapsed").exists())
+
+
+# ===============================
+# Sparse Fieldset Tests
+# ===============================
+
+class SparseFieldsetTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.article.approved = True
+        self.article.save()
+
+    def test_fields_narrow_output_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("api_articles"), {"fields": "id,title"})
+
+        self.assertEqual(response.json(), [{"id": self.article.id, "title": "Test Article"}])
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn('"content"', sql)
+
+    def test_exclude_drops_content(self):
+        response = self.client.get(
+            reverse("api_article_detail", args=[self.article.id]), {"exclude": "content"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("content", response.json())
+        self.assertIn("title", response.json())
+
+    def test_expand_uses_a_join(self):
+        Article.objects.create(
+            title="Second", content="Body", created_by=self.journalist,
+            publisher=self.publisher, approved=True
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                reverse("api_articles"),
+                {"fields": "title", "expand": "created_by,publisher"}
+            )
+
+        first = response.json()[0]
+        self.assertEqual(first["created_by"], {
+            "id": self.journalist.id, "username": "journalist1", "role": "journalist"
+        })
+        self.assertEqual(first["publisher"], {"id": self.publisher.id, "name": "Test Publisher"})
+
+    def test_reader_api_supports_fieldsets_and_rejects_unknown_fields(self):
+        self.client.login(username="reader1", password="pass123")
+
+        response = self.client.get(reverse("api_reader_articles"), {"fields": "title"})
+        self.assertEqual(response.json(), [{"title": "Test Article"}])
+
+        response = self.client.get(reverse("api_reader_articles"), {"fields": "secret"})
+        self.assertEqual(response.status_code, 400)
+
+
+# ===============================
+# Batch Article API Tests
+# ===============================
+
+class ArticleBatchTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.first = Article.objects.create(
+            title="First", content="Body", created_by=self.journalist, approved=True
+        )
+        self.second = Article.objects.create(
+            title="Second", content="Body", created_by=self.journalist, approved=True
+        )
+
+    def test_batch_preserves_order_and_reports_missing(self):
+        ids = f"{self.second.id},{self.article.id},{self.first.id},999999"
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("api_articles_batch"), {"ids": ids})
+
+        body = response.json()
+        self.assertEqual(
+            [item["id"] for item in body["articles"]], [self.second.id, self.first.id]
+        )
+        self.assertEqual(body["missing"], [self.article.id, 999999])
+
+    def test_batch_shares_detail_cache(self):
+        self.client.get(reverse("api_article_detail", args=[self.first.id]))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(
+                reverse("api_articles_batch"), {"ids": f"{self.first.id},{self.second.id}"}
+            )
+
+        self.assertEqual(len(queries), 1)
+        self.assertIn(f"IN ({self.second.id})", queries[0]["sql"])
+
+        with self.assertNumQueries(0):
+            self.client.get(reverse("api_article_detail", args=[self.second.id]))
+
+    def test_edit_invalidates_cached_article(self):
+        self.client.get(reverse("api_article_detail", args=[self.first.id]))
+        self.first.title = "Edited"
+        self.first.save()
+
+        response = self.client.get(reverse("api_article_detail", args=[self.first.id]))
+
+        self.assertEqual(response.json()["title"], "Edited")
+
+    def test_article_cached_before_the_commit_is_dropped_after_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.title = "Retitled"
+            self.first.save()
+            # Another worker reads the old row before the commit.
+            cache.set(article_cache.KEY.format(self.first.id), {"title": "Old"})
+
+        response = self.client.get(reverse("api_articles_batch"), {"ids": self.first.id})
+
+        self.assertEqual(response.json()["articles"][0]["title"], "Retitled")
+
+    def test_form_post_with_repeated_ids_reads_every_value(self):
+        response = self.client.post(
+            reverse("api_articles_batch"),
+            f"ids={self.first.id}&ids={self.second.id}",
+            content_type="application/x-www-form-urlencoded",
+        )
+        self.assertEqual(
+            [item["id"] for item in response.json()["articles"]],
+            [self.first.id, self.second.id]
+        )
+
+    def test_post_form_and_limits(self):
+        response = self.client.post(
+            reverse("api_articles_batch"),
+            {"ids": [self.first.id, self.second.id]},
+            content_type="application/json",
+        )
+        self.assertEqual(len(response.json()["articles"]), 2)
+
+        with override_settings(ARTICLE_BATCH_MAX_IDS=1):
+            response = self.client.get(
+                reverse("api_articles_batch"), {"ids": f"{self.first.id},{self.second.id}"}
+            )
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_json_bodies_are_rejected(self):
+        for body in ({"ids": 5}, {"ids": None}, {"ids": [[1]]}, {"ids": [True]}, [1, 2]):
+            response = self.client.post(
+                reverse("api_articles_batch"), body, content_type="application/json"
+            )
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn("ids", response.json())
+
+
+# ===============================
+# Article List Response Cache Tests
+# ===============================
+
+class ArticleListCacheTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.article.approved = True
+        self.article.save()
+
+    def test_second_request_is_served_compressed_from_cache(self):
+        first = self.client.get(reverse("api_articles"), HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(first["X-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse("api_articles"), HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", second["Vary"])
+        data = json.loads(gzip.decompress(second.content))
+        self.assertEqual(data[0]["title"], "Test Article")
+
+    def test_article_save_makes_entry_stale(self):
+        self.client.get(reverse("api_articles"))
+        Article.objects.create(
+            title="Fresh", content="Body", created_by=self.journalist, approved=True
+        )
+
+        response = self.client.get(reverse("api_articles"))
+
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.json()), 2)
+
+    def test_list_rendered_before_the_commit_is_stale_after_it(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Article.objects.create(
+                title="Fresh", content="Body", created_by=self.journalist, approved=True
+            )
+            # Another worker renders between the save and the commit.
+            self.client.get(reverse("api_articles"))
+
+        response = self.client.get(reverse("api_articles"))
+
+        self.assertEqual(response["X-Cache"], "MISS")
+
+    def test_stale_entry_is_served_while_another_worker_regenerates(self):
+        self.client.get(reverse("api_articles"))
+        response_cache.bump_version()
+        digest = response_cache.request_digest(RequestFactory().get(reverse("api_articles")))
+        self.assertTrue(cache.add(response_cache.LOCK_KEY.format(digest), 1))
+
+        response = self.client.get(reverse("api_articles"))
+
+        self.assertEqual(response["X-Cache"], "STALE")
+
+    def test_accept_encoding_parsing(self):
+        self.assertEqual(
+            response_cache.accepted_encodings("gzip;q=0, br, deflate;q=0.5"),
+            {"br", "deflate"}
+        )
+
+
+# ===============================
+# Incremental Feed Tests
+# ===============================
+
+@override_settings(FEED_SETTLE_SECONDS=0)
+class ReaderFeedTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        Subscription.objects.create(reader=self.reader, journalist=self.journalist)
+        self.client.login(username="reader1", password="pass123")
+
+    def approve(self, article):
+        article.approved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            article.save()
+
+    def test_approval_sets_approved_at(self):
+        self.assertIsNone(self.article.approved_at)
+        self.approve(self.article)
+        self.assertIsNotNone(self.article.approved_at)
+
+    def test_since_returns_only_newer_articles(self):
+        self.approve(self.article)
+        first = self.client.get(reverse("api_feed")).json()
+        self.assertEqual([a["id"] for a in first["articles"]], [self.article.id])
+
+        newer = Article.objects.create(
+            title="Newer", content="Body", created_by=self.journalist
+        )
+        self.approve(newer)
+
+        response = self.client.get(reverse("api_feed"), {"since": first["next_cursor"]})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual([a["id"] for a in body["articles"]], [newer.id])
+        self.assertEqual(feed.decode_cursor(body["next_cursor"])[1], newer.id)
+
+    def test_idle_poll_is_204_without_feed_query(self):
+        self.approve(self.article)
+        cursor = self.client.get(reverse("api_feed")).json()["next_cursor"]
+
+        self.assertEqual(
+            self.client.get(reverse("api_feed"), {"since": cursor}).status_code, 204
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("api_feed"), {"since": cursor})
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(any("news_article" in q["sql"] for q in queries))
+
+    @override_settings(FEED_SETTLE_SECONDS=60)
+    def test_cursor_stops_before_unsettled_approvals(self):
+        self.approve(self.article)
+        first = self.client.get(reverse("api_feed"))
+        self.assertEqual(first.json()["articles"], [])
+
+        later = timezone.now() + timedelta(seconds=61)
+        with mock.patch.object(feed.timezone, "now", return_value=later):
+            response = self.client.get(
+                reverse("api_feed"), {"since": first.json()["next_cursor"]}
+            )
+        self.assertEqual([a["id"] for a in response.json()["articles"]], [self.article.id])
+
+    def test_unapproving_clears_approved_at(self):
+        self.approve(self.article)
+        self.article.approved = False
+        self.article.save()
+        self.article.refresh_from_db()
+        self.assertIsNone(self.article.approved_at)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("api_feed"), {"since": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+# ===============================
+# Change Log Tests
+# ===============================
+
+@override_settings(CHANGELOG_SETTLE_SECONDS=0)
+class ArticleChangeLogTests(BaseTestSetup):
+
+    def test_article_lifecycle_is_logged_in_order(self):
+        self.client.login(username="journalist1", password="pass123")
+        self.client.post(reverse("create_article"), {"title": "Logged", "content": "Body"})
+        article = Article.objects.get(title="Logged")
+
+        self.client.login(username="editor1", password="pass123")
+        self.client.get(reverse("approve_article", args=[article.id]))
+        self.client.post(reverse("update_article", args=[article.id]), {
+            "title": "Logged again", "content": "Body", "approved": "on"
+        })
+        self.client.get(reverse("delete_article", args=[article.id]))
+
+        changes = list(ArticleChange.objects.filter(article_id=article.id).order_by("seq"))
+        self.assertEqual(
+            [change.action for change in changes],
+            ["create", "approve", "update", "delete"]
+        )
+        self.assertEqual(changes[2].data["title"], "Logged again")
+        self.assertIsNone(changes[3].data)
+
+    def test_changes_endpoint_pages_after_seq(self):
+        first = ArticleChange.objects.create(article_id=1, action="create", data={})
+        second = ArticleChange.objects.create(article_id=1, action="delete")
+        self.client.login(username="editor1", password="pass123")
+
+        response = self.client.get(reverse("api_changes"), {"after": first.seq, "limit": 5})
+
+        body = response.json()
+        self.assertEqual([c["seq"] for c in body["changes"]], [second.seq])
+        self.assertIsNone(body["changes"][0]["data"])
+        self.assertEqual(body["next_after"], second.seq)
+        self.assertFalse(body["has_more"])
+
+    def test_changes_endpoint_requires_editor(self):
+        self.client.login(username="reader1", password="pass123")
+        self.assertEqual(self.client.get(reverse("api_changes")).status_code, 403)
+
+
+# ===============================
+# Notification Stream Tests
+# ===============================
+
+@override_settings(SSE_POLL_INTERVAL=60, SSE_HEARTBEAT_INTERVAL=0.05)
+class NotificationStreamTests(BaseTestSetup):
+
+    def test_stream_requires_login(self):
+        response = async_to_sync(self.async_client.get)(reverse("notification_stream"))
+        self.assertEqual(response.status_code, 401)
+
+    def test_stream_is_not_served_under_wsgi(self):
+        self.client.login(username="reader1", password="pass123")
+        response = self.client.get(reverse("notification_stream"))
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+
+    def test_stream_sends_backlog_published_events_and_heartbeats(self):
+        missed = Notification.objects.create(recipient=self.reader, message="Missed")
+
+        async def read_frames():
+            stream = event_stream(self.reader.id, missed.id - 1)
+            try:
+                frames = [await stream.__anext__() for _ in range(2)]
+                pubsub.hub.publish(self.reader.id, {
+                    "id": missed.id + 1, "message": "Pushed", "count": 1,
+                    "created_at": "now",
+                })
+                frames.append(await stream.__anext__())
+                frames.append(await stream.__anext__())
+                return frames
+            finally:
+                await stream.aclose()
+
+        frames = async_to_sync(read_frames)()
+
+        self.assertTrue(frames[0].startswith("retry: "))
+        self.assertIn(f"id: {missed.id}\n", frames[1])
+        self.assertIn('"message": "Pushed"', frames[2])
+        self.assertEqual(frames[3], ": heartbeat\n\n")
+        self.assertEqual(pubsub.hub.subscriber_count(), 0)
+
+    def test_committed_notification_is_published(self):
+        def create():
+            with self.captureOnCommitCallbacks(execute=True):
+                return Notification.objects.create(recipient=self.reader, message="Live")
+
+        async def receive():
+            subscriber = pubsub.hub.subscribe(self.reader.id)
+            try:
+                note = await sync_to_async(create)()
+                return note, await asyncio.wait_for(subscriber.queue.get(), timeout=1)
+            finally:
+                pubsub.hub.unsubscribe(subscriber)
+
+        note, payload = async_to_sync(receive)()
+
+        self.assertEqual(payload["id"], note.id)
+        self.assertEqual(payload["message"], "Live")
+
+
+# ===============================
+# Notification Digest Tests
+# ===============================
+
+class NotificationDigestTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        Subscription.objects.create(reader=self.reader, journalist=self.journalist)
+        self.client.login(username="journalist1", password="pass123")
+
+    def create_articles(self, count):
+        for i in range(count):
+            self.client.post(reverse("create_article"), {
+                "title": f"Story {i}", "content": f"Body {i}"
+            })
+        return list(Article.objects.filter(title__startswith="Story").order_by("id"))
+
+    def test_instant_mode_writes_one_row_per_article(self):
+        self.create_articles(3)
+        self.assertEqual(Notification.objects.filter(recipient=self.reader).count(), 3)
+
+    def test_digest_mode_upserts_one_row_per_window(self):
+        self.reader.notification_mode = User.DIGEST
+        self.reader.save()
+
+        articles = self.create_articles(3)
+
+        digest = Notification.objects.get(recipient=self.reader)
+        self.assertEqual(digest.count, 3)
+        self.assertEqual(digest.article_ids, [a.id for a in reversed(articles)])
+        self.assertEqual(digest.message, "journalist1 uploaded 3 new articles, latest: Story 2")
+
+    @override_settings(NOTIFICATION_DIGEST_MAX_IDS=2)
+    def test_digest_keeps_latest_article_ids(self):
+        self.reader.notification_mode = User.DIGEST
+        self.reader.save()
+
+        articles = self.create_articles(3)
+
+        digest = Notification.objects.get(recipient=self.reader)
+        self.assertEqual(digest.article_ids, [articles[2].id, articles[1].id])
+
+    def test_poller_sees_updated_digests_of_other_workers(self):
+        self.reader.notification_mode = User.DIGEST
+        self.reader.save()
+        self.create_articles(1)
+        digest = Notification.objects.get(recipient=self.reader)
+        since = timezone.now()
+
+        self.assertEqual(pubsub.notifications_after([self.reader.id], digest.id, since), [])
+        self.client.post(reverse("create_article"), {"title": "Story 9", "content": "Body"})
+
+        rows = pubsub.notifications_after([self.reader.id], digest.id, since)
+        self.assertEqual([(row["id"], row["count"]) for row in rows], [(digest.id, 2)])
+
+    def test_reader_can_switch_to_digest(self):
+        self.client.login(username="reader1", password="pass123")
+        self.client.post(reverse("notification_mode"), {"notification_mode": "digest"})
+        self.reader.refresh_from_db()
+        self.assertEqual(self.reader.notification_mode, User.DIGEST)
+
+
+
+class ConcurrentDigestTests(TransactionTestCase):
+
+    def setUp(self):
+        self.reader = User.objects.create_user(
+            username="reader1", email="reader1@test.com", password="pass123",
+            role="reader", notification_mode=User.DIGEST,
+        )
+        self.journalist = User.objects.create_user(
+            username="journalist1", email="journalist1@test.com",
+            password="pass123", role="journalist",
+        )
+        Subscription.objects.create(reader=self.reader, journalist=self.journalist)
+
+    def test_concurrent_articles_in_one_window_both_count(self):
+        articles = [
+            Article.objects.create(title=f"Story {i}", content="Body", created_by=self.journalist)
+            for i in range(2)
+        ]
+        start = threading.Barrier(len(articles))
+        errors = []
+
+        def write(article):
+            try:
+                start.wait(timeout=5)
+                for _ in range(50):
+                    try:
+                        notify_new_article(article)
+                        return
+                    except OperationalError:
+                        # SQLite refuses the second writer instead of waiting.
+                        time.sleep(0.01)
+                errors.append(article.id)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=write, args=(a,)) for a in articles]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+
+        self.assertEqual(errors, [])
+        digest = Notification.objects.get(recipient=self.reader)
+        self.assertEqual(digest.count, 2)
+        self.assertEqual(sorted(digest.article_ids), sorted(a.id for a in articles))
+        self.assertTrue(digest.message.startswith("journalist1 uploaded 2 new articles"))
+
+
+# ===============================
+# Article Image Tests
+# ===============================
+
+class ArticleImageTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = Path(media.name)
+        self.enterContext(override_settings(MEDIA_ROOT=self.media_root))
+        self.client.login(username="journalist1", password="pass123")
+
+    def upload(self, color="red", name="photo.png"):
+        buffer = io.BytesIO()
+        Image.new("RGB", (640, 400), color).save(buffer, "PNG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+    def test_identical_uploads_are_stored_once(self):
+        for title in ("First", "Second"):
+            self.client.post(reverse("create_article"), {
+                "title": title, "content": "Body", "image": self.upload(name=f"{title}.png")
+            })
+
+        first, second = Article.objects.filter(title__in=["First", "Second"]).order_by("id")
+        self.assertEqual(ImageAsset.objects.count(), 1)
+        self.assertEqual(first.image_id, second.image_id)
+        self.assertEqual(len(list(self.media_root.glob("images/*/*"))), 1)
+
+    def test_invalid_upload_is_rejected(self):
+        bogus = SimpleUploadedFile("bad.png", b"not an image", content_type="image/png")
+        self.client.post(reverse("create_article"), {
+            "title": "Broken", "content": "Body", "image": bogus
+        })
+        self.assertFalse(Article.objects.filter(title="Broken").exists())
+        self.assertEqual(ImageAsset.objects.count(), 0)
+
+    def test_thumbnails_are_rendered_once_and_served(self):
+        asset = images.store_upload(self.upload())
+        self.assertIsNone(asset.smallest["webp"])
+
+        written = thumbnails.render(*images.render_args(asset))
+        self.assertEqual(len(written), 2 * len(settings.THUMBNAIL_SIZES))
+        self.assertEqual(thumbnails.render(*images.render_args(asset)), [])
+        images.record_thumbnails([asset.pk])
+        asset.refresh_from_db()
+
+        small = Image.open(self.media_root / thumbnails.thumbnail_name(asset.sha256, "small", "webp"))
+        self.assertEqual(max(small.size), settings.THUMBNAIL_SIZES["small"])
+        with mock.patch.object(default_storage, "exists") as exists:
+            self.assertTrue(asset.smallest["webp"].endswith(f"{asset.sha256}-small.webp"))
+            self.assertTrue(asset.smallest["src"].endswith(f"{asset.sha256}-small.jpg"))
+        exists.assert_not_called()
+
+    @override_settings(DEBUG=False)
+    def test_thumbnails_are_served_with_debug_off(self):
+        asset = images.store_upload(self.upload())
+        thumbnails.render(*images.render_args(asset))
+        images.record_thumbnails([asset.pk])
+        asset.refresh_from_db()
+
+        response = self.client.get(asset.smallest["webp"])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/webp")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(self.client.get("/media/thumbs/missing.webp").status_code, 404)
+
+    def test_generate_all_uses_process_pool(self):
+        asset = images.store_upload(self.upload("blue"))
+        self.assertEqual(images.generate_all(workers=1), 2 * len(settings.THUMBNAIL_SIZES))
+        asset.refresh_from_db()
+        self.assertEqual(asset.thumbnails, sorted(settings.THUMBNAIL_SIZES))
+
+
+# ===============================
+# Syndication Feed Tests
+# ===============================
+
+class SyndicationFeedTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.article.approved = True
+        self.article.save()
+
+    def test_feeds_list_approved_articles(self):
+        Article.objects.create(title="Draft", content="x", created_by=self.journalist)
+        urls = [
+            reverse("feed_rss"),
+            reverse("feed_atom"),
+            reverse("publisher_feed_rss", args=[self.publisher.id]),
+            reverse("journalist_feed_atom", args=[self.journalist.id]),
+        ]
+        for url in urls:
+            body = self.client.get(url).content.decode()
+            self.assertIn("Test Article", body)
+            self.assertNotIn("Draft", body)
+
+        self.assertIn("<rss", self.client.get(urls[0]).content.decode())
+        self.assertIn("http://www.w3.org/2005/Atom", self.client.get(urls[1]).content.decode())
+
+    def test_unknown_publisher_is_404(self):
+        self.assertEqual(self.client.get(reverse("publisher_feed_rss", args=[999])).status_code, 404)
+
+    def test_conditional_get_returns_304_without_queries(self):
+        cache.set(response_cache.MODIFIED_KEY, time.time() - 10, timeout=None)
+        first = self.client.get(reverse("feed_rss"))
+
+        with self.assertNumQueries(0):
+            by_etag = self.client.get(reverse("feed_rss"), HTTP_IF_NONE_MATCH=first["ETag"])
+            by_date = self.client.get(
+                reverse("feed_rss"), HTTP_IF_MODIFIED_SINCE=first["Last-Modified"]
+            )
+
+        self.assertEqual(by_etag.status_code, 304)
+        self.assertEqual(by_date.status_code, 304)
+
+    def test_edit_changes_etag_and_body(self):
+        first = self.client.get(reverse("feed_rss"))
+
+        self.article.title = "Retitled"
+        self.article.save()
+        second = self.client.get(reverse("feed_rss"), HTTP_IF_NONE_MATCH=first["ETag"])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second["ETag"], first["ETag"])
+        self.assertIn("Retitled", second.content.decode())
+
+    def test_stale_copy_carries_its_own_validators(self):
+        cache.set(response_cache.MODIFIED_KEY, time.time() - 10, timeout=None)
+        first = self.client.get(reverse("feed_rss"))
+        response_cache.bump_version()
+        digest = response_cache.request_digest(
+            RequestFactory().get(reverse("feed_rss")), f"feed:{reverse('feed_rss')}"
+        )
+        cache.add(response_cache.LOCK_KEY.format(digest), 1)
+
+        stale = self.client.get(reverse("feed_rss"))
+        cache.delete(response_cache.LOCK_KEY.format(digest))
+        revalidated = self.client.get(reverse("feed_rss"), HTTP_IF_NONE_MATCH=stale["ETag"])
+
+        self.assertEqual(stale["X-Cache"], "STALE")
+        self.assertEqual(stale["ETag"], first["ETag"])
+        self.assertEqual(stale["Last-Modified"], first["Last-Modified"])
+        self.assertEqual(revalidated.status_code, 200)
+
+    def test_last_modified_waits_for_its_second_to_end(self):
+        now = time.time()
+        cache.set(response_cache.MODIFIED_KEY, now, timeout=None)
+
+        response = self.client.get(reverse("feed_rss"))
+
+        self.assertNotIn("Last-Modified", response)
+        self.assertIsNone(response_cache.last_modified(now))
+        self.assertEqual(
+            response_cache.last_modified(now - 10.5).timestamp(), int(now - 10.5) + 1
+        )
+
+
+# ===============================
+# Static Export Tests
+# ===============================
+
+class StaticExportTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.article.approved = True
+        self.article.save()
+        output = tempfile.TemporaryDirectory()
+        self.addCleanup(output.cleanup)
+        self.output = Path(output.name)
+
+    def export(self):
+        out = StringIO()
+        call_command("export_static", output=str(self.output), workers=1, stdout=out)
+        return out.getvalue()
+
+    def test_export_renders_articles_and_publisher_index(self):
+        self.assertIn("Rendered 2 pages", self.export())
+
+        page = (self.output / f"read/{self.article.id}/index.html").read_text()
+        self.assertIn("<h2>Test Article</h2>", page)
+        self.assertIn("journalist1", page)
+        index = (self.output / f"publisher/{self.publisher.id}/index.html").read_text()
+        self.assertIn(f'href="/read/{self.article.id}/"', index)
+        self.assertIn(f"read/{self.article.id}/index.html",
+                      json.loads((self.output / "manifest.json").read_text()))
+
+    def test_rerun_only_renders_changed_pages(self):
+        other = Article.objects.create(
+            title="Other", content="Body", created_by=self.journalist, approved=True
+        )
+        self.export()
+        self.assertIn("Rendered 0 pages, skipped 3", self.export())
+
+        other.content = "Changed"
+        other.save()
+        self.assertIn("Rendered 1 pages, skipped 2", self.export())
+        self.assertIn("Changed", (self.output / f"read/{other.id}/index.html").read_text())
+
+    def test_unapproved_articles_are_removed(self):
+        self.export()
+        self.article.approved = False
+        self.article.save()
+
+        self.assertIn("removed 2", self.export())
+        self.assertFalse((self.output / f"read/{self.article.id}/index.html").exists())
+
+
+# ===============================
+# Rollup & Analytics Tests
+# ===============================
+
+class RollupTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        self.today = timezone.localdate()
+        Subscription.objects.create(reader=self.reader, publisher=self.publisher)
+        self.article.approved = True
+        self.article.save()
+
+    def test_rollup_is_idempotent_and_only_processes_new_days(self):
+        self.assertEqual(rollups.rollup(until=self.today), 1)
+        self.assertEqual(rollups.rollup(until=self.today), 0)
+
+        stats = DailyStats.objects.get(day=self.today)
+        self.assertEqual((stats.articles_created, stats.articles_approved), (1, 1))
+        publisher_stats = DailyPublisherStats.objects.get(publisher=self.publisher)
+        self.assertEqual(publisher_stats.new_subscribers, 1)
+        self.assertEqual(publisher_stats.subscribers, 1)
+
+        with CaptureQueriesContext(connection) as queries:
+            rollups.rollup(until=self.today + timedelta(days=2))
+        self.assertEqual(DailyStats.objects.count(), 3)
+        self.assertLess(len(queries), 15)
+
+    def test_rebuild_recomputes_days(self):
+        rollups.rollup(until=self.today)
+        Article.objects.create(title="Late", content="x", created_by=self.journalist)
+
+        call_command("rollup", until=str(self.today), rebuild_from=str(self.today), stdout=StringIO())
+
+        self.assertEqual(DailyStats.objects.get(day=self.today).articles_created, 2)
+
+    def test_analytics_api(self):
+        start = self.today - timedelta(days=13)
+        DailyStats.objects.bulk_create([
+            DailyStats(day=start + timedelta(days=i), articles_created=1 if i < 7 else 2)
+            for i in range(14)
+        ])
+        DailyPublisherStats.objects.bulk_create([
+            DailyPublisherStats(
+                publisher=self.publisher, day=start + timedelta(days=i),
+                new_subscribers=1, subscribers=10 + i
+            )
+            for i in range(14)
+        ])
+
+        self.client.login(username="reader1", password="pass123")
+        self.assertEqual(self.client.get(reverse("api_analytics")).status_code, 403)
+
+        self.client.login(username="editor1", password="pass123")
+        body = self.client.get(reverse("api_analytics"), {"days": 14, "window": 7}).json()
+
+        created = body["series"]["articles_created"]
+        self.assertEqual(created["values"], [1] * 7 + [2] * 7)
+        self.assertEqual(created["moving_average"][6], 1.0)
+        self.assertAlmostEqual(created["moving_average"][9], 10 / 7, places=4)
+        self.assertEqual(created["growth"], 1.0)
+        self.assertIsNone(body["series"]["notifications"]["growth"])
+
+        publisher = body["publishers"][0]
+        self.assertEqual(publisher["subscribers"][-1], 23)
+        self.assertAlmostEqual(publisher["subscriber_growth"], 7 / 16, places=4)
+
+
+# ===============================
+# SQLite Profile & Write Queue Tests
+# ===============================
+
+class SQLiteProfileTests(BaseTestSetup):
+
+    def test_pragmas_are_applied_to_connections(self):
+        original = sqlite.current_pragmas(connection, ["cache_size"])["cache_size"]
+        self.addCleanup(
+            lambda: connection.cursor().execute(f"PRAGMA cache_size = {original}")
+        )
+
+        with override_settings(SQLITE_PRAGMAS={"cache_size": -4096}):
+            sqlite.configure(connection)
+
+        self.assertEqual(sqlite.current_pragmas(connection, ["cache_size"]), {"cache_size": -4096})
+
+
+class WriteQueueTests(BaseTestSetup):
+
+    def test_batch_isolates_failing_writes(self):
+        def fail():
+            Notification.objects.create(recipient=self.reader, message="Rolled back")
+            raise ValueError("boom")
+
+        futures = [Future(), Future(), Future()]
+        WriteQueue().execute([
+            (Notification.objects.create, (), {"recipient": self.reader, "message": "A"}, futures[0]),
+            (fail, (), {}, futures[1]),
+            (Notification.objects.create, (), {"recipient": self.reader, "message": "B"}, futures[2]),
+        ])
+
+        self.assertEqual(futures[0].result().message, "A")
+        self.assertIsInstance(futures[1].exception(), ValueError)
+        self.assertEqual(
+            sorted(Notification.objects.values_list("message", flat=True)), ["A", "B"]
+        )
+
+    def test_runs_inline_inside_a_transaction(self):
+        queue = WriteQueue(enabled=True)
+        self.assertTrue(queue.submit(threading.current_thread).done())
+        self.assertIs(queue.run(threading.current_thread), threading.current_thread())
+
+    def test_writes_from_other_threads_run_on_the_writer_thread(self):
+        queue = WriteQueue(enabled=True)
+        names = []
+
+        def client():
+            try:
+                names.append(queue.run(lambda: threading.current_thread().name))
+            finally:
+                connection.close()
+
+        clients = [threading.Thread(target=client) for _ in range(4)]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join(timeout=5)
+
+        self.assertEqual(names, ["write-queue"] * 4)
+
+    def test_article_fan_out_is_not_part_of_the_queued_write(self):
+        Subscription.objects.create(reader=self.reader, journalist=self.journalist)
+        self.client.force_login(self.journalist)
+
+        with mock.patch.object(views, "notify_new_article") as notify:
+            article = views._create_article(self.journalist, "Queued", "Body", None, None)
+            notify.assert_not_called()
+            self.client.post(reverse("create_article"), {"title": "Posted", "content": "Body"})
+
+        self.assertEqual(notify.call_args.args[0].title, "Posted")
+        self.assertFalse(Notification.objects.filter(message__contains=article.title).exists())
+
+
+# ===============================
+# Production Server Tests
+# ===============================
+
+class ServerTests(BaseTestSetup):
+
+    def test_warm_up_reports_each_step(self):
+        timings = server.warm_up()
+        self.assertEqual(set(timings), {"urls", "templates", "models"})
+        self.assertTrue(all(seconds >= 0 for seconds in timings.values()))
+
+    def test_parse_import_times(self):
+        rows = server.parse_import_times(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     news.models\n"
+            "import time:        80 |        200 |   news\n"
+            "unrelated line\n"
+        )
+        self.assertEqual(rows, [("news.models", 120, 120), ("news", 80, 200)])
+
+    def test_pooled_server_answers_on_a_bound_socket(self):
+        def application(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return [environ["PATH_INFO"].encode()]
+
+        sock = server.listening_socket("127.0.0.1", 0, 16)
+        self.addCleanup(sock.close)
+        httpd = server.PooledWSGIServer(sock, application, threads=2)
+        thread = threading.Thread(target=httpd.run)
+        thread.start()
+        try:
+            with socket.create_connection(sock.getsockname(), timeout=5) as client:
+                client.sendall(b"GET /ping HTTP/1.0\r\nHost: localhost\r\n\r\n")
+                response = b""
+                while chunk := client.recv(4096):
+                    response += chunk
+        finally:
+            httpd.stopping.set()
+            thread.join(timeout=5)
+
+        self.assertTrue(response.startswith(b"HTTP/1.1 200"))
+        self.assertTrue(response.endswith(b"/ping"))
+        self.assertFalse(thread.is_alive())
+
+
+# ===============================
+# Template Cache Tests
+# ===============================
+
+class TemplateCacheTests(BaseTestSetup):
+
+    def test_templates_use_the_cached_loader(self):
+        loader = engines["django"].engine.template_loaders[0]
+        self.assertEqual(type(loader).__module__, "django.template.loaders.cached")
+
+    def test_warm_up_compiles_every_project_template(self):
+        template_cache.reset_templates()
+        self.addCleanup(template_cache.reset_templates)
+
+        timings = template_cache.warm_templates()
+
+        self.assertIn("base.html", timings)
+        self.assertIn("news/reader_dashboard.html", timings)
+        self.assertIn("newsletter/create.html", timings)
+        cached = engines["django"].engine.template_loaders[0].get_template_cache
+        self.assertTrue(set(timings) <= set(cached))
+
+
+# ===============================
+# Session & User Cache Tests
+# ===============================
+
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUTHENTICATION_BACKENDS=[
+        "news.user_cache.CachedUserBackend",
+        "django.contrib.auth.backends.ModelBackend",
+    ],
+)
+class UserCacheTests(BaseTestSetup):
+
+    def _request(self):
+        request = RequestFactory().get("/")
+        request.session = self.client.session
+        return request
+
+    def test_authentication_needs_no_queries_on_a_warm_cache(self):
+        self.client.force_login(self.reader)
+        self.assertEqual(get_user(self._request()), self.reader)
+
+        with self.assertNumQueries(0):
+            user = get_user(self._request())
+
+        self.assertEqual(user.pk, self.reader.pk)
+        self.assertEqual((user.username, user.role), ("reader1", "reader"))
+        self.assertTrue(user.is_authenticated)
+
+    def test_other_fields_are_loaded_on_access(self):
+        user = user_cache.get(self.reader.pk)
+        user = user_cache.get(self.reader.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "reader1@test.com")
+
+    def test_saving_a_user_invalidates_the_snapshot(self):
+        user_cache.get(self.reader.pk)
+        self.reader.role = "journalist"
+        self.reader.save()
+
+        self.assertEqual(user_cache.get(self.reader.pk).role, "journalist")
+
+    def test_password_change_logs_out_other_sessions(self):
+        self.client.force_login(self.reader)
+        get_user(self._request())
+        self.reader.set_password("changed456")
+        self.reader.save()
+
+        self.assertFalse(get_user(self._request()).is_authenticated)
+
+    def test_sessions_of_the_plain_backend_stay_valid(self):
+        self.client.force_login(self.reader, backend="django.contrib.auth.backends.ModelBackend")
+        self.assertEqual(get_user(self._request()), self.reader)
+
+    def test_deleted_and_inactive_users_are_not_resolved(self):
+        user_cache.get(self.reader.pk)
+        self.reader.is_active = False
+        self.reader.save()
+        backend = user_cache.CachedUserBackend()
+        self.assertIsNone(backend.get_user(self.reader.pk))
+
+        user_cache.get(self.editor.pk)
+        self.editor.delete()
+        self.assertIsNone(backend.get_user(self.editor.pk))
+
+
+# ===============================
+# Admission Control Tests
+# ===============================
+
+@override_settings(
+    ADMISSION_CONTROL=True,
+    ADMISSION_MAX_IN_FLIGHT=3,
+    ADMISSION_RESERVED=1,
+    ADMISSION_LIMITS={"home": 1},
+    ADMISSION_QUEUE_TIMEOUT=0,
+    ADMISSION_PRIORITY_TIMEOUT=0,
+    ADMISSION_RETRY_AFTER=2,
+)
+class AdmissionControlTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        admission.reset()
+        self.addCleanup(admission.reset)
+
+    def test_gate_keeps_reserved_slots_for_priority(self):
+        gate = Gate(2, reserved=1)
+        self.assertTrue(gate.acquire())
+        self.assertFalse(gate.acquire())
+        self.assertTrue(gate.acquire(priority=True))
+        self.assertFalse(gate.acquire(priority=True))
+        gate.release()
+        self.assertTrue(gate.acquire(priority=True))
+
+    def test_priority_waiters_go_first(self):
+        gate = Gate(1)
+        gate.acquire()
+        order = []
+
+        def waiter(name, priority):
+            if gate.acquire(priority, timeout=5):
+                order.append(name)
+                gate.release()
+
+        priority = threading.Thread(target=waiter, args=("write", True))
+        priority.start()
+        while not gate._waiting_priority:
+            pass
+        normal = threading.Thread(target=waiter, args=("read", False))
+        normal.start()
+        gate.release()
+        priority.join(timeout=5)
+        normal.join(timeout=5)
+
+        self.assertEqual(order, ["write", "read"])
+
+    def test_full_view_gets_fast_503_with_retry_after(self):
+        _, views = admission.gates()
+        views["home"].acquire()
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "2")
+
+        views["home"].release()
+        self.assertEqual(self.client.get(reverse("home")).status_code, 200)
+        self.assertEqual(views["home"].in_flight, 0)
+
+    def test_reserved_slots_admit_journalist_writes_only(self):
+        process_gate, _ = admission.gates()
+        process_gate.acquire()
+        process_gate.acquire()
+
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 503)
+
+        self.client.force_login(self.journalist)
+        self.assertEqual(self.client.get(reverse("create_article")).status_code, 200)
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 503)
+
+    @override_settings(ADMISSION_MAX_IN_FLIGHT=None, ADMISSION_LIMITS={})
+    def test_pooled_server_threads_bound_the_process_gate(self):
+        entered, proceed = threading.Event(), threading.Event()
+        render = views.render
+
+        def slow_render(*args, **kwargs):
+            entered.set()
+            proceed.wait(timeout=5)
+            return render(*args, **kwargs)
+
+        def get(path):
+            with socket.create_connection(sock.getsockname(), timeout=5) as client:
+                client.sendall(f"GET {path} HTTP/1.0\r\nHost: testserver\r\n\r\n".encode())
+                response = b""
+                while chunk := client.recv(4096):
+                    response += chunk
+            return response
+
+        sock = server.listening_socket("127.0.0.1", 0, 16)
+        self.addCleanup(sock.close)
+        # Two threads, one reserved: a second read finds a free thread but no slot.
+        httpd = server.PooledWSGIServer(sock, get_wsgi_application(), threads=2)
+        thread = threading.Thread(target=httpd.run)
+        thread.start()
+        responses = []
+        try:
+            with mock.patch.object(views, "render", slow_render):
+                slow = threading.Thread(target=lambda: responses.append(get(reverse("home"))))
+                slow.start()
+                self.assertTrue(entered.wait(timeout=5))
+                rejected = get(reverse("home"))
+                proceed.set()
+                slow.join(timeout=5)
+        finally:
+            proceed.set()
+            httpd.stopping.set()
+            thread.join(timeout=5)
+
+        self.assertEqual(admission.gates()[0].limit, 2)
+        self.assertTrue(rejected.startswith(b"HTTP/1.1 503"))
+        self.assertTrue(responses[0].startswith(b"HTTP/1.1 200"))
+
+    def test_limits_and_rejections_are_exported(self):
+        _, views = admission.gates()
+        views["home"].acquire()
+        self.client.get(reverse("home"))
+        views["home"].release()
+
+        text = metrics.registry.render()
+        self.assertIn('news_admission_limit{view="home"} 1', text)
+        self.assertIn('news_admission_rejected_total{view="home",priority="false"}', text)
+
+
+# ===============================
+# Rate Limit Tests
+# ===============================
+
+@override_settings(
+    RATELIMIT_ENABLED=True,
+    RATE_LIMITS={"login": "3/m", "register": "2/h", "subscribe": "2/m"},
+)
+class RateLimitTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_parse_rate(self):
+        self.assertEqual(ratelimit.parse_rate("10/m"), (10, 60))
+        self.assertEqual(ratelimit.parse_rate("5/15m"), (5, 900))
+        with self.assertRaises(ValueError):
+            ratelimit.parse_rate("10/week")
+
+    def test_sliding_window_counts_the_previous_window(self):
+        for _ in range(4):
+            self.assertTrue(ratelimit.hit("window", 4, 60, now=600)[0])
+        # A quarter into the next window 3 of the 4 earlier requests still count.
+        self.assertTrue(ratelimit.hit("window", 4, 60, now=675)[0])
+        allowed, retry_after = ratelimit.hit("window", 4, 60, now=675)
+        self.assertFalse(allowed)
+        self.assertGreater(retry_after, 0)
+        self.assertTrue(ratelimit.hit("window", 4, 60, now=775)[0])
+
+    def test_login_attempts_are_limited_with_retry_after(self):
+        for _ in range(3):
+            response = self.client.post(
+                reverse("login"), {"username": "reader1", "password": "wrong"}
+            )
+            self.assertEqual(response.status_code, 200)
+
+        response = self.client.post(
+            reverse("login"), {"username": "reader1", "password": "pass123"}
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response["Retry-After"]), 1)
+        # The login form itself stays available.
+        self.assertEqual(self.client.get(reverse("login")).status_code, 200)
+
+    def test_login_is_also_limited_per_username_across_addresses(self):
+        for i in range(3):
+            self.client.post(
+                reverse("login"), {"username": "Reader1", "password": "wrong"},
+                REMOTE_ADDR=f"10.0.0.{i}",
+            )
+        response = self.client.post(
+            reverse("login"), {"username": "reader1", "password": "wrong"},
+            REMOTE_ADDR="10.0.0.99",
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_successful_logins_do_not_count_against_the_username(self):
+        for i in range(4):
+            response = self.client.post(
+                reverse("login"), {"username": "reader1", "password": "pass123"},
+                REMOTE_ADDR=f"10.0.0.{i}",
+            )
+            self.assertEqual(response.status_code, 302)
+
+    def test_serve_warns_about_per_worker_counters(self):
+        self.assertIn("4 workers", ratelimit.shared_counters_warning(4))
+        self.assertIsNone(ratelimit.shared_counters_warning(1))
+        with self.settings(RATELIMIT_ENABLED=False):
+            self.assertIsNone(ratelimit.shared_counters_warning(4))
+
+    def test_subscriptions_are_limited_per_user(self):
+        url = reverse("subscribe_publisher", args=[self.publisher.id])
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.assertEqual(self.client.get(url).status_code, 429)
+
+        other = User.objects.create_user(
+            username="reader2", email="reader2@test.com", password="pass123", role="reader"
+        )
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+    def test_disabled_limiter_lets_everything_through(self):
+        with self.settings(RATELIMIT_ENABLED=False):
+            for _ in range(5):
+                response = self.client.post(
+                    reverse("register"), {"username": "", "email": "bad"}
+                )
+                self.assertEqual(response.status_code, 200)
+
+
+# ===============================
+# Idempotency Key Tests
+# ===============================
+
+class IdempotencyKeyTests(BaseTestSetup):
+
+    def setUp(self):
+        super().setUp()
+        Subscription.objects.create(reader=self.reader, journalist=self.journalist)
+        self.client.force_login(self.journalist)
+
+    def _create(self, title="Breaking", key="retry-1", **extra):
+        return self.client.post(
+            reverse("create_article"), {"title": title, "content": "Body"},
+            HTTP_IDEMPOTENCY_KEY=key, **extra
+        )
+
+    def test_retry_replays_the_first_response_without_rerunning(self):
+        first = self._create()
+        notifications = Notification.objects.count()
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self._create()
+        # Authentication aside, a replay is a single lookup of the key.
+        self.assertEqual(
+            [q["sql"] for q in queries if not q["sql"].startswith("SELECT")], []
+        )
+        self.assertEqual(sum("news_idempotencykey" in q["sql"] for q in queries), 1)
+
+        self.assertEqual(second.status_code, first.status_code)
+        self.assertEqual(second["Location"], first["Location"])
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Article.objects.filter(title="Breaking").count(), 1)
+        self.assertEqual(Notification.objects.count(), notifications)
+
+    def test_form_field_key_works_like_the_header(self):
+        for _ in range(2):
+            self.client.post(reverse("create_article"), {
+                "title": "Form", "content": "Body", "idempotency_key": "form-1",
+            })
+        self.assertEqual(Article.objects.filter(title="Form").count(), 1)
+
+    def test_create_form_carries_a_fresh_key(self):
+        first = self.client.get(reverse("create_article")).context["idempotency_key"]
+        second = self.client.get(reverse("create_article")).context["idempotency_key"]
+        self.assertNotEqual(first, second)
+
+    def test_requests_without_a_key_are_not_deduplicated(self):
+        for _ in range(2):
+            self.client.post(reverse("create_article"), {"title": "Twice", "content": "Body"})
+        self.assertEqual(Article.objects.filter(title="Twice").count(), 2)
+
+    def test_reusing_a_key_for_another_request_is_rejected(self):
+        self._create()
+        response = self._create(title="Something else")
+        self.assertEqual(response.status_code, 422)
+        self.assertFalse(Article.objects.filter(title="Something else").exists())
+
+    def test_request_in_progress_gets_409(self):
+        request = RequestFactory().post(
+            reverse("create_article"), {"title": "Breaking", "content": "Body"}
+        )
+        IdempotencyKey.objects.create(
+            user=self.journalist, endpoint="create_article", key="busy",
+            fingerprint=idempotency.fingerprint(request),
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        response = self._create(key="busy")
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertFalse(Article.objects.filter(title="Breaking").exists())
+
+    def test_abandoned_claim_is_taken_over_after_its_lease(self):
+        claim = IdempotencyKey.objects.create(
+            user=self.journalist, endpoint="create_article", key="killed",
+            fingerprint="left by a killed worker",
+            expires_at=timezone.now() + timedelta(hours=23),
+        )
+        IdempotencyKey.objects.filter(pk=claim.pk).update(
+            created_at=timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_LEASE + 1)
+        )
+
+        first = self._create(key="killed")
+        second = self._create(key="killed")
+
+        self.assertEqual(first.status_code, 302)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(Article.objects.filter(title="Breaking").count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get(pk=claim.pk).status_code, 302)
+
+    def test_keys_are_scoped_per_user(self):
+        self._create()
+        other = User.objects.create_user(
+            username="journalist2", email="journalist2@test.com",
+            password="pass123", role="journalist",
+        )
+        self.client.force_login(other)
+        self._create()
+        self.assertEqual(Article.objects.filter(title="Breaking").count(), 2)
+
+    def test_failed_requests_release_the_key(self):
+        calls = []
+
+        @idempotency.idempotent
+        def flaky(request):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("timeout")
+            return HttpResponse("ok", status=201)
+
+        request = RequestFactory().post("/", {"a": "1"}, HTTP_IDEMPOTENCY_KEY="k")
+        request.user = self.journalist
+        with self.assertRaises(RuntimeError):
+            flaky(request)
+        self.assertEqual(flaky(request).status_code, 201)
+        self.assertEqual(flaky(request).content, b"ok")
+        self.assertEqual(len(calls), 2)
+
+    def test_expired_keys_run_again_and_are_pruned(self):
+        self._create()
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self._create()
+        self.assertEqual(Article.objects.filter(title="Breaking").count(), 2)
+
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        out = StringIO()
+        call_command("prune_idempotency_keys", stdout=out)
+        self.assertIn("Deleted 1", out.getvalue())
+        self.assertFalse(IdempotencyKey.objects.exists())
@@ -0,0 +1,83 @@
+"""
+Thumbnail rendering for article images.
+
+This module does not import Django, so ``render`` can run in the worker
+processes of a ``ProcessPoolExecutor`` whatever start method it uses.
+Output names derive from the source's content hash, and a thumbnail
+that is already on disk is never rendered again.
+"""
+
+import os
+
+from PIL import Image, ImageOps
+
+
+def thumbnail_name(digest, label, ext):
+    return f"thumbs/{digest[:2]}/{digest}-{label}.{ext}"
+
+
+def has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+
+def fallback_ext(has_alpha):
+    """
+    Extension of the non-WebP variant: PNG keeps transparency, JPEG otherwise.
+    """
+    return "png" if has_alpha else "jpg"
+
+
+def _save(image, path, fmt, **options):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.part"
+    image.save(partial, fmt, **options)
+    os.replace(partial, path)
+
+
+def render(source, root, digest, sizes, quality=80):
+    """
+    Write the missing thumbnails of source below root.
+
+    ``sizes`` maps a label to the longest edge in pixels. Each size is
+    written as WebP and as JPEG (PNG for images with transparency).
+    Returns the names of the files written.
+    """
+    wanted = sorted(sizes.items(), key=lambda item: -item[1])
+
+    with Image.open(source) as image:
+        alpha = has_alpha(image)
+        ext = fallback_ext(alpha)
+        missing = [
+            (label, edge) for label, edge in wanted
+            if not all(
+                os.path.exists(os.path.join(root, thumbnail_name(digest, label, e)))
+                for e in (ext, "webp")
+            )
+        ]
+        if not missing:
+            return []
+
+        # Let the JPEG decoder downscale while decoding, as far as the
+        # largest wanted size allows.
+        image.draft("RGB", (missing[0][1], missing[0][1]))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if alpha else "RGB")
+
+    written = []
+    for label, edge in missing:
+        # Sizes go from large to small, so each one is resized from the
+        # previous result rather than the full-size image.
+        image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+
+        name = thumbnail_name(digest, label, ext)
+        if ext == "png":
+            _save(image, os.path.join(root, name), "PNG", optimize=True)
+        else:
+            _save(image, os.path.join(root, name), "JPEG", quality=quality, optimize=True)
+        written.append(name)
+
+        name = thumbnail_name(digest, label, "webp")
+        _save(image, os.path.join(root, name), "WEBP", quality=quality, method=4)
+        written.append(name)
+
+    return written
@@ -0,0 +1,220 @@
+"""
+Trending ranking of approved articles.
+
+Each article keeps an exponentially decayed activity score in
+``TrendingScore``. A recompute decays every stored score by the time
+elapsed since its last update and adds the reads and new subscriptions
+seen since then, all as NumPy operations over article-id arrays. The
+top-K articles, ranked by activity plus a recency bonus, are stored in
+the cache as a snapshot that the trending endpoint serves as-is.
+
+Only ``manage.py update_trending`` recomputes. When the cache is empty
+the endpoint ranks the stored scores as they are, without writing, and
+caches that ranking for ``TRENDING_FALLBACK_TIMEOUT`` seconds. Deleting
+or unapproving a listed article drops the snapshot (news.signals).
+"""
+
+import math
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import metrics
+from .counters import pending_views
+from .models import Article, Subscription, TrendingScore
+from .serializers import ArticleSerializer
+
+SNAPSHOT_KEY = "trending:snapshot"
+
+DEFAULT_WEIGHTS = {"read": 1.0, "subscription": 5.0, "recency": 10.0}
+
+
+def _settings():
+    half_life = getattr(settings, "TRENDING_HALF_LIFE_HOURS", 6.0)
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, "TRENDING_WEIGHTS", {})}
+    top_k = getattr(settings, "TRENDING_TOP_K", 20)
+    return half_life, weights, top_k
+
+
+def _lookup(keys, mapping):
+    """
+    Vectorized mapping.get(key, 0) over an integer array of keys.
+    """
+    if not mapping:
+        return np.zeros(len(keys))
+
+    known = np.fromiter(mapping.keys(), dtype=np.int64, count=len(mapping))
+    values = np.fromiter(mapping.values(), dtype=np.float64, count=len(mapping))
+    order = np.argsort(known)
+    known, values = known[order], values[order]
+
+    positions = np.clip(np.searchsorted(known, keys), 0, len(known) - 1)
+    return np.where(known[positions] == keys, values[positions], 0.0)
+
+
+def _decay(hours, half_life):
+    return np.exp(-math.log(2) * hours / half_life)
+
+
+def recompute(now=None):
+    """
+    Fold new activity into every trending score and refresh the snapshot.
+
+    Returns the snapshot that was stored.
+    """
+    now = now or timezone.now()
+    half_life, weights, top_k = _settings()
+
+    rows = list(
+        Article.objects.filter(approved=True)
+        .values_list("id", "views", "created_by_id", "publisher_id", "created_at")
+    )
+    count = len(rows)
+
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=count)
+    views = np.fromiter((r[1] for r in rows), dtype=np.float64, count=count)
+    authors = np.fromiter((r[2] for r in rows), dtype=np.int64, count=count)
+    publishers = np.fromiter(
+        (r[3] if r[3] is not None else -1 for r in rows), dtype=np.int64, count=count
+    )
+    age_hours = np.fromiter(
+        ((now - r[4]).total_seconds() / 3600 for r in rows),
+        dtype=np.float64, count=count
+    )
+
+    views += _lookup(ids, pending_views(ids.tolist()))
+
+    stored = {
+        article_id: (score, seen, updated_at)
+        for article_id, score, seen, updated_at in TrendingScore.objects.values_list(
+            "article_id", "score", "views_seen", "updated_at"
+        )
+    }
+    is_stored = np.fromiter((i in stored for i in ids.tolist()), dtype=bool, count=count)
+    previous = _lookup(ids, {i: s[0] for i, s in stored.items()})
+    seen = _lookup(ids, {i: s[1] for i, s in stored.items()})
+    elapsed = _lookup(
+        ids, {i: (now - s[2]).total_seconds() / 3600 for i, s in stored.items()}
+    )
+
+    # Subscriptions created since the last recompute boost every article
+    # by the journalist or publisher that gained followers.
+    since = min((s[2] for s in stored.values()), default=None)
+    new_subs = Subscription.objects.all()
+    if since is not None:
+        new_subs = new_subs.filter(created_at__gt=since)
+    journalist_subs = dict(
+        new_subs.filter(journalist__isnull=False)
+        .values_list("journalist_id").annotate(n=Count("id"))
+    )
+    publisher_subs = dict(
+        new_subs.filter(publisher__isnull=False)
+        .values_list("publisher_id").annotate(n=Count("id"))
+    )
+    subscriptions = _lookup(authors, journalist_subs) + _lookup(publishers, publisher_subs)
+
+    reads = np.maximum(views - seen, 0.0)
+    scores = (
+        previous * _decay(elapsed, half_life)
+        + weights["read"] * reads
+        + weights["subscription"] * subscriptions
+    )
+
+    with transaction.atomic():
+        TrendingScore.objects.exclude(article_id__in=ids.tolist()).delete()
+        objs = [
+            TrendingScore(
+                article_id=article_id, score=score,
+                views_seen=int(total), updated_at=now
+            )
+            for article_id, score, total in zip(
+                ids.tolist(), scores.tolist(), views.tolist()
+            )
+        ]
+        TrendingScore.objects.bulk_update(
+            [obj for obj, known in zip(objs, is_stored) if known],
+            ["score", "views_seen", "updated_at"],
+            batch_size=500,
+        )
+        TrendingScore.objects.bulk_create(
+            [obj for obj, known in zip(objs, is_stored) if not known],
+            batch_size=500,
+        )
+
+    ranking = scores + weights["recency"] * _decay(age_hours, half_life)
+    return _store_snapshot(ids, ranking, top_k, now)
+
+
+def _store_snapshot(ids, ranking, top_k, now, timeout=None):
+    """
+    Cache the top_k of ids by ranking as the snapshot and return it.
+    """
+    top = min(top_k, len(ids))
+    best = np.argpartition(-ranking, top - 1)[:top] if top else np.array([], dtype=int)
+    best = best[np.argsort(-ranking[best], kind="stable")]
+
+    top_ids = ids[best].tolist()
+    articles = Article.objects.in_bulk(top_ids)
+    snapshot = {
+        "generated_at": now.isoformat(),
+        "articles": [
+            {**ArticleSerializer(articles[article_id]).data, "score": round(float(rank), 4)}
+            for article_id, rank in zip(top_ids, ranking[best].tolist())
+        ],
+    }
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=timeout)
+    return snapshot
+
+
+def stored_snapshot(now=None):
+    """
+    Rank the stored scores, decayed to now, without updating them.
+    """
+    now = now or timezone.now()
+    half_life, weights, top_k = _settings()
+
+    rows = list(
+        TrendingScore.objects.filter(article__approved=True)
+        .values_list("article_id", "score", "updated_at", "article__created_at")
+    )
+    count = len(rows)
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=count)
+    scores = np.fromiter((r[1] for r in rows), dtype=np.float64, count=count)
+    elapsed = np.fromiter(
+        ((now - r[2]).total_seconds() / 3600 for r in rows), dtype=np.float64, count=count
+    )
+    age_hours = np.fromiter(
+        ((now - r[3]).total_seconds() / 3600 for r in rows), dtype=np.float64, count=count
+    )
+
+    ranking = (
+        scores * _decay(elapsed, half_life)
+        + weights["recency"] * _decay(age_hours, half_life)
+    )
+    return _store_snapshot(
+        ids, ranking, top_k, now, timeout=getattr(settings, "TRENDING_FALLBACK_TIMEOUT", 300)
+    )
+
+
+def drop_article(article_id):
+    """
+    Drop the cached snapshot if it lists article_id.
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is not None and any(item["id"] == article_id for item in snapshot["articles"]):
+        cache.delete(SNAPSHOT_KEY)
+
+
+def get_snapshot():
+    """
+    Return the cached snapshot, ranking the stored scores if there is none.
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    metrics.record_cache("trending", snapshot is not None)
+    if snapshot is None:
+        snapshot = stored_snapshot()
+    return snapshot
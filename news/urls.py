@@ -1,6 +1,9 @@
 from django.urls import path
 from django.contrib.auth.views import LogoutView
 from . import views
+from . import api_views
+from . import streams
+from . import feeds
 
 
 urlpatterns = [
@@ -36,10 +39,38 @@ urlpatterns = [
     path("unsubscribe/journalist/<int:journalist_id>/", views.unsubscribe_journalist, name="unsubscribe_journalist"),
     path("subscribe/publisher/<int:publisher_id>/", views.subscribe_publisher, name="subscribe_publisher"),
     path("unsubscribe/publisher/<int:publisher_id>/", views.unsubscribe_publisher, name="unsubscribe_publisher"),
+    path("notifications/mode/", views.notification_mode, name="notification_mode"),
     
     # ======================
     # API (STEP 5)
     # ======================
     path("api/articles/", views.ArticleListAPIView.as_view(), name="api_articles"),
+    path("api/articles/most-read/", views.MostReadArticlesAPIView.as_view(), name="api_articles_most_read"),
+    path("api/articles/batch/", views.ArticleBatchAPIView.as_view(), name="api_articles_batch"),
+    path("api/articles/trending/", views.TrendingArticlesAPIView.as_view(), name="api_articles_trending"),
     path("api/articles/<int:pk>/", views.ArticleDetailAPIView.as_view(), name="api_article_detail"),
+    path("api/reader/articles/", api_views.ReaderArticlesAPI.as_view(), name="api_reader_articles"),
+    path("api/feed/", api_views.ReaderFeedAPI.as_view(), name="api_feed"),
+    path("api/changes/", api_views.ArticleChangesAPI.as_view(), name="api_changes"),
+    path("api/analytics/", api_views.EditorAnalyticsAPI.as_view(), name="api_analytics"),
+
+    # ======================
+    # Feeds
+    # ======================
+    path("feeds/rss/", feeds.cached_feed(feeds.LatestArticlesFeed()), name="feed_rss"),
+    path("feeds/atom/", feeds.cached_feed(feeds.LatestArticlesAtomFeed()), name="feed_atom"),
+    path("feeds/publisher/<int:publisher_id>/rss/", feeds.cached_feed(feeds.PublisherArticlesFeed()), name="publisher_feed_rss"),
+    path("feeds/publisher/<int:publisher_id>/atom/", feeds.cached_feed(feeds.PublisherArticlesAtomFeed()), name="publisher_feed_atom"),
+    path("feeds/journalist/<int:journalist_id>/rss/", feeds.cached_feed(feeds.JournalistArticlesFeed()), name="journalist_feed_rss"),
+    path("feeds/journalist/<int:journalist_id>/atom/", feeds.cached_feed(feeds.JournalistArticlesAtomFeed()), name="journalist_feed_atom"),
+
+    # ======================
+    # Push (needs an ASGI server)
+    # ======================
+    path("notifications/stream/", streams.notification_stream, name="notification_stream"),
+
+    # ======================
+    # Monitoring
+    # ======================
+    path("metrics", views.metrics_view, name="metrics"),
 ]
@@ -0,0 +1,71 @@
+"""
+Shared cache of the user snapshot that authenticates each request.
+
+With ``cached_db`` sessions and ``CachedUserBackend`` a logged-in request
+resolves ``request.user`` from two cache reads and no queries. The
+snapshot holds the fields every request needs (id, username, role and
+what authentication itself checks: the password hash for the session
+hash, is_active and the staff flags); any other field is deferred and
+loaded on first access. Entries are dropped by the ``User`` save/delete
+signals in news.signals. The key carries a version, bumped whenever
+``FIELDS`` changes, so old snapshots are never read after a deploy.
+
+Settings enable both only with a shared cache: invalidations (logout,
+password change, deactivation) must reach every worker process.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from . import metrics
+
+KEY = "user:v1:{}"
+FIELDS = (
+    "id", "username", "role", "notification_mode",
+    "password", "is_active", "is_staff", "is_superuser",
+)
+
+
+def _timeout():
+    return getattr(settings, "USER_CACHE_TIMEOUT", 300)
+
+
+def _field_names(User):
+    # Model.from_db expects values in the model's field order.
+    return [field.attname for field in User._meta.concrete_fields if field.attname in FIELDS]
+
+
+def get(user_id):
+    """
+    Return the user with only the snapshot fields loaded, or None.
+    """
+    User = get_user_model()
+    user_id = User._meta.pk.to_python(user_id)
+    key = KEY.format(user_id)
+    names = _field_names(User)
+    values = cache.get(key)
+    metrics.record_cache("user", values is not None)
+    if values is not None:
+        return User.from_db(DEFAULT_DB_ALIAS, names, values)
+
+    user = User._default_manager.only(*FIELDS).filter(pk=user_id).first()
+    if user is not None:
+        cache.set(key, [getattr(user, name) for name in names], timeout=_timeout())
+    return user
+
+
+def invalidate(user_id):
+    cache.delete(KEY.format(user_id))
+
+
+class CachedUserBackend(ModelBackend):
+    """
+    ModelBackend that resolves session users from the snapshot cache.
+    """
+
+    def get_user(self, user_id):
+        user = get(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
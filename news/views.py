@@ -1,34 +1,263 @@
-from django.http import HttpResponseForbidden
+import ipaddress
+from collections.abc import Mapping
+
+from django.http import Http404, HttpResponse, HttpResponseForbidden, QueryDict
 from django.shortcuts import render, redirect, get_object_or_404
+from django.views.static import serve as serve_file
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, authenticate, logout
 from django.contrib import messages
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import Prefetch
 from .forms import ArticleForm, ArticleUpdateForm, CustomUserCreationForm
 from .models import Article, Publisher, User, Subscription, Newsletter, Notification, Article
+from .models import DuplicateFlag
 from django.core.mail import send_mail
 from .forms import NewsletterForm
 from rest_framework import generics
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from .serializers import ArticleSerializer
+from .fieldsets import SparseFieldsetMixin, apply_fieldset
+from . import article_cache
+from . import response_cache
+from . import changelog
+from .counters import pending_views, view_counter
+from . import trending
+from . import related
+from . import dedup
+from . import metrics
+from . import images
+from .notifications import notify_new_article
+from .ratelimit import by_field, client_ip, failed_login, ratelimit
+from .idempotency import idempotent, new_key
+from .write_queue import writes
 
 
 # =========================
 # API VIEWS
 # =========================
-class ArticleListAPIView(generics.ListAPIView):
+class ArticleListAPIView(SparseFieldsetMixin, generics.ListAPIView):
     """
     API view that returns a list of all approved articles.
+
+    Supports ?fields=, ?exclude= and ?expand= (see news.fieldsets).
+    JSON responses are served from news.response_cache.
     """
     serializer_class = ArticleSerializer
     queryset = Article.objects.filter(approved=True)
 
+    def get(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return super().get(request, *args, **kwargs)
+
+        def render_list():
+            response = self.list(request, *args, **kwargs)
+            body = request.accepted_renderer.render(
+                response.data, request.accepted_media_type, self.get_renderer_context()
+            )
+            return body, request.accepted_media_type
 
-class ArticleDetailAPIView(generics.RetrieveAPIView):
+        return response_cache.serve(request, render_list)
+
+
+class ArticleDetailAPIView(SparseFieldsetMixin, generics.RetrieveAPIView):
     """
     API view that returns details of a single approved article.
+
+    Supports ?fields=, ?exclude= and ?expand= (see news.fieldsets).
     """
     serializer_class = ArticleSerializer
     queryset = Article.objects.filter(approved=True)
 
+    def retrieve(self, request, *args, **kwargs):
+        fields, exclude, expand = self.get_fieldset()
+
+        if expand:
+            response = super().retrieve(request, *args, **kwargs)
+        else:
+            data = article_cache.get(self.kwargs["pk"])
+            if data is None:
+                raise Http404
+            response = Response(apply_fieldset(data, fields, exclude))
+
+        view_counter.record(self.kwargs["pk"])
+        return response
+
+
+class ArticleBatchAPIView(SparseFieldsetMixin, generics.GenericAPIView):
+    """
+    API view that returns many approved articles in one request.
+
+    GET takes ?ids=1,2,3; POST takes {"ids": [...]} (or form fields, each
+    one id or a comma-separated list) for long lists. Articles come back
+    in the requested order from the shared article cache, only cache
+    misses are queried with a single id__in lookup, and ids that are
+    missing or unapproved are listed under "missing". Supports ?fields=,
+    ?exclude= and ?expand=.
+    """
+    serializer_class = ArticleSerializer
+    queryset = Article.objects.filter(approved=True)
+
+    def get(self, request):
+        return self.batch(request.query_params.getlist("ids"))
+
+    def post(self, request):
+        if isinstance(request.data, QueryDict):
+            # ids=1&ids=2: .get() would keep only the last value.
+            return self.batch(request.data.getlist("ids"))
+        if not isinstance(request.data, Mapping):
+            raise ValidationError({"ids": 'Send an object like {"ids": [1, 2]}.'})
+        return self.batch(request.data.get("ids", ""))
+
+    def parse_ids(self, raw):
+        if isinstance(raw, str):
+            raw = [raw]
+        if not isinstance(raw, list) or any(
+            isinstance(value, bool) or not isinstance(value, (int, str)) for value in raw
+        ):
+            raise ValidationError({"ids": "Ids must be a list or a comma-separated string."})
+        raw = [
+            part for value in raw
+            for part in (value.split(",") if isinstance(value, str) else [value])
+        ]
+        try:
+            ids = [int(value) for value in raw if str(value).strip()]
+        except (TypeError, ValueError):
+            raise ValidationError({"ids": "Ids must be integers."})
+
+        ids = list(dict.fromkeys(ids))
+        limit = getattr(settings, "ARTICLE_BATCH_MAX_IDS", 100)
+        if not ids:
+            raise ValidationError({"ids": "Provide at least one id."})
+        if len(ids) > limit:
+            raise ValidationError({"ids": f"At most {limit} ids per request."})
+        return ids
+
+    def batch(self, raw_ids):
+        ids = self.parse_ids(raw_ids)
+        fields, exclude, expand = self.get_fieldset()
+
+        if expand:
+            articles = list(self.get_queryset().filter(id__in=ids))
+            serialized = self.get_serializer(articles, many=True).data
+            found = {article.id: data for article, data in zip(articles, serialized)}
+        else:
+            found = {
+                article_id: apply_fieldset(data, fields, exclude)
+                for article_id, data in article_cache.get_many(ids).items()
+            }
+
+        return Response({
+            "articles": [found[article_id] for article_id in ids if article_id in found],
+            "missing": [article_id for article_id in ids if article_id not in found],
+        })
+
+
+class MostReadArticlesAPIView(generics.ListAPIView):
+    """
+    API view that returns the most read approved articles.
+
+    Views still pending in the shared counters (news.counters) count
+    along with the stored ones. Accepts an optional ?limit= (default 10,
+    at most 50).
+    """
+    serializer_class = ArticleSerializer
+
+    def get_queryset(self):
+        try:
+            limit = int(self.request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        limit = min(max(limit, 1), 50)
+
+        rows = list(
+            Article.objects.filter(approved=True).values_list("id", "views", "created_at")
+        )
+        pending = pending_views([article_id for article_id, _, _ in rows])
+        rows.sort(key=lambda row: (row[1] + pending.get(row[0], 0), row[2]), reverse=True)
+        top = [article_id for article_id, _, _ in rows[:limit]]
+
+        articles = Article.objects.in_bulk(top)
+        for article in articles.values():
+            article.views += pending.get(article.id, 0)
+        return [articles[article_id] for article_id in top]
+
+
+class TrendingArticlesAPIView(APIView):
+    """
+    API view that returns the top trending approved articles.
+
+    Served from the precomputed snapshot kept by news.trending;
+    accepts an optional ?limit= up to TRENDING_TOP_K.
+    """
+
+    def get(self, request):
+        snapshot = trending.get_snapshot()
+        articles = snapshot["articles"]
+
+        limit = request.query_params.get("limit")
+        if limit and limit.isdigit():
+            articles = articles[:int(limit)]
+
+        return Response({
+            "generated_at": snapshot["generated_at"],
+            "articles": articles,
+        })
+
+
+# ======================
+# Metrics
+# ======================
+def metrics_view(request):
+    """
+    Expose application metrics in the Prometheus text format.
+
+    When METRICS_TOKEN is set, scrapers must send it as a bearer token;
+    otherwise only addresses in METRICS_ALLOWED_IPS may scrape.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        if request.headers.get("Authorization") != f"Bearer {token}":
+            return HttpResponseForbidden()
+    elif not _allowed_scraper(client_ip(request)):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _allowed_scraper(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network, strict=False)
+        for network in getattr(settings, "METRICS_ALLOWED_IPS", ())
+    )
+
+
+# ======================
+# Media
+# ======================
+def media_file(request, path):
+    """
+    Serve an uploaded image or thumbnail from MEDIA_ROOT.
+
+    Routed when SERVE_MEDIA is on. Image and thumbnail names are content
+    hashes (news.images), so browsers may cache them for good.
+    """
+    response = serve_file(request, path, document_root=settings.MEDIA_ROOT)
+    if path.startswith(("images/", "thumbs/")):
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
 
 # ======================
 # Home
@@ -43,6 +272,7 @@ def home(request):
 # ======================
 # Register (redirects to login)
 # ======================
+@ratelimit("register", keys=("ip",))
 def register(request):
     """
     Handle user registration. 
@@ -66,6 +296,9 @@ def register(request):
 # ======================
 # Login
 # ======================
+@ratelimit(
+    "login", keys=("ip",), failure_keys=(by_field("username"),), failed=failed_login
+)
 def login_view(request):
     """
     Authenticate and log in a user.
@@ -123,10 +356,10 @@ def dashboard(request):
 
     notifications = Notification.objects.filter(
         recipient=user
-    ).order_by("-created_at")
+    ).order_by("-updated_at")
 
     if user.role == "journalist":
-        articles = Article.objects.filter(created_by=user)
+        articles = Article.objects.filter(created_by=user).select_related("image")
 
         return render(request, "news/journalist_dashboard.html", {
             "articles": articles,
@@ -136,7 +369,12 @@ def dashboard(request):
         })
 
     elif user.role == "editor":
-        pending_articles = Article.objects.filter(approved=False)
+        pending_articles = Article.objects.filter(approved=False).prefetch_related(
+            Prefetch(
+                "duplicate_flags",
+                queryset=DuplicateFlag.objects.select_related("duplicate_of")
+            )
+        )
 
         publishers = Publisher.objects.all()
 
@@ -147,7 +385,7 @@ def dashboard(request):
 
         notifications = Notification.objects.filter(
             recipient=user
-        ).order_by("-created_at")
+        ).order_by("-updated_at")
 
         return render(request, "news/editor_dashboard.html", {
             "pending_articles": pending_articles,
@@ -182,7 +420,7 @@ def dashboard(request):
         else:
             articles = Article.objects.filter(approved=True)
 
-        articles = articles.distinct().order_by("-created_at")
+        articles = articles.distinct().select_related("image").order_by("-created_at")
 
         return render(request, "news/reader_dashboard.html", {
             "articles": articles,
@@ -205,13 +443,19 @@ def read_article(request, article_id):
         messages.error(request, "Article not approved yet.")
         return redirect("dashboard")
 
-    return render(request, "news/read_article.html", {"article": article})
+    view_counter.record(article.id)
+
+    return render(request, "news/read_article.html", {
+        "article": article,
+        "related_articles": related.related_for(article),
+    })
 
 
 # ======================
 # Create Article (Journalist)
 # ======================
 @login_required
+@idempotent
 def create_article(request):
     """
     Allow journalists to create a new article.
@@ -238,41 +482,48 @@ def create_article(request):
         if publisher_id:
             publisher = get_object_or_404(Publisher, id=publisher_id)
 
-        article = Article.objects.create(
-            title=title,
-            content=content,
-            created_by=request.user,
-            publisher=publisher
-        )
-
-        journalist_followers = Subscription.objects.filter(
-            journalist=request.user
+        image = None
+        if request.FILES.get("image"):
+            try:
+                image = images.store_upload(request.FILES["image"])
+            except DjangoValidationError as error:
+                messages.error(request, error.messages[0])
+                return render(request, "news/create_article.html", {
+                    "publishers": publishers,
+                    "idempotency_key": new_key()
+                })
+
+        article = writes.run(
+            _create_article, request.user, title, content, publisher, image
         )
-
-        for sub in journalist_followers:
-            Notification.objects.create(
-                recipient=sub.reader,
-                message=f"{request.user.username} uploaded a new article: {article.title}"
-            )
-
-        if publisher:
-            publisher_followers = Subscription.objects.filter(
-                publisher=publisher
-            )
-
-            for sub in publisher_followers:
-                Notification.objects.create(
-                    recipient=sub.reader,
-                    message=f"New article under {publisher.name}: {article.title}"
-                )
+        # Fan-out stays out of the writer's batch, which it would stall.
+        notify_new_article(article)
+        dedup.register(article)
 
         return redirect("dashboard")
 
     return render(request, "news/create_article.html", {
-        "publishers": publishers
+        "publishers": publishers,
+        "idempotency_key": new_key()
     })
 
 
+def _create_article(user, title, content, publisher, image):
+    """
+    Write a new article and its change entry.
+    """
+    with transaction.atomic():
+        article = Article.objects.create(
+            title=title,
+            content=content,
+            created_by=user,
+            publisher=publisher,
+            image=image
+        )
+        changelog.record(article, "create")
+    return article
+
+
 # ======================
 # Update Article
 # ======================
@@ -290,9 +541,18 @@ def update_article(request, article_id):
         return redirect("dashboard")
 
     if request.method == "POST":
+        was_approved = article.approved
         form = ArticleUpdateForm(request.POST, instance=article)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                article = form.save()
+                changelog.record(
+                    article,
+                    "approve" if article.approved and not was_approved else "update"
+                )
+            dedup.register(article)
+            if article.approved or was_approved:
+                related.schedule_index(article)
             messages.success(request, "Article updated successfully.")
             return redirect("dashboard")
     else:
@@ -317,7 +577,11 @@ def delete_article(request, article_id):
     if request.user.role == "journalist" and article.created_by != request.user:
         return redirect("dashboard")
 
-    article.delete()
+    with transaction.atomic():
+        changelog.record(article, "delete")
+        related.schedule_removal(article)
+        article.delete()
+
     messages.success(request, "Article deleted successfully.")
     return redirect("dashboard")
 
@@ -336,7 +600,12 @@ def approve_article(request, article_id):
 
     article = get_object_or_404(Article, id=article_id)
     article.approved = True
-    article.save()
+
+    with transaction.atomic():
+        article.save()
+        changelog.record(article, "approve")
+
+    related.schedule_index(article)
 
     messages.success(request, "Article approved successfully!")
     return redirect("dashboard")
@@ -346,6 +615,7 @@ def approve_article(request, article_id):
 # Create Newsletter
 # -----------------
 @login_required
+@idempotent
 def create_newsletter(request):
     """
     Allow journalists to create a newsletter
@@ -367,7 +637,10 @@ def create_newsletter(request):
         newsletter.save()
         return redirect('dashboard')
 
-    return render(request, 'newsletter/create.html', {'form': form})
+    return render(request, 'newsletter/create.html', {
+        'form': form,
+        'idempotency_key': new_key()
+    })
 
 
 @login_required
@@ -393,6 +666,7 @@ def approve_newsletter(request, pk):
 # Subscribe to Journalist
 # ======================
 @login_required
+@ratelimit("subscribe", keys=("user",), methods=("GET", "POST"))
 def subscribe_journalist(request, journalist_id):
     """
     Allow readers to subscribe to a journalist.
@@ -404,7 +678,8 @@ def subscribe_journalist(request, journalist_id):
 
     journalist = get_object_or_404(User, id=journalist_id, role="journalist")
 
-    subscription, created = Subscription.objects.get_or_create(
+    subscription, created = writes.run(
+        Subscription.objects.get_or_create,
         reader=request.user,
         journalist=journalist
     )
@@ -418,6 +693,7 @@ def subscribe_journalist(request, journalist_id):
 
 
 @login_required
+@ratelimit("subscribe", keys=("user",), methods=("GET", "POST"))
 def unsubscribe_journalist(request, journalist_id):
     """
     Allow readers to unsubscribe from a journalist.
@@ -426,10 +702,10 @@ def unsubscribe_journalist(request, journalist_id):
         messages.error(request, "Only readers can unsubscribe.")
         return redirect("dashboard")
 
-    Subscription.objects.filter(
+    writes.run(Subscription.objects.filter(
         reader=request.user,
         journalist_id=journalist_id
-    ).delete()
+    ).delete)
 
     messages.success(request, "Unsubscribed successfully.")
     return redirect("dashboard")
@@ -439,6 +715,7 @@ def unsubscribe_journalist(request, journalist_id):
 # Subscribe to Publisher
 # ======================
 @login_required
+@ratelimit("subscribe", keys=("user",), methods=("GET", "POST"))
 def subscribe_publisher(request, publisher_id):
     """
     Allow readers to subscribe to a publisher.
@@ -450,7 +727,8 @@ def subscribe_publisher(request, publisher_id):
 
     publisher = get_object_or_404(Publisher, id=publisher_id)
 
-    subscription, created = Subscription.objects.get_or_create(
+    subscription, created = writes.run(
+        Subscription.objects.get_or_create,
         reader=request.user,
         publisher=publisher
     )
@@ -464,6 +742,7 @@ def subscribe_publisher(request, publisher_id):
 
 
 @login_required
+@ratelimit("subscribe", keys=("user",), methods=("GET", "POST"))
 def unsubscribe_publisher(request, publisher_id):
     """
     Allow readers to unsubscribe from a publisher.
@@ -472,15 +751,29 @@ def unsubscribe_publisher(request, publisher_id):
         messages.error(request, "Only readers can unsubscribe.")
         return redirect("dashboard")
 
-    Subscription.objects.filter(
+    writes.run(Subscription.objects.filter(
         reader=request.user,
         publisher_id=publisher_id
-    ).delete()
+    ).delete)
 
     messages.success(request, "Unsubscribed successfully.")
     return redirect("dashboard")
 
 
+@login_required
+def notification_mode(request):
+    """
+    Let readers choose instant notifications or per-source digests.
+    """
+    mode = request.POST.get("notification_mode")
+    if request.method == "POST" and mode in dict(User.NOTIFICATION_MODE_CHOICES):
+        request.user.notification_mode = mode
+        request.user.save(update_fields=["notification_mode"])
+        messages.success(request, "Notification preference saved.")
+
+    return redirect("dashboard")
+
+
 def send_notification(newsletter):
     """
     Send email notifications to all subscribers
@@ -500,6 +793,7 @@ def send_notification(newsletter):
             recipient_list=emails,
             fail_silently=False,
         )
+        metrics.emails_sent.inc(len(emails))
 
 
 @login_required
@@ -0,0 +1,134 @@
+"""
+Single-writer queue for write-heavy code paths.
+
+SQLite allows one writer at a time, and every committed transaction
+costs a sync. ``run(fn, ...)`` hands a write to one writer thread per
+process that executes queued writes back to back in a single
+transaction, each inside its own savepoint, with up to
+``WRITE_QUEUE_BATCH`` writes per commit (waiting up to
+``WRITE_QUEUE_LINGER_MS`` for more to arrive). The caller blocks until its
+write has committed and gets its return value or exception, so views
+keep their synchronous behaviour.
+
+Writes run inline when ``WRITE_QUEUE_ENABLED`` is off, when the caller is
+already inside a transaction (its write must commit with it) and when
+called from the writer thread itself.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+
+class WriteQueue:
+    """
+    Queue of writes executed in batches by a dedicated thread.
+    """
+
+    def __init__(self, enabled=None):
+        self.enabled = enabled
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def _inline(self):
+        enabled = self.enabled
+        if enabled is None:
+            enabled = getattr(settings, "WRITE_QUEUE_ENABLED", False)
+        return (
+            not enabled
+            or connection.in_atomic_block
+            or threading.current_thread() is self._thread
+        )
+
+    def _ensure_writer(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child inherits the queue but not the thread.
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = None
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._work, name="write-queue", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue fn(*args, **kwargs); return a Future resolved after commit.
+        """
+        future = Future()
+        if self._inline():
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+
+        self._ensure_writer()
+        self._queue.put((fn, args, kwargs, future))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """
+        Execute fn through the queue and return its result.
+        """
+        return self.submit(fn, *args, **kwargs).result()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        size = getattr(settings, "WRITE_QUEUE_BATCH", 64)
+        deadline = time.monotonic() + getattr(settings, "WRITE_QUEUE_LINGER_MS", 0) / 1000
+        while len(batch) < size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(
+                    self._queue.get(timeout=remaining) if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            close_old_connections()
+            self.execute(batch)
+
+    def execute(self, batch):
+        """
+        Run a batch of (fn, args, kwargs, future) in one transaction.
+        """
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for fn, args, kwargs, future in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, fn(*args, **kwargs), None))
+                    except Exception as error:
+                        outcomes.append((future, None, error))
+        except Exception as error:
+            for *_, future in batch:
+                future.set_exception(error)
+            return
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+writes = WriteQueue()